@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+⚡ TradingDatabase 의 asyncio 버전
+Asyncio-native facade over TradingDatabase
+
+모든 호출은 연결을 소유한 전용 스레드 하나에서 순서대로 실행되므로 이벤트 루프는 SQLite I/O 나
+커밋을 기다리며 멈추지 않는다. 동시에 대기할 수 있는 호출 수는 max_pending 으로 제한되고,
+아직 실행되지 않은 호출은 await 하던 태스크가 취소되면 함께 취소된다.
+
+    db = AsyncTradingDatabase("trading_enhanced.db")
+    log_id = await db.save_analysis_log(market_data, ai_analysis, timestamp)
+    logs = await db.get_recent_logs(10)
+    async for log in db.iter_logs(batch_size=500):
+        ...
+    await db.close()
+"""
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from database import TradingDatabase
+
+# 비동기로 노출하는 TradingDatabase 메서드
+PROXIED_METHODS = (
+    # 쓰기
+    'save_analysis_log',
+    'save_analysis_logs',
+    'save_trade',
+    'save_trades',
+    'save_portfolio_snapshot',
+    'save_portfolio_snapshots',
+    'save_reflection',
+    'migrate_from_json',
+    'backfill_extracted_fields',
+    'backfill_price_ticks',
+    'backfill_prediction_accuracy',
+    'rebuild_search_index',
+    'save_price_ticks',
+    'train_compression_dictionary',
+    'convert_payload_storage',
+    'rebuild_stats',
+    'archive_old_rows',
+    'flush',
+    # 읽기
+    'get_recent_logs',
+    'get_recent_log_summaries',
+    'get_log_by_id',
+    'get_logs_by_date_range',
+    'get_trades_by_date',
+    'get_portfolio_history',
+    'get_price_series',
+    'get_prediction_accuracy',
+    'get_trading_stats',
+    'get_change_tokens',
+    'verify_stats',
+    'analyze_trading_performance',
+    'analyze_performance_windows',
+    'load_trade_arrays',
+    'load_trades_frame',
+    'load_trades_array',
+    'load_logs_frame',
+    'load_logs_array',
+    'get_recent_reflections',
+    'get_market_context',
+    'get_market_contexts',
+    'find_similar_contexts',
+    'search',
+    'get_import_checkpoint',
+    'write_behind_stats',
+    'refresh_snapshot',
+)
+
+# 비동기 이터레이터로 노출하는 TradingDatabase 스트리밍 메서드 (페이지마다 전용 스레드에서 읽는다)
+ITERATOR_METHODS = (
+    'iter_logs',
+    'iter_trades',
+    'iter_portfolio_snapshots',
+    'iter_reflections',
+)
+
+
+class AsyncTradingDatabase:
+    def __init__(self, db_path: str = "trading_data.db", max_pending: int = 100, **db_kwargs):
+        """전용 스레드에서 TradingDatabase 생성 (생성 자체도 이벤트 루프를 막지 않는다)
+
+        max_pending 은 동시에 대기·실행 중일 수 있는 호출 수의 상한이다. 가득 차면 새 호출은
+        자리가 날 때까지 await 에서 기다린다. db_kwargs 는 TradingDatabase 에 그대로 전달된다.
+        """
+        self.db_path = db_path
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='trading-db')
+        self._db_future = self._executor.submit(TradingDatabase, db_path, **db_kwargs)
+        self._slots = asyncio.Semaphore(max_pending)
+        self._pending = 0
+        self._closed = False
+
+    @property
+    def pending(self) -> int:
+        """현재 대기·실행 중인 호출 수"""
+        return self._pending
+
+    def _invoke(self, name: str, args: tuple, kwargs: dict):
+        """전용 스레드에서 실행: TradingDatabase 메서드 호출"""
+        return getattr(self._db_future.result(), name)(*args, **kwargs)
+
+    async def _call(self, name: str, *args, **kwargs):
+        """메서드 호출을 전용 스레드 큐에 넣고 결과 대기
+
+        태스크가 취소되면 아직 시작하지 않은 호출은 큐에서 빠지고, 이미 실행 중인 호출은
+        끝까지 실행된다 (트랜잭션 중간에서 끊지 않는다).
+        """
+        return await self._submit(functools.partial(self._invoke, name, args, kwargs))
+
+    async def _iterate(self, name: str, args: tuple, kwargs: dict):
+        """스트리밍 메서드의 페이지를 하나씩 전용 스레드에서 읽어 행(또는 batches=True 이면 목록) 반환"""
+        batches = kwargs.pop('batches', False)
+        pages = await self._call(name, *args, batches=True, **kwargs)
+        while True:
+            page = await self._submit(functools.partial(next, pages, None))
+            if page is None:
+                return
+            if batches:
+                yield page
+            else:
+                for row in page:
+                    yield row
+
+    async def _submit(self, func):
+        """func 를 전용 스레드 큐에 넣고 결과 대기 (동시 대기 수는 max_pending 으로 제한)"""
+        if self._closed:
+            raise RuntimeError("닫힌 AsyncTradingDatabase 입니다")
+        async with self._slots:
+            self._pending += 1
+            try:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._executor, func)
+            finally:
+                self._pending -= 1
+
+    async def close(self):
+        """대기 중인 호출을 모두 처리한 뒤 연결과 전용 스레드 정리"""
+        if self._closed:
+            return
+        self._closed = True
+        loop = asyncio.get_running_loop()
+        try:
+            db = await asyncio.wrap_future(self._db_future)
+            await loop.run_in_executor(self._executor, db.close)
+        finally:
+            self._executor.shutdown(wait=False)
+
+    async def __aenter__(self):
+        await asyncio.wrap_future(self._db_future)
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+
+def _proxy(name: str):
+    """TradingDatabase.<name> 의 비동기 버전 생성"""
+    async def method(self, *args, **kwargs):
+        return await self._call(name, *args, **kwargs)
+    method.__name__ = name
+    method.__qualname__ = f'AsyncTradingDatabase.{name}'
+    method.__doc__ = getattr(TradingDatabase, name).__doc__
+    return method
+
+
+def _iterator_proxy(name: str):
+    """TradingDatabase.<name> 의 비동기 이터레이터 버전 생성 (async for 로 사용)"""
+    def method(self, *args, **kwargs):
+        return self._iterate(name, args, kwargs)
+    method.__name__ = name
+    method.__qualname__ = f'AsyncTradingDatabase.{name}'
+    method.__doc__ = getattr(TradingDatabase, name).__doc__
+    return method
+
+
+for _name in PROXIED_METHODS:
+    setattr(AsyncTradingDatabase, _name, _proxy(_name))
+for _name in ITERATOR_METHODS:
+    setattr(AsyncTradingDatabase, _name, _iterator_proxy(_name))
@@ -0,0 +1,816 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+⏱️ TradingDatabase 마이크로 벤치마크
+TradingDatabase micro-benchmarks
+
+임시 디렉터리에 새 데이터베이스를 만들어 측정하므로 trading_enhanced.db 는 건드리지 않는다.
+
+    python bench_database.py                 # 전체 실행
+    python bench_database.py connections -n 2000
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import math
+import multiprocessing
+import os
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from async_database import AsyncTradingDatabase
+from check_performance import random_trades, reference_fifo, reference_window
+from database import TradingDatabase, market_context, to_epoch_ms
+from performance import TradeArrays, window_stats
+from predictions import score_predictions
+from similarity import SIMILARITY_FEATURES, feature_scale, feature_sums, nearest
+
+
+def sample_market_data(i: int = 0) -> dict:
+    """실제 로그와 비슷한 크기(~1KB)의 마켓 데이터"""
+    price = 148_000_000.0 + (i % 500) * 1000
+    return {
+        'current_price': price,
+        'daily_data_summary': {
+            'high_24h': price * 1.01, 'low_24h': price * 0.99,
+            'volume_24h': 296.13 + i % 50, 'price_change_24h': (i % 200 - 100) * 1000.0,
+        },
+        'investment_status': {
+            'krw_balance': 5_003_518.54, 'btc_balance': 0.00668515,
+            'btc_value_krw': 990_759.28, 'total_portfolio_value': 5_994_277.83,
+            'btc_percentage': 16.53, 'krw_percentage': 83.47,
+        },
+        'market_indicators': {'orderbook_spread': 1000 + i % 7, 'market_sentiment': 'BULLISH'},
+        'fear_greed_index': [{'value': str(40 + i % 40), 'value_classification': 'Greed'}],
+        'technical_indicators': {f'indicator_{k}': price / (k + 1) for k in range(20)},
+    }
+
+
+def sample_ai_analysis(i: int = 0) -> dict:
+    """실제 로그와 비슷한 크기(~3KB)의 AI 분석 결과"""
+    decision = ('BUY', 'SELL', 'HOLD')[i % 3]
+    return {
+        'decision': decision,
+        'confidence': ('HIGH', 'MEDIUM', 'LOW')[i % 3],
+        'reason': ('📊 RSI: 일봉 60.53 (중립) | 시간봉 58.56 (중립) 다이버전스: 없음 | 전략: mild bullish momentum\n' * 25),
+        'score': i % 5,
+        'trading_percentage': {'krw_to_invest': 75, 'btc_to_sell': 5},
+    }
+
+
+@contextlib.contextmanager
+def quiet():
+    """저장 메서드의 print 출력 숨기기"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def silently(func):
+    """print 출력을 숨긴 채 func 를 호출하는 함수 반환"""
+    def wrapper(*args, **kwargs):
+        with quiet():
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def timed(label: str, n: int, func):
+    """func 를 n 번 호출하고 호출당 평균 시간 출력"""
+    start = time.perf_counter()
+    for i in range(n):
+        func(i)
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<40} {elapsed * 1e6 / n:>10.1f} µs/call  ({n}회, {elapsed:.3f}s)")
+    return elapsed
+
+
+def bench_connections(n: int):
+    """호출마다 새 연결 (이전 방식) vs 스레드별 연결 재사용 + WAL"""
+    print("🔌 연결 재사용 벤치마크 (save_analysis_log / get_recent_logs)")
+    configs = [
+        ('before: 호출마다 연결, DELETE/FULL', dict(reuse_connections=False, journal_mode='DELETE', synchronous='FULL')),
+        ('after: 연결 재사용, WAL/NORMAL', dict()),
+    ]
+    market_data = [sample_market_data(i) for i in range(100)]
+    ai_analysis = [sample_ai_analysis(i) for i in range(100)]
+    base = datetime(2025, 7, 1)
+
+    for label, kwargs in configs:
+        with tempfile.TemporaryDirectory() as tmp:
+            with quiet():
+                db = TradingDatabase(os.path.join(tmp, 'bench.db'), **kwargs)
+            print(f" [{label}]")
+            timed('save_analysis_log', n, silently(lambda i: db.save_analysis_log(
+                market_data[i % 100], ai_analysis[i % 100],
+                (base + timedelta(minutes=5 * i)).isoformat())))
+            timed('get_recent_logs(limit=50)', n, lambda i: db.get_recent_logs(50))
+            db.close()
+
+
+def bench_bulk_insert(n: int):
+    """건별 save_analysis_log vs 일괄 save_analysis_logs"""
+    print("📦 일괄 저장 벤치마크 (trading_logs)")
+    base = datetime(2025, 7, 1)
+    logs = [
+        {
+            'market_data': sample_market_data(i),
+            'ai_analysis': sample_ai_analysis(i),
+            'timestamp': (base + timedelta(minutes=5 * i)).isoformat(),
+        }
+        for i in range(n)
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        with quiet():
+            db = TradingDatabase(os.path.join(tmp, 'bench.db'))
+        timed('save_analysis_log (건별 커밋)', n, silently(lambda i: db.save_analysis_log(
+            logs[i]['market_data'], logs[i]['ai_analysis'], logs[i]['timestamp'])))
+        start = time.perf_counter()
+        with quiet():
+            db.save_analysis_logs(logs)
+        elapsed = time.perf_counter() - start
+        print(f"  {'save_analysis_logs (한 트랜잭션)':<40} {elapsed * 1e6 / n:>10.1f} µs/row   ({n}건, {elapsed:.3f}s)")
+        db.close()
+
+
+def bench_projection(n: int):
+    """전체 컬럼 vs 요약 컬럼 조회"""
+    print("🧾 컬럼 선택 벤치마크 (get_recent_logs vs get_recent_log_summaries)")
+    base = datetime(2025, 7, 1)
+    with tempfile.TemporaryDirectory() as tmp:
+        with quiet():
+            db = TradingDatabase(os.path.join(tmp, 'bench.db'))
+            db.save_analysis_logs([
+                {
+                    'market_data': sample_market_data(i),
+                    'ai_analysis': sample_ai_analysis(i),
+                    'timestamp': (base + timedelta(minutes=5 * i)).isoformat(),
+                }
+                for i in range(1000)
+            ])
+        timed('get_recent_logs(50) - SELECT *', n, lambda i: db.get_recent_logs(50))
+        timed('get_recent_log_summaries(50)', n, lambda i: db.get_recent_log_summaries(50))
+        db.close()
+
+
+async def _measure_loop_lag(writer, n: int, tick: float = 0.001):
+    """writer 가 n 건을 기록하는 동안 tick 간격 타이머의 지연(ms) 측정"""
+    lags = []
+    done = asyncio.Event()
+
+    async def ticker():
+        loop = asyncio.get_running_loop()
+        while not done.is_set():
+            expected = loop.time() + tick
+            await asyncio.sleep(tick)
+            lags.append((loop.time() - expected) * 1000)
+
+    ticker_task = asyncio.create_task(ticker())
+    start = time.perf_counter()
+    await writer(n)
+    elapsed = time.perf_counter() - start
+    done.set()
+    await ticker_task
+    lags.sort()
+    return elapsed, lags
+
+
+def bench_event_loop(n: int):
+    """지속적인 로그 기록 중 이벤트 루프 지연: 동기 TradingDatabase vs AsyncTradingDatabase"""
+    print("⚡ 이벤트 루프 지연 벤치마크 (save_analysis_log 를 연속 기록하는 동안 1ms 타이머 지연)")
+    base = datetime(2025, 7, 1)
+    market_data = [sample_market_data(i) for i in range(100)]
+    ai_analysis = [sample_ai_analysis(i) for i in range(100)]
+
+    def args(i):
+        return market_data[i % 100], ai_analysis[i % 100], (base + timedelta(minutes=5 * i)).isoformat()
+
+    async def run(label, make_writer):
+        with tempfile.TemporaryDirectory() as tmp, quiet():
+            writer, cleanup = await make_writer(os.path.join(tmp, 'bench.db'))
+            elapsed, lags = await _measure_loop_lag(writer, n)
+            await cleanup()
+        p = lambda q: lags[min(len(lags) - 1, int(q * len(lags)))] if lags else 0.0
+        print(f"  {label:<28} 기록 {elapsed:.2f}s | 타이머 지연 p50 {p(0.5):.2f}ms "
+              f"p99 {p(0.99):.2f}ms max {lags[-1] if lags else 0:.2f}ms ({len(lags)} ticks)")
+
+    async def sync_writer(path):
+        db = TradingDatabase(path)
+
+        async def writer(count):
+            for i in range(count):
+                db.save_analysis_log(*args(i))
+                await asyncio.sleep(0)
+
+        async def cleanup():
+            db.close()
+        return writer, cleanup
+
+    async def async_writer(path):
+        db = AsyncTradingDatabase(path)
+
+        async def writer(count):
+            for i in range(count):
+                await db.save_analysis_log(*args(i))
+
+        return writer, db.close
+
+    async def main():
+        await run('동기 TradingDatabase', sync_writer)
+        await run('AsyncTradingDatabase', async_writer)
+
+    asyncio.run(main())
+
+
+def bench_write_behind(n: int):
+    """건별 동기 커밋 vs write-behind 큐 (호출 지연과 최종 기록 시간)"""
+    print("📝 write-behind 벤치마크 (save_analysis_log 호출 지연)")
+    base = datetime(2025, 7, 1)
+    market_data = [sample_market_data(i) for i in range(100)]
+    ai_analysis = [sample_ai_analysis(i) for i in range(100)]
+
+    for label, kwargs in [('동기 커밋', dict()), ('write-behind', dict(write_behind=True))]:
+        with tempfile.TemporaryDirectory() as tmp:
+            with quiet():
+                db = TradingDatabase(os.path.join(tmp, 'bench.db'), **kwargs)
+            print(f" [{label}]")
+            start = time.perf_counter()
+            timed('save_analysis_log', n, silently(lambda i: db.save_analysis_log(
+                market_data[i % 100], ai_analysis[i % 100],
+                (base + timedelta(minutes=5 * i)).isoformat())))
+            db.flush()
+            print(f"  {'flush 까지 전체':<40} {time.perf_counter() - start:>10.3f} s")
+            stats = db.write_behind_stats()
+            if stats:
+                print(f"  커밋 {stats['commits']}회 | 최대 큐 {stats['max_queue_depth']} | "
+                      f"커밋 지연 평균 {stats['avg_commit_ms']:.2f}ms 최대 {stats['max_commit_ms']:.2f}ms")
+            assert len(db.get_recent_log_summaries(n)) == n
+            db.close()
+
+
+def bench_stats(n: int):
+    """전체 집계 vs trading_stats 조회, 무작위 쓰기 후 두 결과 일치 확인"""
+    print("📊 거래 통계 벤치마크 (get_trading_stats)")
+    base = datetime(2025, 7, 1)
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        with quiet():
+            db = TradingDatabase(os.path.join(tmp, 'bench.db'))
+            db.save_analysis_logs([
+                {
+                    'market_data': sample_market_data(i),
+                    'ai_analysis': sample_ai_analysis(i),
+                    'timestamp': (base + timedelta(minutes=5 * i)).isoformat(),
+                }
+                for i in range(5000)
+            ])
+            db.save_trades([
+                {
+                    'trade_type': rng.choice(['buy', 'sell']), 'price': 148_000_000.0, 'amount': 0.001,
+                    'total_value': 148_000.0, 'fee': rng.uniform(10, 100), 'success': rng.random() > 0.1,
+                    'trade_time': (base + timedelta(minutes=7 * i)).isoformat(),
+                }
+                for i in range(5000)
+            ])
+        # 트리거가 갱신·삭제·성공 여부 변경을 따라가는지 확인
+        with db._connection() as conn:
+            conn.execute("UPDATE actual_trades SET success = 1 - success WHERE id % 13 = 0")
+            conn.execute("UPDATE actual_trades SET trade_type = 'sell', fee = fee * 2 WHERE id % 17 = 0")
+            conn.execute("DELETE FROM actual_trades WHERE id % 11 = 0")
+            conn.execute("UPDATE trading_logs SET ai_decision = 'HOLD' WHERE id % 7 = 0")
+            conn.execute("DELETE FROM trading_logs WHERE id % 5 = 0")
+            conn.commit()
+        mismatches = db.verify_stats()
+        if mismatches:
+            raise AssertionError(f"trading_stats 가 전체 집계와 다릅니다: {mismatches} (python check_stats.py 로 확인)")
+        print("  증분 통계 == 전체 집계: 일치")
+        timed('전체 집계 (이전 방식)', n, lambda i: db._scan_trading_stats())
+        timed('get_trading_stats (trading_stats)', n, lambda i: db.get_trading_stats())
+        db.close()
+
+
+def bench_performance(n: int):
+    """FIFO 성과 계산: 참조 파이썬 구현 vs NumPy 엔진 (n 건, 최소 100만 건까지 엔진만 측정)"""
+    print("📈 성과 계산 벤치마크 (FIFO 실현 손익, 1d/7d/30d/all + 사용자 지정 10개 기간)")
+
+    for count in sorted({n, max(n, 1_000_000)}):
+        trades = random_trades(random.Random(0), count)
+        end = trades[-1][0]
+        windows = {name: (end - days * 86_400_000, end) for name, days in (('1d', 1), ('7d', 7), ('30d', 30))}
+        windows['all'] = (None, None)
+        windows.update({f'custom{k}': (trades[0][0] + k * 86_400_000, end) for k in range(10)})
+        arrays = TradeArrays.from_rows(trades)
+        start = time.perf_counter()
+        window_stats(arrays, windows)
+        engine = time.perf_counter() - start
+        line = f"  {count:>9,}건  NumPy 엔진 {engine * 1000:>9.1f} ms"
+        if count <= 100_000:
+            start = time.perf_counter()
+            fifo = reference_fifo(trades)
+            for window_start, window_end in windows.values():
+                reference_window(trades, fifo, window_start, window_end)
+            line += f" | 참조 구현 {(time.perf_counter() - start) * 1000:>9.1f} ms"
+        print(line)
+
+
+def bench_streaming(n: int):
+    """전체 이력 읽기: get_logs_by_date_range (한 번에 목록) vs iter_logs (키셋 페이지) 최대 메모리"""
+    print(f"🌊 스트리밍 벤치마크 ({n}건 전체 읽기, tracemalloc 최대 메모리)")
+    base = datetime(2025, 7, 1)
+    with tempfile.TemporaryDirectory() as tmp:
+        with quiet():
+            db = TradingDatabase(os.path.join(tmp, 'bench.db'))
+            db.save_analysis_logs([
+                {
+                    'market_data': sample_market_data(i),
+                    'ai_analysis': sample_ai_analysis(i),
+                    'timestamp': (base + timedelta(minutes=5 * i)).isoformat(),
+                }
+                for i in range(n)
+            ])
+        end = (base + timedelta(minutes=5 * n)).isoformat()
+
+        def measure(label, read):
+            tracemalloc.start()
+            start = time.perf_counter()
+            count = read()
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"  {label:<40} {count}건 {elapsed:.3f}s | 최대 {peak / 1024 / 1024:>8.1f} MB")
+
+        measure('get_logs_by_date_range', lambda: len(db.get_logs_by_date_range(base.isoformat(), end)))
+        measure('iter_logs(start_date, end_date)', lambda: sum(1 for _ in db.iter_logs(
+            start_date=base.isoformat(), end_date=end)))
+        measure('iter_logs() - id 순서', lambda: sum(1 for _ in db.iter_logs()))
+        db.close()
+
+
+def bench_row_formats(n: int):
+    """조회 결과 형식별 시간·최대 메모리 (dict / tuple / record, DataFrame 까지)"""
+    print(f"🧾 행 형식 벤치마크 ({n}건 get_logs_by_date_range 숫자·짧은 문자열 컬럼, tracemalloc 최대 메모리)")
+    import pandas as pd
+
+    base = datetime(2025, 7, 1)
+    columns = ['id', 'timestamp', 'timestamp_ms', 'current_price', 'krw_balance', 'btc_balance',
+               'total_portfolio_value', 'ai_decision', 'ai_confidence', 'analysis_type',
+               'high_24h', 'low_24h', 'volume_24h', 'ai_score']
+    with tempfile.TemporaryDirectory() as tmp:
+        with quiet():
+            db = TradingDatabase(os.path.join(tmp, 'bench.db'))
+            db.save_analysis_logs([
+                {
+                    'market_data': sample_market_data(i),
+                    'ai_analysis': sample_ai_analysis(i),
+                    'timestamp': (base + timedelta(minutes=5 * i)).isoformat(),
+                }
+                for i in range(n)
+            ])
+        end = (base + timedelta(minutes=5 * n)).isoformat()
+
+        def measure(label, read):
+            tracemalloc.start()
+            start = time.perf_counter()
+            result = read()
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"  {label:<40} {len(result)}건 {elapsed:.3f}s | 최대 {peak / 1024 / 1024:>8.1f} MB")
+
+        for row_format in ('dict', 'tuple', 'record'):
+            measure(f"row_format='{row_format}'", lambda: db.get_logs_by_date_range(
+                base.isoformat(), end, columns=columns, row_format=row_format))
+        measure('DataFrame: dict 목록 → pd.DataFrame', lambda: pd.DataFrame(db.get_logs_by_date_range(
+            base.isoformat(), end, columns=columns)))
+        measure("DataFrame: row_format='tuple' → to_dataframe", lambda: db.get_logs_by_date_range(
+            base.isoformat(), end, columns=columns, row_format='tuple').to_dataframe())
+        db.close()
+
+
+def bench_frames(n: int):
+    """거래 내역 DataFrame 로드: dict 목록 → pd.DataFrame vs load_trades_frame / load_trades_array"""
+    sizes = (10 * n, 100 * n, 1000 * n)
+    print(f"🧮 DataFrame 로더 벤치마크 (거래 {', '.join(f'{size:,}' for size in sizes)}건, 시간 / tracemalloc 최대 메모리)")
+    import pandas as pd
+
+    base = datetime(2025, 1, 1)
+    rng = random.Random(0)
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            with quiet():
+                db = TradingDatabase(os.path.join(tmp, 'bench.db'))
+                for offset in range(0, size, 100_000):
+                    db.save_trades([
+                        {
+                            'trade_type': rng.choice(['buy', 'sell']), 'price': 148_000_000.0, 'amount': 0.001,
+                            'total_value': 148_000.0, 'fee': 74.0, 'success': rng.random() > 0.1,
+                            'trade_time': (base + timedelta(seconds=30 * i)).isoformat(),
+                        }
+                        for i in range(offset, min(offset + 100_000, size))
+                    ])
+            end = (base + timedelta(seconds=30 * size + 1)).isoformat()
+            print(f" [{size:,}건]")
+            loaders = [
+                ('dict 목록 → pd.DataFrame', lambda: pd.DataFrame(db.get_trades_by_date(base.isoformat(), end))),
+                ('load_trades_frame', lambda: db.load_trades_frame(base.isoformat(), end)),
+                ('load_trades_array', lambda: db.load_trades_array(base.isoformat(), end)),
+            ]
+            for label, load in loaders:
+                start = time.perf_counter()
+                result = load()
+                elapsed = time.perf_counter() - start
+                assert len(result) == size
+                del result
+                tracemalloc.start()
+                load()
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                print(f"  {label:<40} {elapsed:>8.3f}s | 최대 {peak / 1024 / 1024:>8.1f} MB")
+            db.close()
+
+
+def bench_prices(n: int):
+    """가격 차트 조회: 구간의 틱 전체 읽기 vs get_price_series (점 500개 예산, 틱 100n 건 10초 간격)"""
+    size = 100 * n
+    print(f"💹 가격 시계열 벤치마크 (틱 {size:,}건, 구간별 조회 시간과 점 수)")
+    base = datetime(2025, 1, 1)
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        with quiet():
+            db = TradingDatabase(os.path.join(tmp, 'bench.db'))
+        price = 148_000_000.0
+        ticks = []
+        for i in range(size):
+            price *= 1 + rng.gauss(0, 0.0005)
+            ticks.append({'timestamp': (base + timedelta(seconds=10 * i)).isoformat(), 'price': price})
+        start = time.perf_counter()
+        db.save_price_ticks(ticks)
+        elapsed = time.perf_counter() - start
+        print(f"  save_price_ticks (캔들 트리거 포함)          {elapsed * 1e6 / size:>10.1f} µs/틱")
+        end = base + timedelta(seconds=10 * size)
+        for label, span in (('1시간', timedelta(hours=1)), ('1일', timedelta(days=1)),
+                            ('7일', timedelta(days=7)), ('전체', end - base)):
+            window_start = max(base, end - span).isoformat()
+            with db._connection() as conn:
+                start = time.perf_counter()
+                raw = conn.execute('SELECT timestamp_ms, price FROM price_ticks WHERE timestamp_ms >= ? ORDER BY timestamp_ms',
+                                   (to_epoch_ms(window_start),)).fetchall()
+                raw_elapsed = time.perf_counter() - start
+            start = time.perf_counter()
+            series = db.get_price_series(window_start, max_points=500)
+            elapsed = time.perf_counter() - start
+            print(f"  {label:<6} 틱 전체 {len(raw):>9,}점 {raw_elapsed * 1000:>8.2f}ms | "
+                  f"get_price_series {series['resolution']:>4} {len(series['rows']):>4}점 {elapsed * 1000:>7.2f}ms")
+        db.close()
+
+
+def bench_predictions(n: int):
+    """예측 채점: 로그마다 SQL as-of 조회 (표본으로 추정) vs backfill_prediction_accuracy (로그 300n 건, 1분 간격)"""
+    size = 300 * n
+    print(f"🎯 예측 채점 벤치마크 (분석 로그 {size:,}건)")
+    base = datetime(2025, 1, 1)
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        with quiet():
+            db = TradingDatabase(os.path.join(tmp, 'bench.db'))
+            price = 148_000_000.0
+            for offset in range(0, size, 50_000):
+                logs = []
+                for i in range(offset, min(offset + 50_000, size)):
+                    price *= 1 + rng.gauss(0, 0.0005)
+                    logs.append({
+                        'market_data': {'current_price': price},
+                        'ai_analysis': {'decision': rng.choice(['buy', 'sell', 'hold']), 'confidence': 'medium'},
+                        'timestamp': (base + timedelta(minutes=i)).isoformat(),
+                    })
+                db.save_analysis_logs(logs)
+        sample = 2000
+        with db._connection() as conn:
+            logs = conn.execute('SELECT timestamp_ms FROM trading_logs ORDER BY id LIMIT ?', (sample,)).fetchall()
+            start = time.perf_counter()
+            for (timestamp_ms,) in logs:
+                for horizon in (3_600_000, 14_400_000, 86_400_000):
+                    conn.execute('SELECT price FROM price_ticks WHERE timestamp_ms <= ? ORDER BY timestamp_ms DESC LIMIT 1',
+                                 (timestamp_ms + horizon,)).fetchone()
+            per_log = (time.perf_counter() - start) / sample
+            ticks = np.array(conn.execute('SELECT timestamp_ms, price FROM price_ticks ORDER BY timestamp_ms').fetchall())
+            logs = conn.execute('SELECT timestamp_ms, current_price, ai_decision FROM trading_logs').fetchall()
+        timestamp_ms, prices, decisions = zip(*logs)
+        start = time.perf_counter()
+        score_predictions(np.array(timestamp_ms, dtype=np.int64), np.array(prices), decisions,
+                          ticks[:, 0].astype(np.int64), ticks[:, 1])
+        asof = time.perf_counter() - start
+        print(f"  로그마다 SQL as-of 조회 (조회만, 추정)         {per_log * size:>8.2f}s")
+        print(f"  score_predictions (NumPy as-of 조인만)        {asof:>8.2f}s")
+        with quiet():
+            start = time.perf_counter()
+            saved = db.backfill_prediction_accuracy()
+            elapsed = time.perf_counter() - start
+            start = time.perf_counter()
+            again = db.backfill_prediction_accuracy()
+            incremental = time.perf_counter() - start
+        print(f"  backfill_prediction_accuracy (조회+저장)      {elapsed:>8.2f}s | {saved:,}건")
+        print(f"  다시 실행 (새로 채점할 로그 없음)             {incremental:>8.3f}s | {again:,}건")
+        db.close()
+
+
+def bench_contexts(n: int):
+    """시점별 시장 상황 조회 n 회: 호출마다 SQL (이전 방식) vs get_market_context / get_market_contexts
+
+    반성·백테스트처럼 최근 로그 1,000건 구간의 거래 시점을 두 번씩 조회한다.
+    """
+    size = 20 * n
+    print(f"🧭 시장 상황 조회 벤치마크 (분석 로그 {size:,}건, 최근 1,000건 구간의 시점 {n:,}개 x 2회)")
+    base = datetime(2025, 7, 1)
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        with quiet():
+            db = TradingDatabase(os.path.join(tmp, 'bench.db'))
+            db.save_analysis_logs([
+                {
+                    'market_data': sample_market_data(i),
+                    'ai_analysis': sample_ai_analysis(i),
+                    'timestamp': (base + timedelta(minutes=5 * i)).isoformat(),
+                }
+                for i in range(size)
+            ])
+        # 거래 시점처럼 로그 사이의 임의 시각
+        points = [(base + timedelta(minutes=5 * size - rng.uniform(0, 5000))).isoformat() for _ in range(n)]
+
+        def sql_context(timestamp):
+            with db._connection() as conn:
+                row = conn.execute('''
+                    SELECT current_price, timestamp, technical_indicators_json, fear_greed_json
+                    FROM trading_logs WHERE timestamp_ms <= ? ORDER BY timestamp_ms DESC LIMIT 1
+                ''', (to_epoch_ms(timestamp),)).fetchone()
+            return market_context(*row) if row else {}
+
+        def measure(label, run):
+            start = time.perf_counter()
+            result = run()
+            elapsed = time.perf_counter() - start
+            print(f"  {label:<40} {elapsed * 1000:>9.2f} ms")
+            return result
+
+        expected = measure('호출마다 SQL + JSON 파싱 (이전 방식)', lambda: [sql_context(p) for p in points * 2])
+        index = db.market_context_index
+        measure('시각 인덱스 만들기 (첫 호출 1회)', index.refresh)
+        batch = measure('get_market_contexts (한 번에)', lambda: db.get_market_contexts(points * 2))
+        single = measure('get_market_context 반복 (LRU 캐시)', lambda: [db.get_market_context(p) for p in points * 2])
+        print(f"  결과 일치: {'일치' if batch == expected == single else '불일치'} | "
+              f"캐시 적중 {index.hits:,} / 조회 {index.misses:,}")
+        db.close()
+
+
+def bench_search(n: int):
+    """AI 판단 근거 검색: LIKE '%검색어%' 전체 스캔 (이전 방식) vs FTS5 search (관련도 순 첫 페이지)
+
+    로그 100건 중 1건의 판단 근거에만 '베어리시 다이버전스' 가 들어 있다.
+    """
+    size = 20 * n
+    print(f"🔎 전문 검색 벤치마크 (분석 로그 {size:,}건, 판단 근거 ~3KB)")
+    base = datetime(2025, 7, 1)
+    with tempfile.TemporaryDirectory() as tmp:
+        with quiet():
+            db = TradingDatabase(os.path.join(tmp, 'bench.db'))
+            logs = []
+            for i in range(size):
+                analysis = sample_ai_analysis(i)
+                if i % 100 == 0:
+                    analysis['reason'] += f'⚠️ 시간봉 베어리시 다이버전스 감지 (#{i})'
+                logs.append({
+                    'market_data': sample_market_data(i),
+                    'ai_analysis': analysis,
+                    'timestamp': (base + timedelta(minutes=5 * i)).isoformat(),
+                })
+            db.save_analysis_logs(logs)
+
+        def like_scan():
+            with db._connection() as conn:
+                total = conn.execute("SELECT COUNT(*) FROM trading_logs WHERE ai_reason LIKE ?",
+                                     ('%베어리시 다이버전스%',)).fetchone()[0]
+                rows = conn.execute('''
+                    SELECT id FROM trading_logs WHERE ai_reason LIKE ? ORDER BY id DESC LIMIT 20
+                ''', ('%베어리시 다이버전스%',)).fetchall()
+            return total, len(rows)
+
+        def fts_search():
+            result = db.search('베어리시 다이버전스')
+            return result['total'], len(result['rows'])
+
+        for label, run in (
+            ("LIKE '%검색어%' 전체 스캔 (이전 방식)", like_scan),
+            ('search (FTS5 trigram, bm25 순)', fts_search),
+        ):
+            start = time.perf_counter()
+            for _ in range(10):
+                total, shown = run()
+            elapsed = (time.perf_counter() - start) / 10
+            print(f"  {label:<40} {elapsed * 1000:>9.2f} ms/회 | {total:,}건 중 {shown}건")
+        db.close()
+
+
+def bench_similar(n: int):
+    """비슷한 과거 상황 찾기: 로그 JSON 을 모두 읽어 파싱 (이전 방식) vs find_similar_contexts
+
+    분석 로그 20n 건으로 두 방식의 결과를 비교하고, 5년치 5분 간격 (525,600건) 특징 행렬을
+    메모리 매핑으로 열어 질의 한 번의 시간을 잰다.
+    """
+    size = 20 * n
+    print(f"🧭 유사 상황 검색 벤치마크 (분석 로그 {size:,}건, k=5)")
+    base = datetime(2025, 7, 1)
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        with quiet():
+            db = TradingDatabase(os.path.join(tmp, 'bench.db'), similarity_index_dir=os.path.join(tmp, 'similarity'))
+            logs = []
+            for i in range(size):
+                market_data = sample_market_data(i)
+                daily = market_data['daily_data_summary']
+                daily['volume_24h'] = rng.uniform(100, 1000)
+                daily['high_24h'] = market_data['current_price'] * (1 + rng.uniform(0, 0.05))
+                market_data['fear_greed_index'][0]['value'] = str(rng.randint(10, 90))
+                logs.append({
+                    'market_data': market_data,
+                    'ai_analysis': sample_ai_analysis(i),
+                    'timestamp': (base + timedelta(minutes=5 * i)).isoformat(),
+                })
+            db.save_analysis_logs(logs)
+
+        def json_scan():
+            # 로그마다 JSON 을 파싱해 같은 특징을 만들고 표준화 거리로 정렬
+            with db._connection() as conn:
+                rows = conn.execute(
+                    'SELECT id, timestamp_ms, current_price, market_data_json, ai_analysis_full_json FROM trading_logs'
+                ).fetchall()
+            vectors = {}
+            for log_id, timestamp_ms, price, market_json, analysis_json in rows:
+                market_data, analysis = json.loads(market_json), json.loads(analysis_json)
+                daily = market_data['daily_data_summary']
+                change = daily['price_change_24h']
+                vectors[log_id] = (timestamp_ms, [
+                    change / (price - change), (daily['high_24h'] - daily['low_24h']) / price,
+                    math.log1p(daily['volume_24h']), market_data['market_indicators']['orderbook_spread'] / price,
+                    float(market_data['fear_greed_index'][0]['value']), float(analysis['score']),
+                    {'HIGH': 0.9, 'MEDIUM': 0.6, 'LOW': 0.3}[analysis['confidence']],
+                ])
+            columns = list(zip(*(vector for _, vector in vectors.values())))
+            mean = [statistics.fmean(column) for column in columns]
+            std = [statistics.pstdev(column) for column in columns]
+            query_id = max(vectors, key=lambda log_id: (vectors[log_id][0], log_id))
+            query_ms, query = vectors[query_id]
+            distances = [
+                (math.sqrt(sum(((a - b) / s) ** 2 for a, b, s in zip(vector, query, std) if s > 0) / sum(s > 0 for s in std)), log_id)
+                for log_id, (timestamp_ms, vector) in vectors.items() if timestamp_ms <= query_ms - 86_400_000
+            ]
+            return sorted(distances)[:5]
+
+        def measure(label, run, repeat=1):
+            start = time.perf_counter()
+            for _ in range(repeat):
+                result = run()
+            elapsed = (time.perf_counter() - start) / repeat
+            print(f"  {label:<40} {elapsed * 1000:>9.2f} ms")
+            return result
+
+        expected = measure('로그 JSON 전체 파싱 + 거리 (이전 방식)', json_scan)
+        measure('특징 행렬 만들기 (첫 호출 1회)', db.similarity_index.refresh)
+        found = measure('find_similar_contexts', lambda: db.find_similar_contexts(5), repeat=20)
+        same = [log_id for _, log_id in expected] == [item['id'] for item in found] and np.allclose(
+            [distance for distance, _ in expected], [item['distance'] for item in found], rtol=1e-4)
+        print(f"  결과 일치: {'일치' if same else '불일치'} (특징 행렬은 float32)")
+        db.close()
+
+        # 5년치 특징 행렬을 파일로 만들어 메모리 매핑으로 열기
+        rows = 5 * 365 * 288
+        path = os.path.join(tmp, 'features.npy')
+        generator = np.random.default_rng(0)
+        matrix = np.lib.format.open_memmap(path, mode='w+', dtype=np.float32, shape=(rows, len(SIMILARITY_FEATURES)))
+        matrix[:] = generator.normal(size=matrix.shape)
+        matrix.flush()
+        del matrix
+        matrix = np.load(path, mmap_mode='r')
+        ids = np.arange(1, rows + 1, dtype=np.int64)
+        mean, std = feature_scale(feature_sums(matrix))
+        candidates = ids <= rows - 288
+        query = np.asarray(matrix[-1], dtype=np.float64)
+        measure(f'nearest ({rows:,}건, 메모리 매핑)',
+                lambda: nearest([(matrix, ids, candidates)], query, mean, std, 5), repeat=10)
+        del matrix
+
+
+def _dashboard_reader(path: str, kwargs: dict, start_iso: str, done, queries):
+    """조회 프로세스: done 이 설정될 때까지 대시보드 한 번의 렌더링에 해당하는 조회 반복"""
+    with quiet():
+        reader = TradingDatabase(path, **kwargs)
+    end_iso = (datetime.fromisoformat(start_iso) + timedelta(days=3)).isoformat()
+    while not done.is_set():
+        reader.get_trading_stats()
+        reader.get_recent_log_summaries(50)
+        reader.get_logs_by_date_range(start_iso, end_iso, columns=['id', 'timestamp', 'current_price', 'ai_decision'])
+        with queries.get_lock():
+            queries.value += 1
+    reader.close()
+
+
+def bench_readers(n: int, readers: int = 4):
+    """대시보드 조회 프로세스가 도는 동안 봇의 save_analysis_log 커밋 지연 (읽기 연결 모드별)"""
+    print(f"👀 동시 조회 벤치마크 (쓰기 {n}건, 조회 프로세스 {readers}개)")
+    base = datetime(2025, 7, 1)
+    market_data = [sample_market_data(i) for i in range(100)]
+    ai_analysis = [sample_ai_analysis(i) for i in range(100)]
+    configs = [
+        ('조회 없음', None),
+        ('같은 DB, 읽기/쓰기 연결', dict()),
+        ('같은 DB, read_only', dict(read_only=True)),
+        ('스냅샷 (1초마다 백업)', dict(snapshot_interval=1.0)),
+    ]
+
+    for label, kwargs in configs:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'bench.db')
+            with quiet():
+                writer = TradingDatabase(path)
+                writer.save_analysis_logs([
+                    {
+                        'market_data': market_data[i % 100],
+                        'ai_analysis': ai_analysis[i % 100],
+                        'timestamp': (base + timedelta(minutes=5 * i)).isoformat(),
+                    }
+                    for i in range(2000)
+                ])
+            done = multiprocessing.Event()
+            queries = multiprocessing.Value('i', 0)
+            processes = []
+            for k in range(readers if kwargs is not None else 0):
+                # 스냅샷은 프로세스(대시보드)마다 따로 둔다
+                reader_kwargs = dict(kwargs, snapshot_path=os.path.join(tmp, f'snapshot{k}.db')) \
+                    if 'snapshot_interval' in kwargs else kwargs
+                processes.append(multiprocessing.Process(
+                    target=_dashboard_reader, args=(path, reader_kwargs, base.isoformat(), done, queries)))
+            for process in processes:
+                process.start()
+            time.sleep(0.5 if processes else 0)  # 조회 프로세스가 뜰 때까지 대기
+
+            latencies = []
+            with quiet():
+                for i in range(n):
+                    start = time.perf_counter()
+                    writer.save_analysis_log(market_data[i % 100], ai_analysis[i % 100],
+                                             (base + timedelta(minutes=5 * (2000 + i))).isoformat())
+                    latencies.append((time.perf_counter() - start) * 1000)
+            done.set()
+            for process in processes:
+                process.join()
+
+            latencies.sort()
+            p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+            print(f"  {label:<28} 쓰기 p50 {statistics.median(latencies):>6.2f}ms  p99 {p99:>6.2f}ms  "
+                  f"최대 {latencies[-1]:>7.2f}ms | 조회 {queries.value}회")
+            writer.close()
+
+
+BENCHMARKS = {
+    'connections': bench_connections,
+    'bulk': bench_bulk_insert,
+    'projection': bench_projection,
+    'event-loop': bench_event_loop,
+    'write-behind': bench_write_behind,
+    'stats': bench_stats,
+    'performance': bench_performance,
+    'streaming': bench_streaming,
+    'rows': bench_row_formats,
+    'frames': bench_frames,
+    'prices': bench_prices,
+    'predictions': bench_predictions,
+    'contexts': bench_contexts,
+    'search': bench_search,
+    'similar': bench_similar,
+    'readers': bench_readers,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TradingDatabase 마이크로 벤치마크")
+    parser.add_argument('names', nargs='*', metavar='name',
+                        help=f"실행할 벤치마크 (기본: 전체) - {', '.join(BENCHMARKS)}")
+    parser.add_argument('-n', type=int, default=1000, help="반복 횟수")
+    args = parser.parse_args()
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"알 수 없는 벤치마크: {', '.join(unknown)}")
+
+    for name in args.names or BENCHMARKS:
+        BENCHMARKS[name](args.n)
+        print()
+
+
+if __name__ == "__main__":
+    main()
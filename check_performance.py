@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🧮 성과 계산 엔진 정확성 검사
+Correctness check for the vectorized FIFO performance engine
+
+무작위 거래 이력(보유량을 넘는 매도, 같은 시각의 거래, 수수료 0 포함)을 만들어 performance.py 의
+벡터화 계산 결과를 매수 묶음을 deque 로 하나씩 소진하는 단순 FIFO 구현과 비교한다.
+TradingDatabase 경로(저장 → 배열 로드 → 기간 통계)도 임시 DB 에서 함께 확인한다.
+결과가 다르면 종료 코드 1로 끝난다.
+
+    python check_performance.py
+    python check_performance.py --cases 500 --seed 7
+"""
+
+import argparse
+import contextlib
+import io
+import math
+import os
+import random
+import sys
+import tempfile
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from database import TradingDatabase, to_epoch_ms
+from performance import AMOUNT_EPSILON, WINDOW_SUMS, TradeArrays, window_stats
+
+# (timestamp_ms, is_buy, price, amount, total_value, fee)
+Trade = Tuple[int, bool, float, float, float, float]
+
+
+def reference_fifo(trades: List[Trade]) -> List[Tuple[float, float, float]]:
+    """거래별 (실현 손익, 매칭 수량, 미매칭 수량) - 매수 묶음을 하나씩 소진하는 FIFO"""
+    lots = deque()  # [남은 수량, 단위 원가]
+    results = []
+    for _, is_buy, _, amount, total_value, fee in trades:
+        if is_buy:
+            if amount > 0:
+                lots.append([amount, (total_value + fee) / amount])
+            results.append((0.0, 0.0, 0.0))
+            continue
+        remaining, cost = amount, 0.0
+        while remaining > 1e-15 and lots:
+            take = min(remaining, lots[0][0])
+            cost += take * lots[0][1]
+            lots[0][0] -= take
+            remaining -= take
+            if lots[0][0] <= 1e-15:
+                lots.popleft()
+        matched = amount - remaining
+        if matched < AMOUNT_EPSILON:
+            matched, remaining = 0.0, amount
+        proceeds = (matched / amount) * (total_value - fee) if amount > 0 else 0.0
+        results.append((proceeds - cost if matched > 0 else 0.0, matched, remaining))
+    return results
+
+
+def reference_window(trades: List[Trade], fifo: List[Tuple[float, float, float]],
+                     start: Optional[int], end: Optional[int]) -> Dict:
+    """한 기간의 통계를 거래를 하나씩 걸러서 계산"""
+    stats = dict.fromkeys(WINDOW_SUMS, 0)
+    for trade, (pnl, matched, unmatched) in zip(trades, fifo):
+        ts, is_buy, _, _, total_value, fee = trade
+        if (start is not None and ts < start) or (end is not None and ts >= end):
+            continue
+        stats['total_trades'] += 1
+        stats['buy_count'] += is_buy
+        stats['sell_count'] += not is_buy
+        stats['closed_trades'] += matched > 0
+        stats['successful_trades'] += matched > 0 and pnl > 0
+        stats['total_profit_loss'] += pnl
+        stats['total_fee'] += fee
+        stats['turnover'] += total_value
+        stats['unmatched_amount'] += unmatched
+    return stats
+
+
+def random_trades(rng: random.Random, count: int) -> List[Trade]:
+    """무작위 거래 이력 (시간순)"""
+    trades, ts, price = [], 1_750_000_000_000, 148_000_000.0
+    for _ in range(count):
+        ts += rng.choice([0, 1000, 60_000, 3_600_000, 86_400_000])
+        price *= math.exp(rng.gauss(0, 0.02))
+        is_buy = rng.random() < 0.55
+        amount = rng.choice([0.0, rng.uniform(0.0001, 0.01), rng.uniform(0.0001, 0.05)])
+        total_value = amount * price
+        fee = rng.choice([0.0, total_value * 0.0005])
+        trades.append((ts, is_buy, price, amount, total_value, fee))
+    return trades
+
+
+def compare(expected: Dict, actual: Dict) -> List[str]:
+    """기간 통계 비교 (금액은 상대 오차 허용)"""
+    problems = []
+    for key in WINDOW_SUMS:
+        e, a = expected[key], actual[key]
+        if isinstance(e, float) or isinstance(a, float):
+            if not math.isclose(e, a, rel_tol=1e-7, abs_tol=1e-4):
+                problems.append(f"{key}: 기대 {e} / 실제 {a}")
+        elif e != a:
+            problems.append(f"{key}: 기대 {e} / 실제 {a}")
+    return problems
+
+
+def check_random(cases: int, seed: int) -> bool:
+    rng = random.Random(seed)
+    for case in range(cases):
+        trades = random_trades(rng, rng.randint(0, 200))
+        fifo = reference_fifo(trades)
+        first = trades[0][0] if trades else 0
+        last = trades[-1][0] if trades else 0
+        windows = {'all': (None, None), 'before': (None, first + (last - first) // 2)}
+        for k in range(5):
+            a, b = sorted(rng.randint(first - 1000, last + 1000) for _ in range(2))
+            windows[f'custom{k}'] = (a, b)
+        arrays = TradeArrays.from_rows(trades)
+        actual = window_stats(arrays, windows)
+        for name, (start, end) in windows.items():
+            problems = compare(reference_window(trades, fifo, start, end), actual[name])
+            if problems:
+                print(f"❌ case {case} window {name} ({len(trades)} trades)")
+                for problem in problems:
+                    print(f"     {problem}")
+                return False
+    print(f"✅ 무작위 이력 {cases}건: 벡터화 결과 == 참조 FIFO")
+    return True
+
+
+def check_database(seed: int) -> bool:
+    """저장 → load_trade_arrays → analyze_performance_windows 경로 확인"""
+    rng = random.Random(seed)
+    now = datetime(2025, 7, 31, 12, 0)
+    rows = []
+    for i in range(300):
+        trade_time = now - timedelta(minutes=rng.randint(1, 60 * 24 * 60))
+        price = rng.uniform(140_000_000, 160_000_000)
+        amount = rng.uniform(0.0001, 0.01)
+        rows.append({
+            'trade_type': rng.choice(['buy', 'buy', 'sell']), 'price': price, 'amount': amount,
+            'total_value': price * amount, 'fee': price * amount * 0.0005,
+            'success': rng.random() > 0.1, 'trade_time': trade_time.isoformat(),
+        })
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        db = TradingDatabase(os.path.join(tmp, 'performance.db'))
+        db.save_trades(rows)
+        actual = db.analyze_performance_windows(end=now)
+        db.close()
+
+    trades = sorted((
+        (to_epoch_ms(r['trade_time']), r['trade_type'] == 'buy', r['price'], r['amount'], r['total_value'], r['fee'])
+        for r in rows if r['success']
+    ), key=lambda trade: trade[0])  # 같은 시각이면 저장(id) 순서
+    fifo = reference_fifo(trades)
+    end_ms = to_epoch_ms(now)
+    ok = True
+    for name, days in (('1d', 1), ('7d', 7), ('30d', 30), ('all', None)):
+        start = None if days is None else end_ms - days * 86_400_000
+        problems = compare(reference_window(trades, fifo, start, None if days is None else end_ms), actual[name])
+        print(f"{'❌' if problems else '✅'} TradingDatabase.analyze_performance_windows [{name}]")
+        for problem in problems:
+            print(f"     {problem}")
+        ok = ok and not problems
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="성과 계산 엔진 정확성 검사")
+    parser.add_argument('--cases', type=int, default=200, help="무작위 이력 수")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    ok = check_random(args.cases, args.seed)
+    ok = check_database(args.seed) and ok
+    print("성과 계산이 참조 구현과 일치합니다." if ok else "성과 계산이 참조 구현과 다릅니다.")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🔎 TradingDatabase 쿼리 플랜 회귀 검사
+Query-plan regression check for TradingDatabase read methods
+
+각 조회 메서드를 실제로 호출하면서 실행되는 SELECT 문을 가로채고, EXPLAIN QUERY PLAN 으로
+인덱스를 쓰는지 확인한다. 인덱스 없이 테이블 전체를 훑거나 ORDER BY 를 위해 임시 B-트리를
+만드는 쿼리가 있으면 종료 코드 1로 끝난다.
+
+    python check_query_plans.py                       # 새 임시 DB로 검사
+    python check_query_plans.py --db trading_enhanced.db   # 기존 DB의 복사본으로 검사
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import re
+import shutil
+import sqlite3
+import sys
+import tempfile
+from typing import Dict, Iterator, List, Tuple
+
+from database import TradingDatabase
+
+# (메서드 이름, 인자) - 조회 메서드마다 대표 호출 하나 이상
+READ_CALLS: List[Tuple[str, tuple]] = [
+    ('get_recent_logs', (10,)),
+    ('get_logs_by_date_range', ('2025-07-01', '2025-07-08')),
+    ('get_trades_by_date', ('2025-07-01', '2025-07-08')),
+    ('get_trades_by_date', ('2025-07-01',)),
+    ('get_portfolio_history', (30,)),
+    ('get_price_series', ('2025-07-01', '2025-07-08')),
+    ('get_price_series', ('2025-07-01', '2025-07-02', 500, 'tick')),
+    ('get_trading_stats', ()),
+    ('get_prediction_accuracy', ()),
+    ('get_change_tokens', ()),
+    ('analyze_trading_performance', (7,)),
+    ('analyze_performance_windows', ()),
+    ('get_recent_reflections', (5,)),
+    ('search', ('다이버전스',)),
+    ('search', ('RSI 과매수', 'self_reflections')),
+    ('get_market_context', ('2025-07-02T12:00:00',)),
+    ('get_market_contexts', (['2025-07-01T09:00:00', '2025-07-05T18:30:00'],)),
+    ('find_similar_contexts', (5,)),
+    ('iter_logs', ()),
+    ('iter_logs', (None, '2025-07-01', '2025-07-08')),
+    ('iter_trades', (None, '2025-07-01')),
+    ('iter_portfolio_snapshots', ()),
+    ('iter_reflections', ()),
+    ('load_trades_frame', ('2025-07-01', '2025-07-08')),
+    ('load_logs_array', ()),
+]
+
+# 인덱스 없이 테이블 전체를 읽는 단계 / 정렬을 위해 임시 B-트리를 만드는 단계
+FULL_SCAN = re.compile(r'^SCAN (\w+)$')
+TEMP_SORT = re.compile(r'USE TEMP B-TREE FOR (?:RIGHT PART OF )?ORDER BY')
+
+# 전문 검색(MATCH) 단계 - 일치한 행만 관련도(bm25) 순으로 정렬하므로 임시 B-트리가 허용된다
+FTS_MATCH = re.compile(r'VIRTUAL TABLE INDEX \d+:M')
+
+# 행 수가 이력과 무관하게 작게 유지되는 테이블 (전체를 읽어도 문제 없음, sqlite_master 는 스키마 목록)
+BOUNDED_TABLES = {'trading_stats', 'sqlite_sequence', 'table_changes', 'sqlite_master'}
+
+
+def capture_statements(db: TradingDatabase, method: str, args: tuple) -> List[str]:
+    """메서드 호출 중 실행된 SELECT 문 (파라미터가 채워진 형태) 수집"""
+    statements = []
+
+    def trace(sql: str):
+        if sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+            statements.append(sql)
+
+    conn = db._thread_connection()
+    conn.set_trace_callback(trace)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = getattr(db, method)(*args)
+            if isinstance(result, Iterator):
+                for _ in result:  # 스트리밍 메서드는 끝까지 읽어야 쿼리가 실행된다
+                    pass
+    finally:
+        conn.set_trace_callback(None)
+    return statements
+
+
+def is_problem(detail: str, ranked: bool = False) -> bool:
+    """인덱스 없는 전체 스캔(작은 테이블 제외) 또는 정렬용 임시 B-트리 단계인지 (ranked: 전문 검색 결과 정렬)"""
+    scan = FULL_SCAN.match(detail)
+    if scan and scan.group(1) not in BOUNDED_TABLES:
+        return True
+    return not ranked and bool(TEMP_SORT.search(detail))
+
+
+def plan_problems(conn: sqlite3.Connection, sql: str) -> Tuple[List[str], List[str]]:
+    """EXPLAIN QUERY PLAN 결과와 그 중 문제가 되는 단계 반환"""
+    details = [row[3] for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}')]
+    ranked = any(FTS_MATCH.search(d) for d in details)
+    problems = [d for d in details if is_problem(d, ranked)]
+    return details, problems
+
+
+def check(db_path: str, verbose: bool = False) -> bool:
+    with contextlib.redirect_stdout(io.StringIO()):
+        db = TradingDatabase(db_path)
+    explain_conn = sqlite3.connect(db_path)
+    ok = True
+    seen: Dict[str, bool] = {}
+    try:
+        for method, args in READ_CALLS:
+            for sql in capture_statements(db, method, args):
+                normalized = ' '.join(sql.split())
+                if normalized in seen:
+                    continue
+                details, problems = plan_problems(explain_conn, sql)
+                seen[normalized] = not problems
+                status = '❌' if problems else '✅'
+                print(f"{status} {method}{args}")
+                if problems or verbose:
+                    print(f"     {normalized}")
+                    for detail in details:
+                        marker = '  <-- ' if detail in problems else ''
+                        print(f"       {detail}{marker}")
+                ok = ok and not problems
+    finally:
+        explain_conn.close()
+        db.close()
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TradingDatabase 쿼리 플랜 회귀 검사")
+    parser.add_argument('--db', help="검사할 기존 DB (복사본에서 검사하므로 원본은 바뀌지 않는다)")
+    parser.add_argument('-v', '--verbose', action='store_true', help="통과한 쿼리의 플랜도 출력")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'plans.db')
+        if args.db:
+            shutil.copyfile(args.db, db_path)
+        ok = check(db_path, args.verbose)
+
+    print("모든 조회 쿼리가 인덱스를 사용합니다." if ok else "인덱스를 사용하지 않는 쿼리가 있습니다.")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+📊 거래 통계 트리거 정확성 검사
+Correctness check for the trigger-maintained trading_stats table
+
+임시 DB 에 분석 로그와 거래를 저장한 뒤 무작위 갱신(성공 여부·매매 종류·수수료·AI 결정 변경)과
+삭제, 월별 아카이브 이동을 섞어 실행하고, 단계마다 trading_stats (get_trading_stats) 를 원본 테이블
+전체 집계와 비교한다 (TradingDatabase.verify_stats). 결과가 다르면 종료 코드 1로 끝난다.
+
+    python check_stats.py
+    python check_stats.py --rounds 20 --seed 7
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+from database import TradingDatabase
+
+# 무작위로 고르는 변경 (조건의 {m} 에 2~19 사이 값이 들어간다)
+MUTATIONS = (
+    "UPDATE actual_trades SET success = 1 - success WHERE id % {m} = 0",
+    "UPDATE actual_trades SET trade_type = CASE trade_type WHEN 'buy' THEN 'sell' ELSE 'buy' END WHERE id % {m} = 1",
+    "UPDATE actual_trades SET fee = fee * 2 WHERE id % {m} = 2",
+    "DELETE FROM actual_trades WHERE id % {m} = 3",
+    "UPDATE trading_logs SET ai_decision = 'HOLD' WHERE id % {m} = 0",
+    "UPDATE trading_logs SET ai_decision = 'SELL' WHERE id % {m} = 1",
+    "DELETE FROM trading_logs WHERE id % {m} = 2",
+)
+
+
+def save_batch(db: TradingDatabase, rng: random.Random, start: datetime, size: int):
+    """분석 로그와 거래 size 건씩 저장"""
+    db.save_analysis_logs([
+        {
+            'market_data': {'current_price': 148_000_000.0},
+            'ai_analysis': {'decision': rng.choice(['BUY', 'SELL', 'HOLD']), 'confidence': 'MEDIUM'},
+            'timestamp': (start + timedelta(minutes=5 * i)).isoformat(),
+        }
+        for i in range(size)
+    ])
+    db.save_trades([
+        {
+            'trade_type': rng.choice(['buy', 'sell']), 'price': 148_000_000.0, 'amount': 0.001,
+            'total_value': 148_000.0, 'fee': rng.uniform(10, 100), 'success': rng.random() > 0.1,
+            'trade_time': (start + timedelta(minutes=7 * i)).isoformat(),
+        }
+        for i in range(size)
+    ])
+
+
+def check(rounds: int, seed: int) -> bool:
+    rng = random.Random(seed)
+    start = datetime(2025, 5, 1)
+    with tempfile.TemporaryDirectory() as tmp:
+        with contextlib.redirect_stdout(io.StringIO()):
+            db = TradingDatabase(os.path.join(tmp, 'stats.db'))
+        ok = True
+        for number in range(rounds):
+            with contextlib.redirect_stdout(io.StringIO()):
+                save_batch(db, rng, start + timedelta(days=10 * number), rng.randint(50, 300))
+                with db._connection() as conn:
+                    for sql in rng.sample(MUTATIONS, 3):
+                        conn.execute(sql.format(m=rng.randint(2, 19)))
+                if number == rounds // 2:
+                    # 옮긴 행도 통계에 남아야 한다
+                    db.archive_old_rows(30, now=start + timedelta(days=10 * number))
+            mismatches = db.verify_stats()
+            if mismatches:
+                print(f"❌ {number + 1}단계: trading_stats != 전체 집계")
+                for key, values in mismatches.items():
+                    print(f"     {key}: 통계 {values['stats']} / 집계 {values['expected']}")
+                ok = False
+                break
+        db.close()
+    if ok:
+        print(f"✅ 무작위 저장·갱신·삭제·아카이브 {rounds}단계: trading_stats == 전체 집계")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="거래 통계 트리거 정확성 검사")
+    parser.add_argument('--rounds', type=int, default=10, help="저장·변경 반복 횟수")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    ok = check(args.rounds, args.seed)
+    print("거래 통계가 전체 집계와 일치합니다." if ok else "거래 통계가 전체 집계와 다릅니다.")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+🧊 매매 이력 컬럼형 파일(Parquet / Feather) 증분 내보내기
+Incremental columnar export of trading history
+
+테이블별로 마지막으로 내보낸 id (high-water mark) 를 내보내기 디렉터리의 _export_state.json 에
+기록해 두고, 다음 실행에서는 그 이후에 저장된 행만 키셋 이터레이터로 읽어 내보낸다.
+파일은 분석 시각(LOCAL_TIMEZONE 날짜) 기준 hive 형식으로 나뉜다.
+
+    <export_dir>/trading_logs/date=2025-07-01/part-00000000000000000001-00000000000000000288.parquet
+
+컬럼은 명시적인 타입(정수·실수·UTC 타임스탬프·문자열)으로 쓰며, 분석 로그는 JSON 문서 대신
+EXTRACTED_FIELDS 로 뽑아 둔 평탄한 컬럼을 내보낸다 (include_payloads=True 이면 원본 JSON 도 포함).
+
+    import pyarrow.dataset as ds
+    logs = ds.dataset('export/trading_logs', format='parquet', partitioning='hive').to_table()
+
+id 기준이므로 이미 내보낸 행을 나중에 수정한 내용은 다시 내보내지 않는다.
+"""
+
+import json
+import logging
+import os
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+from database import EXTRACTED_FIELDS, LOCAL_TIMEZONE, PAYLOAD_COLUMNS, TradingDatabase
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as parquet
+except ImportError:  # pyarrow 는 내보내기에만 필요한 선택 사항
+    pa = None
+
+logger = logging.getLogger(__name__)
+
+EXPORT_STATE_FILE = '_export_state.json'
+EXPORT_FORMATS = {'parquet': '.parquet', 'feather': '.feather'}
+
+# SQLite 컬럼 타입 → Arrow 타입 이름 (timestamp: epoch 밀리초 → UTC 타임스탬프)
+_EXTRACTED_TYPES = {'REAL': 'float64', 'TEXT': 'string', 'JSON': 'string'}
+
+# 테이블별 내보내기 컬럼 (이름, 타입)
+EXPORT_COLUMNS = {
+    'trading_logs': [
+        ('id', 'int64'),
+        ('timestamp', 'string'),
+        ('timestamp_ms', 'timestamp'),
+        ('created_at_ms', 'timestamp'),
+        ('current_price', 'float64'),
+        ('krw_balance', 'float64'),
+        ('btc_balance', 'float64'),
+        ('total_portfolio_value', 'float64'),
+        ('ai_decision', 'dictionary'),
+        ('ai_confidence', 'dictionary'),
+        ('ai_reason', 'string'),
+        ('analysis_type', 'dictionary'),
+    ] + [(name, _EXTRACTED_TYPES[column_type]) for name, (column_type, _, _) in EXTRACTED_FIELDS.items()],
+    'actual_trades': [
+        ('id', 'int64'),
+        ('timestamp', 'string'),
+        ('timestamp_ms', 'timestamp'),
+        ('created_at_ms', 'timestamp'),
+        ('trade_type', 'dictionary'),
+        ('price', 'float64'),
+        ('amount', 'float64'),
+        ('total_value', 'float64'),
+        ('fee', 'float64'),
+        ('order_id', 'string'),
+        ('success', 'bool'),
+        ('error_message', 'string'),
+    ],
+}
+
+# include_payloads=True 일 때 분석 로그에 추가하는 원본 JSON 컬럼
+PAYLOAD_EXPORT_COLUMNS = [('investment_status_json', 'string')] + [(name, 'string') for name in PAYLOAD_COLUMNS]
+
+
+def _arrow_type(type_name: str):
+    if type_name == 'timestamp':
+        return pa.timestamp('ms', tz='UTC')
+    if type_name == 'dictionary':
+        return pa.dictionary(pa.int32(), pa.string())
+    return getattr(pa, 'bool_' if type_name == 'bool' else type_name)()
+
+
+def _arrow_table(rows: List[Dict], columns: Sequence[tuple]):
+    """dict 행 목록을 지정한 타입의 Arrow 테이블로 변환"""
+    arrays = []
+    for name, type_name in columns:
+        values = [row.get(name) for row in rows]
+        if type_name == 'bool':
+            values = [None if value is None else bool(value) for value in values]
+        if type_name == 'dictionary':
+            arrays.append(pa.array(values, type=pa.string()).dictionary_encode())
+        else:
+            arrays.append(pa.array(values, type=_arrow_type(type_name)))
+    return pa.Table.from_arrays(arrays, schema=pa.schema([(name, _arrow_type(t)) for name, t in columns]))
+
+
+def _partition_date(timestamp_ms: Optional[int]) -> str:
+    """행이 들어갈 날짜 파티션 (LOCAL_TIMEZONE 날짜, 시간이 없으면 unknown)"""
+    if timestamp_ms is None:
+        return 'unknown'
+    return datetime.fromtimestamp(timestamp_ms / 1000, LOCAL_TIMEZONE).strftime('%Y-%m-%d')
+
+
+def load_export_state(export_dir: str) -> Dict:
+    """내보내기 상태 (테이블별 마지막 id, 누적 행 수) - 없으면 빈 dict"""
+    path = os.path.join(export_dir, EXPORT_STATE_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _save_export_state(export_dir: str, state: Dict):
+    """상태 파일을 임시 파일에 쓴 뒤 교체 (중간에 멈춰도 이전 상태가 남는다)"""
+    path = os.path.join(export_dir, EXPORT_STATE_FILE)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def _write_part(table, path: str, file_format: str, compression: str):
+    """한 파티션 조각 파일 쓰기 (임시 파일에 쓴 뒤 교체)"""
+    with open(path + '.tmp', 'wb') as sink:
+        if file_format == 'parquet':
+            parquet.write_table(table, sink, compression=compression)
+        else:
+            feather.write_feather(table, sink, compression=compression)
+    os.replace(path + '.tmp', path)
+
+
+def export_columnar(db: TradingDatabase, export_dir: str,
+                    tables: Sequence[str] = ('trading_logs', 'actual_trades'),
+                    file_format: str = 'parquet', compression: str = 'zstd',
+                    batch_size: int = 50000, include_payloads: bool = False) -> Dict[str, int]:
+    """지난 내보내기 이후 새로 저장된 행만 날짜별 컬럼형 파일로 내보내고 테이블별 행 수 반환
+
+    batch_size 건씩 읽어 날짜별 조각 파일로 쓰고, 조각마다 상태 파일의 high-water mark 를 갱신한다.
+    파일 이름이 id 범위로 정해지므로 상태를 기록하기 전에 멈춘 뒤 다시 실행하면 같은 파일을 덮어쓴다.
+    아카이브 파티션으로 옮긴 행도 id 순서대로 함께 읽는다.
+    """
+    if pa is None:
+        raise ImportError("컬럼형 내보내기에는 pyarrow 가 필요합니다 (pip install pyarrow)")
+    if file_format not in EXPORT_FORMATS:
+        raise ValueError(f"지원하지 않는 형식: {file_format}")
+    unknown = [table for table in tables if table not in EXPORT_COLUMNS]
+    if unknown:
+        raise ValueError(f"내보낼 수 없는 테이블: {', '.join(unknown)}")
+
+    os.makedirs(export_dir, exist_ok=True)
+    state = load_export_state(export_dir)
+    exported = {}
+    for table in tables:
+        columns = EXPORT_COLUMNS[table] + (PAYLOAD_EXPORT_COLUMNS if include_payloads and table == 'trading_logs' else [])
+        table_state = state.setdefault(table, {'last_id': 0, 'rows': 0})
+        if table_state.get('format', file_format) != file_format:
+            raise ValueError(f"{table} 은 이미 {table_state['format']} 형식으로 내보냈습니다 (다른 디렉터리를 쓰세요)")
+        iterate = db.iter_logs if table == 'trading_logs' else db.iter_trades
+        count = 0
+        for rows in iterate(after_id=table_state['last_id'], batch_size=batch_size,
+                            columns=[name for name, _ in columns], batches=True):
+            by_date = defaultdict(list)
+            for row in rows:
+                by_date[_partition_date(row.get('timestamp_ms'))].append(row)
+            for day, day_rows in by_date.items():
+                directory = os.path.join(export_dir, table, f'date={day}')
+                os.makedirs(directory, exist_ok=True)
+                name = f"part-{day_rows[0]['id']:020d}-{day_rows[-1]['id']:020d}{EXPORT_FORMATS[file_format]}"
+                _write_part(_arrow_table(day_rows, columns), os.path.join(directory, name), file_format, compression)
+            count += len(rows)
+            table_state.update({
+                'last_id': rows[-1]['id'],
+                'rows': table_state['rows'] + len(rows),
+                'format': file_format,
+                'updated_at': datetime.now().isoformat(timespec='seconds'),
+            })
+            _save_export_state(export_dir, state)
+        exported[table] = count
+    logger.info("컬럼형 내보내기 완료 (%s): %s", file_format, ', '.join(f"{t} {n}건" for t, n in exported.items()))
+    return exported
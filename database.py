@@ -1,352 +1,2870 @@
+import atexit
+import logging
+import os
+import queue
+import re
 import sqlite3
 import json
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from urllib.request import pathname2url
 
-class TradingDatabase:
-    def __init__(self, db_path: str = "trading_data.db"):
-        """매매 데이터 SQLite 데이터베이스 초기화"""
+import numpy as np
+
+from frames import collect_columns, column_kind, source_columns, to_dataframe, to_structured
+from performance import TRADE_ARRAY_COLUMNS, TradeArrays, window_stats
+from predictions import PREDICTION_HORIZONS, confidence_value, score_predictions
+from records import Rows, check_row_format, record_class
+from similarity import (SIMILARITY_FEATURES, SIMILARITY_SOURCE_COLUMNS, feature_matrix, feature_scale,
+                        feature_sums, nearest)
+
+try:
+    import zstandard
+except ImportError:  # zstd 는 선택 사항 (없으면 zlib 사용)
+    zstandard = None
+
+# 라이브러리 메시지는 모두 logging 으로 보낸다 (봇 루프·대시보드에서 print 비용이 없고, CLI 는 db_tools 가 출력을 설정한다)
+logger = logging.getLogger(__name__)
+
+JOURNAL_MODES = ('DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF')
+SYNCHRONOUS_LEVELS = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+CHECKPOINT_MODES = ('PASSIVE', 'FULL', 'RESTART', 'TRUNCATE')
+
+# 시간대 정보가 없는 시각 (timestamp 텍스트, 날짜 범위 인자) 의 기준 시간대 - 봇은 한국 시간으로 기록한다.
+# 실행하는 서버의 시간대와 무관하게 같은 epoch 값이 나오도록 고정 오프셋을 쓴다 (한국은 일광 절약 시간이 없다).
+LOCAL_TIMEZONE = timezone(timedelta(hours=9), 'KST')
+LOCAL_OFFSET_SECONDS = int(LOCAL_TIMEZONE.utcoffset(None).total_seconds())
+
+# 정수 epoch 밀리초 시간 컬럼 (timestamp: LOCAL_TIMEZONE ISO 텍스트, created_at: UTC 텍스트)
+EPOCH_COLUMNS = {
+    'trading_logs': {'timestamp_ms': 'INTEGER', 'created_at_ms': 'INTEGER'},
+    'actual_trades': {'timestamp_ms': 'INTEGER', 'created_at_ms': 'INTEGER'},
+}
+
+# 쓰기 시점에 JSON 문서에서 뽑아 trading_logs 컬럼으로 저장하는 필드
+# 컬럼 -> (타입, 원본 문서, 키 경로 후보들). JSON 타입은 하위 문서를 JSON 텍스트로 저장한다.
+EXTRACTED_FIELDS = {
+    'high_24h': ('REAL', 'market_data', [('daily_data_summary', 'high_24h')]),
+    'low_24h': ('REAL', 'market_data', [('daily_data_summary', 'low_24h')]),
+    'volume_24h': ('REAL', 'market_data', [('daily_data_summary', 'volume_24h')]),
+    'price_change_24h': ('REAL', 'market_data', [('daily_data_summary', 'price_change_24h')]),
+    'orderbook_spread': ('REAL', 'market_data', [('market_indicators', 'orderbook_spread')]),
+    'market_sentiment': ('TEXT', 'market_data', [('market_indicators', 'market_sentiment')]),
+    'fear_greed_value': ('REAL', 'market_data', [('fear_greed_index', 0, 'value'), ('fear_greed_index', 'value')]),
+    'ai_score': ('REAL', 'ai_analysis', [('score',)]),
+    'krw_to_invest_pct': ('REAL', 'ai_analysis', [('trading_percentage', 'krw_to_invest')]),
+    'btc_to_sell_pct': ('REAL', 'ai_analysis', [('trading_percentage', 'btc_to_sell')]),
+    'technical_indicators_json': ('JSON', 'market_data', [('technical_indicators',)]),
+    'fear_greed_json': ('JSON', 'market_data', [('fear_greed_index',)]),
+}
+
+ANALYSIS_LOG_COLUMNS = (
+    'timestamp', 'current_price', 'krw_balance', 'btc_balance',
+    'total_portfolio_value', 'investment_status_json',
+    'ai_decision', 'ai_reason', 'ai_confidence',
+    'ai_analysis_full_json', 'market_data_json', 'analysis_type',
+    'created_at', 'timestamp_ms', 'created_at_ms',
+) + tuple(EXTRACTED_FIELDS)
+
+# 목록 화면용 trading_logs 컬럼 (대용량 JSON 컬럼 제외)
+LOG_SUMMARY_COLUMNS = (
+    'id', 'timestamp', 'timestamp_ms', 'current_price', 'krw_balance', 'btc_balance',
+    'total_portfolio_value', 'ai_decision', 'ai_confidence', 'ai_reason', 'ai_score',
+    'analysis_type', 'created_at',
+)
+
+INSERT_ANALYSIS_LOG_SQL = f'''
+    INSERT INTO trading_logs ({', '.join(ANALYSIS_LOG_COLUMNS)})
+    VALUES ({', '.join('?' * len(ANALYSIS_LOG_COLUMNS))})
+'''
+
+INSERT_TRADE_SQL = '''
+    INSERT INTO actual_trades (
+        timestamp, trade_type, price, amount, total_value,
+        fee, order_id, success, error_message,
+        created_at, timestamp_ms, created_at_ms
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+# 채점 결과 컬럼 (predictions.score_predictions 결과 이름과 같다)
+PREDICTION_SCORE_COLUMNS = tuple(
+    f'{prefix}_{name}' for prefix in ('actual_price', 'prediction_correct') for name in PREDICTION_HORIZONS
+) + ('accuracy_score',)
+
+INSERT_PREDICTION_SQL = f'''
+    INSERT OR IGNORE INTO prediction_accuracy (
+        log_id, prediction_date, prediction_ms, ai_prediction, ai_confidence, predicted_direction,
+        {', '.join(PREDICTION_SCORE_COLUMNS)}
+    ) VALUES ({', '.join('?' * (6 + len(PREDICTION_SCORE_COLUMNS)))})
+'''
+
+INSERT_PORTFOLIO_SNAPSHOT_SQL = '''
+    INSERT OR REPLACE INTO portfolio_snapshots (
+        date, krw_balance, btc_balance, btc_avg_price,
+        total_value, profit_loss, profit_loss_percent
+    ) VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+
+# init_database 가 생성·관리하는 인덱스 (이름 -> 정의)
+MANAGED_INDEXES = {
+    'idx_trading_logs_created_at': 'trading_logs (created_at)',
+    'idx_trading_logs_timestamp_ms': 'trading_logs (timestamp_ms)',
+    'idx_trading_logs_ai_decision': 'trading_logs (ai_decision)',
+    'idx_actual_trades_timestamp_ms': 'actual_trades (timestamp_ms)',
+    'idx_actual_trades_success_timestamp_ms': 'actual_trades (success, timestamp_ms)',
+    'idx_self_reflections_created_at': 'self_reflections (created_at)',
+}
+
+# 더 이상 쓰지 않아 init_database 가 제거하는 예전 관리 인덱스
+RETIRED_INDEXES = (
+    'idx_trading_logs_timestamp',
+    'idx_actual_trades_created_at',
+    'idx_actual_trades_success_created_at',
+)
+
+# get_change_tokens 가 기본으로 돌려주는 테이블 (모두 AUTOINCREMENT id, table_changes 카운터 트리거가 붙는다)
+CHANGE_TOKEN_TABLES = ('trading_logs', 'actual_trades', 'portfolio_snapshots', 'self_reflections',
+                       'prediction_accuracy')
+
+# 스키마 마이그레이션 (버전, 설명) - 버전 N 은 TradingDatabase._migrate_vN 이 적용하고 PRAGMA user_version 에 기록한다
+MIGRATIONS = (
+    (1, '기본 테이블, epoch·추출 컬럼, 압축 사전, 아카이브 목록, 거래 통계'),
+    (2, '예측 정확도·시장 상황·외부 이벤트·전략 성과 테이블'),
+    (3, '가격 틱과 1분/1시간/1일 캔들'),
+    (4, '예측 정확도 채점 기준 시각과 로그별 유일 인덱스'),
+    (5, 'AI 판단 근거·자기반성 전문 검색 (FTS5)'),
+    (6, '테이블별 수정·삭제 카운터 (변경 토큰)'),
+)
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+# load_*_frame / load_*_array 의 기본 컬럼 (시간은 timestamp / created_at 으로 변환되므로 epoch 컬럼 제외)
+FRAME_COLUMNS = {
+    'actual_trades': (
+        'id', 'timestamp', 'trade_type', 'price', 'amount', 'total_value', 'fee',
+        'order_id', 'success', 'error_message', 'created_at',
+    ),
+    'trading_logs': tuple(column for column in LOG_SUMMARY_COLUMNS if column != 'timestamp_ms'),
+}
+
+# 월별 아카이브 파일로 옮길 수 있는 테이블 (timestamp_ms 기준으로 나눈다)
+ARCHIVE_TABLES = ('trading_logs', 'actual_trades')
+
+# 키 범위의 양 끝 (제한 없음)
+MIN_KEY = -2 ** 63
+MAX_KEY = 2 ** 63 - 1
+
+# analyze_performance_windows 기본 기간 (None 은 전체 기간)
+PERFORMANCE_WINDOWS = {
+    '1d': timedelta(days=1),
+    '7d': timedelta(days=7),
+    '30d': timedelta(days=30),
+    'all': None,
+}
+
+# trading_stats 를 증분 갱신하는 트리거 (scope='trade': 성공한 거래의 trade_type 별 건수·수수료 합,
+# scope='ai_decision': ai_decision 별 로그 건수)
+_TRADE_STATS_ADD = (
+    "INSERT INTO trading_stats (scope, key, count, total) "
+    "SELECT 'trade', NEW.trade_type, 1, IFNULL(NEW.fee, 0) WHERE NEW.success = 1 "
+    "ON CONFLICT(scope, key) DO UPDATE SET count = count + 1, total = total + excluded.total;"
+)
+_TRADE_STATS_REMOVE = (
+    "UPDATE trading_stats SET count = count - 1, total = total - IFNULL(OLD.fee, 0) "
+    "WHERE OLD.success = 1 AND scope = 'trade' AND key = OLD.trade_type;"
+)
+_DECISION_STATS_ADD = (
+    "INSERT INTO trading_stats (scope, key, count) VALUES ('ai_decision', NEW.ai_decision, 1) "
+    "ON CONFLICT(scope, key) DO UPDATE SET count = count + 1;"
+)
+_DECISION_STATS_REMOVE = (
+    "UPDATE trading_stats SET count = count - 1 "
+    "WHERE scope = 'ai_decision' AND key = OLD.ai_decision;"
+)
+STATS_TRIGGERS = {
+    'trg_actual_trades_stats_insert': f'AFTER INSERT ON actual_trades BEGIN {_TRADE_STATS_ADD} END',
+    'trg_actual_trades_stats_delete': f'AFTER DELETE ON actual_trades BEGIN {_TRADE_STATS_REMOVE} END',
+    'trg_actual_trades_stats_update': (
+        f'AFTER UPDATE OF success, trade_type, fee ON actual_trades '
+        f'BEGIN {_TRADE_STATS_REMOVE} {_TRADE_STATS_ADD} END'
+    ),
+    'trg_trading_logs_stats_insert': f'AFTER INSERT ON trading_logs BEGIN {_DECISION_STATS_ADD} END',
+    'trg_trading_logs_stats_delete': f'AFTER DELETE ON trading_logs BEGIN {_DECISION_STATS_REMOVE} END',
+    'trg_trading_logs_stats_update': (
+        f'AFTER UPDATE OF ai_decision ON trading_logs '
+        f'BEGIN {_DECISION_STATS_REMOVE} {_DECISION_STATS_ADD} END'
+    ),
+}
+
+# 테이블별 trading_stats 집계 쿼리 ({schema}: main 또는 아카이브 별칭, {condition}: 추가 조건)
+STATS_AGGREGATE_SQL = {
+    'actual_trades': "SELECT 'trade', trade_type, COUNT(*), IFNULL(SUM(fee), 0) FROM {schema}.actual_trades "
+                     "WHERE success = 1 AND {condition} GROUP BY trade_type",
+    'trading_logs': "SELECT 'ai_decision', ai_decision, COUNT(*), 0 FROM {schema}.trading_logs "
+                    "WHERE {condition} GROUP BY ai_decision",
+}
+
+# 집계 행 (scope, key, count, total) 을 trading_stats 에 더하기
+ADD_STATS_SQL = (
+    "INSERT INTO trading_stats (scope, key, count, total) VALUES (?, ?, ?, ?) "
+    "ON CONFLICT(scope, key) DO UPDATE SET count = count + excluded.count, total = total + excluded.total"
+)
+
+# 가격 캔들 해상도 (이름 → 구간 길이 ms, 세밀한 것부터) - 구간은 UTC epoch 기준으로 나눈다
+CANDLE_RESOLUTIONS = {'1m': 60_000, '1h': 3_600_000, '1d': 86_400_000}
+
+# get_price_series 결과 컬럼 (틱 해상도는 open = high = low = close = 가격, ticks = 1)
+PRICE_SERIES_COLUMNS = ('timestamp_ms', 'open', 'high', 'low', 'close', 'ticks')
+
+# backfill_price_ticks 가 분석 로그에서 읽는 컬럼 (id 다음 순서가 price_ticks 컬럼 순서)
+PRICE_TICK_LOG_COLUMNS = ('id', 'timestamp_ms', 'current_price', 'high_24h', 'low_24h', 'volume_24h')
+
+INSERT_PRICE_TICK_SQL = (
+    "INSERT OR IGNORE INTO price_ticks (timestamp_ms, price, high_24h, low_24h, volume_24h) "
+    "VALUES (?, ?, ?, ?, ?)"
+)
+
+# 틱 하나를 해상도별 캔들에 반영 (늦게 들어온 틱도 open/close 를 시각 기준으로 맞춘다)
+_CANDLE_UPSERT = (
+    "INSERT INTO price_candles (resolution, bucket_ms, open, high, low, close, open_ms, close_ms, ticks) "
+    "VALUES ('{name}', NEW.timestamp_ms - NEW.timestamp_ms % {ms}, NEW.price, NEW.price, NEW.price, NEW.price, "
+    "NEW.timestamp_ms, NEW.timestamp_ms, 1) "
+    "ON CONFLICT(resolution, bucket_ms) DO UPDATE SET "
+    "open = CASE WHEN excluded.open_ms < open_ms THEN excluded.open ELSE open END, "
+    "open_ms = MIN(open_ms, excluded.open_ms), "
+    "high = MAX(high, excluded.high), low = MIN(low, excluded.low), "
+    "close = CASE WHEN excluded.close_ms >= close_ms THEN excluded.close ELSE close END, "
+    "close_ms = MAX(close_ms, excluded.close_ms), ticks = ticks + 1;"
+)
+PRICE_TRIGGERS = {
+    'trg_trading_logs_price_tick': (
+        'AFTER INSERT ON trading_logs WHEN NEW.timestamp_ms IS NOT NULL AND NEW.current_price > 0 '
+        'BEGIN INSERT OR IGNORE INTO price_ticks (timestamp_ms, price, high_24h, low_24h, volume_24h) '
+        'VALUES (NEW.timestamp_ms, NEW.current_price, NEW.high_24h, NEW.low_24h, NEW.volume_24h); END'
+    ),
+    'trg_price_ticks_candles': 'AFTER INSERT ON price_ticks BEGIN ' + ' '.join(
+        _CANDLE_UPSERT.format(name=name, ms=ms) for name, ms in CANDLE_RESOLUTIONS.items()
+    ) + ' END',
+}
+
+# 전문 검색 대상 (테이블 → 색인 컬럼) - 색인은 {테이블}_fts 외부 콘텐츠 FTS5 테이블이며 트리거로 맞춘다
+SEARCH_COLUMNS = {
+    'trading_logs': ('ai_reason',),
+    'self_reflections': ('reflection_content', 'lessons_learned', 'improvement_suggestions'),
+}
+
+# search 결과에 담는 컬럼 (rank, snippet 추가)
+SEARCH_RESULT_COLUMNS = {
+    'trading_logs': ('id', 'timestamp', 'ai_decision', 'ai_confidence', 'current_price', 'ai_reason'),
+    'self_reflections': ('id', 'reflection_date', 'reflection_content', 'lessons_learned', 'improvement_suggestions'),
+}
+
+# find_similar_contexts 결과에 붙이는 trading_logs 컬럼
+SIMILAR_CONTEXT_COLUMNS = ('id', 'timestamp', 'current_price', 'ai_decision', 'ai_confidence', 'ai_score', 'ai_reason')
+
+# 한국어는 조사가 붙어 띄어쓰기 단위 토큰으로는 찾기 어려우므로 부분 문자열을 찾는 trigram 을 먼저 쓴다
+# (SQLite 3.34 미만은 unicode61 + 접두어 검색)
+SEARCH_TOKENIZERS = ('trigram', 'unicode61')
+
+# trigram 토크나이저가 색인하는 최소 글자 수
+TRIGRAM_MIN_LENGTH = 3
+
+
+def _search_triggers(table: str, columns: Sequence[str]) -> Dict[str, str]:
+    """테이블 → {table}_fts 동기화 트리거 (외부 콘텐츠 테이블은 지울 때 이전 값을 'delete' 명령으로 넘긴다)"""
+    fts = f'{table}_fts'
+    names = ', '.join(columns)
+    add = f"INSERT INTO {fts} (rowid, {names}) VALUES (NEW.id, {', '.join('NEW.' + c for c in columns)});"
+    remove = (f"INSERT INTO {fts} ({fts}, rowid, {names}) "
+              f"VALUES ('delete', OLD.id, {', '.join('OLD.' + c for c in columns)});")
+    return {
+        f'trg_{table}_fts_insert': f'AFTER INSERT ON {table} BEGIN {add} END',
+        f'trg_{table}_fts_delete': f'AFTER DELETE ON {table} BEGIN {remove} END',
+        f'trg_{table}_fts_update': f'AFTER UPDATE OF {names} ON {table} BEGIN {remove} {add} END',
+    }
+
+
+def _change_counter_triggers(table: str) -> Dict[str, str]:
+    """테이블 수정·삭제 때 table_changes 카운터를 올리는 트리거 (새 행은 AUTOINCREMENT 시퀀스가 알려 준다)"""
+    bump = f"UPDATE table_changes SET changes = changes + 1 WHERE name = '{table}';"
+    return {
+        f'trg_{table}_changes_update': f'AFTER UPDATE ON {table} BEGIN {bump} END',
+        f'trg_{table}_changes_delete': f'AFTER DELETE ON {table} BEGIN {bump} END',
+    }
+
+
+def search_terms(query: str) -> List[str]:
+    """검색어 → 공백으로 나눈 단어 목록 (빈 단어 제외)"""
+    return [term for term in (query or '').split() if term]
+
+
+def fts_query(query: str, tokenizer: str) -> Optional[str]:
+    """검색어 → FTS5 MATCH 식 (모든 단어를 포함하는 문서, 단어는 문자 그대로 찾는다)
+
+    trigram 은 3글자 미만 단어를 색인하지 못하므로 그런 단어가 섞이면 검색어 전체를 한 구절로 찾는다
+    ('김치 프리미엄' → 부분 문자열 "김치 프리미엄"). 검색어 전체가 3글자 미만이면 None (LIKE 로 찾는다).
+    unicode61 에서는 단어마다 접두어 검색 ('다이버전스' → 다이버전스가, 다이버전스를 ...) 을 한다.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return None
+    quote = lambda text: '"' + text.replace('"', '""') + '"'
+    if tokenizer != 'trigram':
+        return ' AND '.join(quote(term) + '*' for term in terms)
+    if all(len(term) >= TRIGRAM_MIN_LENGTH for term in terms):
+        return ' AND '.join(quote(term) for term in terms)
+    phrase = ' '.join(terms)
+    return quote(phrase) if len(phrase) >= TRIGRAM_MIN_LENGTH else None
+
+
+def search_snippet(text: Optional[str], terms: Sequence[str], width: int = 60,
+                   highlight: Tuple[str, str] = ('[', ']')) -> Optional[str]:
+    """text 에서 처음 일치한 단어 앞뒤 width 글자를 잘라 일치 부분을 highlight 로 감싼 발췌 (없으면 None)"""
+    if not text or not terms:
+        return None
+    pattern = re.compile('|'.join(re.escape(term) for term in sorted(terms, key=len, reverse=True)), re.IGNORECASE)
+    match = pattern.search(text)
+    if not match:
+        return None
+    start, end = max(0, match.start() - width), min(len(text), match.end() + width)
+    excerpt = pattern.sub(lambda m: f'{highlight[0]}{m.group(0)}{highlight[1]}', text[start:end])
+    return ('…' if start else '') + excerpt + ('…' if end < len(text) else '')
+
+
+def _nan_to_none(value):
+    """NaN → None (SQLite NULL), 나머지는 그대로"""
+    return None if value != value else value
+
+
+def _sql_values(values: np.ndarray) -> list:
+    """실수 배열 → 파이썬 값 목록 (NaN 은 None)"""
+    result = values.astype(object)
+    result[np.isnan(values)] = None
+    return result.tolist()
+
+
+def to_epoch_ms(value, assume_utc: bool = False) -> Optional[int]:
+    """ISO 8601 문자열 / datetime / date 를 epoch 밀리초로 변환 (해석할 수 없으면 None)
+
+    시간대 정보가 없는 값은 assume_utc 가 참이면 UTC, 아니면 LOCAL_TIMEZONE (한국 시간) 으로 해석한다.
+    마이그레이션의 기존 행 채우기와 새로 저장하는 행이 모두 이 함수를 쓴다.
+    """
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    elif isinstance(value, date) and not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc if assume_utc else LOCAL_TIMEZONE)
+    return round(value.timestamp() * 1000)
+
+
+def local_now() -> datetime:
+    """LOCAL_TIMEZONE 기준 현재 시각 (봇이 기록하는 timestamp 처럼 시간대 정보 없는 값)"""
+    return datetime.now(LOCAL_TIMEZONE).replace(tzinfo=None)
+
+
+def date_range_ms(start, end=None) -> Tuple[int, int]:
+    """[start, end) 반개구간을 epoch 밀리초로 변환
+
+    날짜만 주어진 end (YYYY-MM-DD) 는 그 날 전체를 포함하도록 다음 날 0시로 바꾸고,
+    end 가 없으면 start 가 속한 하루를 구간으로 쓴다. 시간대가 없으면 LOCAL_TIMEZONE 기준이다.
+    """
+    if end is None or end == '':
+        end = start
+    if isinstance(end, str) and len(end.strip()) == 10:
+        end = datetime.fromisoformat(end.strip()) + timedelta(days=1)
+    elif isinstance(end, date) and not isinstance(end, datetime):
+        end = datetime(end.year, end.month, end.day) + timedelta(days=1)
+    start_ms, end_ms = to_epoch_ms(start), to_epoch_ms(end)
+    if start_ms is None or end_ms is None:
+        raise ValueError(f"날짜 범위를 해석할 수 없습니다: {start!r} ~ {end!r}")
+    return start_ms, end_ms
+
+
+def _extract_path(document, path: tuple):
+    """중첩된 dict/list 에서 키 경로의 값 꺼내기 (없으면 None)"""
+    value = document
+    for key in path:
+        if isinstance(key, int) and isinstance(value, list) and -len(value) <= key < len(value):
+            value = value[key]
+        elif isinstance(key, str) and isinstance(value, dict):
+            value = value.get(key)
+        else:
+            return None
+    return value
+
+
+def extract_fields(market_data: Dict, ai_analysis: Dict) -> List:
+    """EXTRACTED_FIELDS 순서대로 컬럼 값 추출 (숫자로 바꿀 수 없는 값은 None)"""
+    documents = {'market_data': market_data, 'ai_analysis': ai_analysis}
+    values = []
+    for column_type, source, paths in EXTRACTED_FIELDS.values():
+        value = None
+        for path in paths:
+            value = _extract_path(documents[source], path)
+            if value is not None:
+                break
+        if value is not None:
+            if column_type == 'REAL':
+                try:
+                    value = float(value)
+                except (TypeError, ValueError):
+                    value = None
+            elif column_type == 'JSON':
+                value = json.dumps(value, ensure_ascii=False)
+            else:
+                value = str(value)
+        values.append(value)
+    return values
+
+
+# 압축 저장할 수 있는 대용량 JSON 컬럼
+PAYLOAD_COLUMNS = ('ai_analysis_full_json', 'market_data_json')
+
+# 압축된 값은 BLOB 으로 저장: 헤더(코덱 ID 1바이트 + 사전 ID 4바이트, 0 은 사전 없음) + 압축 데이터
+PAYLOAD_CODEC_IDS = {'zlib': 1, 'zstd': 2}
+PAYLOAD_HEADER = struct.Struct('<BI')
+ZLIB_MAX_DICTIONARY = 32 * 1024
+
+
+def resolve_payload_codec(codec: Optional[str]) -> Optional[str]:
+    """압축 코덱 이름 확인 ('auto' 는 zstd 가 설치되어 있으면 zstd, 아니면 zlib)"""
+    if codec is None:
+        return None
+    codec = codec.lower()
+    if codec == 'auto':
+        return 'zstd' if zstandard is not None else 'zlib'
+    if codec not in PAYLOAD_CODEC_IDS:
+        raise ValueError(f"지원하지 않는 압축 코덱: {codec}")
+    if codec == 'zstd' and zstandard is None:
+        raise ValueError("zstd 압축에는 zstandard 패키지가 필요합니다 (pip install zstandard)")
+    return codec
+
+
+def month_bounds_ms(month: str) -> Tuple[int, int]:
+    """'YYYY-MM' 월의 [1일 0시, 다음 달 1일 0시) 를 LOCAL_TIMEZONE 기준 epoch 밀리초로 변환"""
+    year, month_number = (int(part) for part in month.split('-'))
+    start = datetime(year, month_number, 1)
+    end = datetime(year + month_number // 12, month_number % 12 + 1, 1)
+    return to_epoch_ms(start), to_epoch_ms(end)
+
+
+def plan_segments(lo: int, hi: int, ranges: Sequence[Tuple[int, int, str]],
+                  max_sources: int) -> List[Tuple[int, int, List[str]]]:
+    """키 구간 [lo, hi) 를 겹치는 파티션이 max_sources 개 이하인 연속 구간으로 나누기
+
+    ranges 는 파티션별 (키 하한, 키 상한, 이름) 이다. 반환값은 키 순서대로 (구간 하한, 구간 상한,
+    그 구간과 겹치는 파티션 이름 목록) 이며, 각 구간을 따로 읽어 이어 붙이면 전체 순서가 유지된다.
+    """
+    if lo >= hi:
+        return [(lo, hi, [])]
+    points = sorted({lo, hi} | {p for r_lo, r_hi, _ in ranges for p in (r_lo, r_hi) if lo < p < hi})
+    segments: List[Tuple[int, int, List[str]]] = []
+    for a, b in zip(points, points[1:]):
+        names = [name for r_lo, r_hi, name in ranges if r_lo < b and a < r_hi]
+        if len(names) > max_sources:
+            raise ValueError(f"한 구간에 겹치는 파티션이 너무 많습니다 ({len(names)} > {max_sources})")
+        if segments:
+            merged = segments[-1][2] + [name for name in names if name not in segments[-1][2]]
+            if len(merged) <= max_sources:
+                segments[-1] = (segments[-1][0], b, merged)
+                continue
+        segments.append((a, b, names))
+    return segments or [(lo, hi, [])]
+
+
+def _utc_now_columns() -> Tuple[str, int]:
+    """created_at (UTC 텍스트, CURRENT_TIMESTAMP 형식) 과 created_at_ms 값"""
+    now = datetime.now(timezone.utc)
+    return now.strftime('%Y-%m-%d %H:%M:%S'), round(now.timestamp() * 1000)
+
+class SchemaOutdatedError(sqlite3.OperationalError):
+    """조회 전용으로 연 DB 의 스키마가 최신이 아님 (migrate_command: 마이그레이션하는 명령)"""
+
+    def __init__(self, db_path: str, version: int):
         self.db_path = db_path
-        self.init_database()
-    
-    def init_database(self):
-        """데이터베이스 테이블 초기화"""
-        with sqlite3.connect(self.db_path) as conn:
+        self.version = version
+        self.migrate_command = f"python db_tools.py migrate {db_path}"
+        super().__init__(
+            f"데이터베이스 스키마가 최신이 아닙니다 (v{version} < v{SCHEMA_VERSION}): {db_path} - "
+            f"봇을 먼저 실행하거나 `{self.migrate_command}` 로 마이그레이션하세요"
+        )
+
+
+class WriteBehindError(sqlite3.DatabaseError):
+    """write-behind 큐의 묶음을 재시도 끝에 기록하지 못함 (rows: 기록하지 못한 (SQL, 값 튜플) 목록)"""
+
+    def __init__(self, message: str, rows: List[Tuple[str, tuple]]):
+        super().__init__(message)
+        self.rows = rows
+
+
+class WriteBehindWriter:
+    """INSERT 를 메모리 큐에 쌓아 두고 백그라운드 스레드가 묶어서 커밋 (group commit)
+
+    큐에 flush_size 건이 모이거나 첫 건이 들어온 뒤 flush_interval 초가 지나면 한 트랜잭션으로
+    기록한다. 큐가 max_queue 건으로 가득 차면 넣는 쪽이 자리가 날 때까지 기다린다.
+    커밋에 실패한 묶음은 max_retries 번까지 다시 시도한 뒤 실패 목록으로 옮기고 (오류 로그, stats 의
+    failed_pending), 다음 flush() / close() 가 그 행들을 담은 WriteBehindError 를 낸다 (호출한 쪽이
+    다시 저장할 수 있다). 순서만 맞추면 되는 쪽은 drain() 으로 기다리며 실패 목록은 그대로 둔다.
+    """
+
+    def __init__(self, db: 'TradingDatabase', flush_interval: float = 0.5, flush_size: int = 200,
+                 max_queue: int = 10000, max_retries: int = 3):
+        self.db = db
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.max_retries = max_retries
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'rows_queued': 0,
+            'rows_written': 0,
+            'rows_dropped': 0,
+            'commits': 0,
+            'commit_errors': 0,
+            'max_queue_depth': 0,
+            'last_commit_ms': 0.0,
+            'max_commit_ms': 0.0,
+            'total_commit_ms': 0.0,
+            'last_error': None,
+        }
+        self._failed: List[Tuple[str, tuple]] = []
+        self._thread = threading.Thread(target=self._run, name='trading-db-writer', daemon=True)
+        self._thread.start()
+
+    def put(self, sql: str, row: tuple):
+        """INSERT 한 건을 큐에 추가"""
+        if self._stop.is_set():
+            raise RuntimeError("닫힌 write-behind 큐입니다")
+        self._queue.put((sql, row))
+        depth = self._queue.qsize()
+        with self._stats_lock:
+            self._stats['rows_queued'] += 1
+            if depth > self._stats['max_queue_depth']:
+                self._stats['max_queue_depth'] = depth
+
+    def flush(self):
+        """지금까지 넣은 모든 건이 커밋될 때까지 대기 (기록하지 못한 건이 있으면 WriteBehindError)"""
+        self._queue.join()
+        self._raise_failed()
+
+    def drain(self):
+        """지금까지 넣은 모든 건이 처리될 때까지 대기 (실패한 건은 다음 flush/close 가 알린다)"""
+        self._queue.join()
+
+    def close(self):
+        """남은 건을 모두 기록한 뒤 백그라운드 스레드 종료 (기록하지 못한 건이 있으면 WriteBehindError)"""
+        if self._stop.is_set():
+            return
+        self._queue.join()
+        self._stop.set()
+        self._thread.join()
+        self._raise_failed()
+
+    def _raise_failed(self):
+        """실패 목록을 비우고 WriteBehindError 로 알리기 (한 번만 알린다)"""
+        with self._stats_lock:
+            failed, self._failed = self._failed, []
+            last_error = self._stats['last_error']
+        if failed:
+            raise WriteBehindError(f"write-behind 기록 실패로 {len(failed)}건을 저장하지 못했습니다: {last_error}", failed)
+
+    def stats(self) -> Dict:
+        """큐 깊이와 커밋 지연 지표"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+            stats['failed_pending'] = len(self._failed)
+        stats['queue_depth'] = self._queue.qsize()
+        stats['avg_commit_ms'] = stats['total_commit_ms'] / stats['commits'] if stats['commits'] else 0.0
+        return stats
+
+    def _next_batch(self) -> List[Tuple[str, tuple]]:
+        """첫 건을 기다린 뒤 flush_size 건 또는 flush_interval 초까지 모으기"""
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.flush_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch: List[Tuple[str, tuple]]):
+        """묶음을 한 트랜잭션으로 기록 (같은 SQL 이 이어지는 구간은 executemany)"""
+        with self.db._connection() as conn:
             cursor = conn.cursor()
-            
-            # 매매 분석 로그 테이블
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS trading_logs (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp TEXT NOT NULL,
-                    current_price REAL NOT NULL,
-                    krw_balance REAL,
-                    btc_balance REAL,
-                    total_portfolio_value REAL,
-                    investment_status_json TEXT,
-                    ai_decision TEXT NOT NULL,
-                    ai_reason TEXT,
-                    ai_confidence TEXT,
-                    ai_analysis_full_json TEXT,
-                    market_data_json TEXT,
-                    analysis_type TEXT,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # 실제 거래 기록 테이블
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS actual_trades (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp TEXT NOT NULL,
-                    trade_type TEXT NOT NULL, -- 'buy' or 'sell'
-                    price REAL NOT NULL,
-                    amount REAL NOT NULL,
-                    total_value REAL NOT NULL,
-                    fee REAL DEFAULT 0,
-                    order_id TEXT,
-                    success BOOLEAN DEFAULT 1,
-                    error_message TEXT,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            start = 0
+            while start < len(batch):
+                sql = batch[start][0]
+                end = start
+                while end < len(batch) and batch[end][0] == sql:
+                    end += 1
+                cursor.executemany(sql, [row for _, row in batch[start:end]])
+                start = end
+            conn.commit()
+
+    def _run(self):
+        while not (self._stop.is_set() and self._queue.empty()):
+            batch = self._next_batch()
+            if not batch:
+                continue
+            for attempt in range(1, self.max_retries + 1):
+                started = time.perf_counter()
+                try:
+                    self._write(batch)
+                except sqlite3.Error as e:
+                    with self._stats_lock:
+                        self._stats['commit_errors'] += 1
+                        self._stats['last_error'] = str(e)
+                    if attempt == self.max_retries:
+                        with self._stats_lock:
+                            self._stats['rows_dropped'] += len(batch)
+                            self._failed.extend(batch)
+                        logger.error("write-behind 기록 실패, %s건 보류 (다음 flush/close 에서 WriteBehindError): %s",
+                                     len(batch), e)
+                    else:
+                        time.sleep(min(self.flush_interval, 0.1) * attempt)
+                    continue
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                with self._stats_lock:
+                    self._stats['rows_written'] += len(batch)
+                    self._stats['commits'] += 1
+                    self._stats['last_commit_ms'] = elapsed_ms
+                    self._stats['total_commit_ms'] += elapsed_ms
+                    self._stats['max_commit_ms'] = max(self._stats['max_commit_ms'], elapsed_ms)
+                break
+            for _ in batch:
+                self._queue.task_done()
+
+
+def market_context(price, timestamp, technical_indicators_json, fear_greed_json) -> Dict:
+    """분석 로그 한 건의 시장 상황 (저장 시점에 뽑아 둔 하위 문서만 파싱)"""
+    try:
+        return {
+            'price': price,
+            'technical_indicators': json.loads(technical_indicators_json or '{}'),
+            'fear_greed': json.loads(fear_greed_json or '[]'),
+            'timestamp': timestamp or ''
+        }
+    except ValueError:
+        return {'price': price, 'timestamp': timestamp or ''}
+
+
+class MarketContextIndex:
+    """특정 시점의 시장 상황을 찾는 as-of 인덱스 (get_market_context / get_market_contexts 가 사용)
+
+    분석 로그의 (timestamp_ms, id) 를 시간순 NumPy 배열로 한 번 읽어 두고 searchsorted 로 "그 시각
+    이전(같은 시각 포함)의 마지막 로그" 를 찾는다. 새 로그가 저장되면 (trading_logs 변경 토큰) 그 뒤의
+    id 만 더 읽어 합친다. 파싱한 시장 상황은 로그 id 별로 cache_size 개까지 LRU 로 보관한다.
+    로그를 삭제한 경우에는 refresh(full=True) 로 다시 읽는다.
+    """
+
+    # 시장 상황을 만들 때 읽는 trading_logs 컬럼 (id 다음은 market_context 인자 순서)
+    COLUMNS = ('id', 'current_price', 'timestamp', 'technical_indicators_json', 'fear_greed_json')
+
+    def __init__(self, db: 'TradingDatabase', cache_size: int = 1024, batch_size: int = 100000):
+        self.db = db
+        self.cache_size = cache_size
+        self.batch_size = batch_size
+        self._lock = threading.RLock()
+        self._timestamps = np.empty(0, dtype=np.int64)
+        self._ids = np.empty(0, dtype=np.int64)
+        self._last_id: Optional[int] = None
+        self._cache: 'OrderedDict[int, Dict]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def refresh(self, full: bool = False) -> int:
+        """인덱스를 최신 로그까지 맞추고 인덱스의 로그 수 반환 (새 로그가 없으면 읽지 않는다)"""
+        token, _ = self.db.get_change_tokens(['trading_logs'])['trading_logs']
+        with self._lock:
+            if full or self._last_id is None:
+                # 아카이브 포함 시간순 키셋 (timestamp_ms, id)
+                pages = self.db._iter_keyset('trading_logs', [], self.batch_size,
+                                             time_range=(MIN_KEY, MAX_KEY), row_format='tuple')
+                keys = [np.array(page, dtype=np.int64).reshape(-1, 2) for page in pages]
+                keys = np.concatenate(keys) if keys else np.empty((0, 2), dtype=np.int64)
+                self._timestamps, self._ids = keys[:, 0].copy(), keys[:, 1].copy()
+                self._cache.clear()
+            elif token > self._last_id:
+                # 마지막으로 읽은 id 뒤의 로그만 추가 (id, timestamp_ms)
+                new = [
+                    (timestamp_ms, log_id)
+                    for page in self.db._iter_keyset('trading_logs', ['timestamp_ms'], self.batch_size,
+                                                     after_id=self._last_id, row_format='tuple')
+                    for log_id, timestamp_ms in page if timestamp_ms is not None
+                ]
+                if new:
+                    keys = np.array(new, dtype=np.int64)
+                    timestamps = np.concatenate([self._timestamps, keys[:, 0]])
+                    ids = np.concatenate([self._ids, keys[:, 1]])
+                    if len(self._timestamps) and keys[:, 0].min() < self._timestamps[-1]:
+                        order = np.lexsort((ids, timestamps))  # 과거 시각으로 가져온 로그
+                        timestamps, ids = timestamps[order], ids[order]
+                    self._timestamps, self._ids = timestamps, ids
+            else:
+                return len(self._ids)
+            self._last_id = max(token, int(self._ids.max()) if len(self._ids) else 0)
+            return len(self._ids)
+
+    def lookup(self, timestamps_ms: np.ndarray) -> np.ndarray:
+        """각 시각 이전의 마지막 로그 id 배열 (그런 로그가 없으면 -1, 인덱스 갱신은 하지 않는다)"""
+        timestamps_ms = np.asarray(timestamps_ms, dtype=np.int64)
+        with self._lock:
+            index = np.searchsorted(self._timestamps, timestamps_ms, side='right') - 1
+            if not len(self._ids):
+                return np.full(len(timestamps_ms), -1, dtype=np.int64)
+            return np.where(index >= 0, self._ids[np.maximum(index, 0)], -1)
+
+    def context(self, timestamp_ms: int) -> Dict:
+        """한 시각의 시장 상황 (이전 로그가 없으면 빈 dict)"""
+        self.refresh()
+        with self._lock:
+            index = int(self._timestamps.searchsorted(timestamp_ms, side='right')) - 1
+            if index < 0:
+                return {}
+            log_id = int(self._ids[index])
+            return dict(self._resolve([log_id])[log_id])
+
+    def contexts(self, timestamps_ms: np.ndarray) -> List[Dict]:
+        """각 시각의 시장 상황 목록 (입력 순서, 이전 로그가 없으면 빈 dict)"""
+        self.refresh()
+        log_ids = self.lookup(timestamps_ms)
+        with self._lock:
+            contexts = self._resolve([int(log_id) for log_id in np.unique(log_ids) if log_id >= 0])
+        return [dict(contexts[log_id]) if log_id >= 0 else {} for log_id in log_ids.tolist()]
+
+    def _resolve(self, log_ids: List[int]) -> Dict[int, Dict]:
+        """로그 id → 시장 상황 (캐시에 없는 것만 읽고, 이번 호출에 필요한 것을 꺼낸 뒤 캐시를 줄인다)"""
+        missing = [log_id for log_id in log_ids if log_id not in self._cache]
+        self.hits += len(log_ids) - len(missing)
+        self.misses += len(missing)
+        found = self._fetch(missing) if missing else {}
+        for log_id in log_ids:
+            if log_id in found:
+                self._cache[log_id] = found[log_id]
+            elif log_id in self._cache:
+                self._cache.move_to_end(log_id)
+        contexts = {log_id: self._cache.get(log_id, {}) for log_id in log_ids}
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return contexts
+
+    def _fetch(self, log_ids: List[int], chunk_size: int = 500) -> Dict[int, Dict]:
+        """로그 id 들의 시장 상황 읽기 (본 DB 에서 id 로 찾고, 없는 것만 시각 범위가 겹치는 아카이브에서 읽는다)"""
+        found = {}
+        select = ', '.join(self.COLUMNS)
+        with self.db._connection() as conn:
+            for start in range(0, len(log_ids), chunk_size):
+                chunk = log_ids[start:start + chunk_size]
+                for log_id, *values in conn.execute(
+                    f"SELECT {select} FROM trading_logs WHERE id IN ({', '.join('?' * len(chunk))})", chunk
+                ):
+                    found[log_id] = market_context(*values)
+
+        archived = [log_id for log_id in log_ids if log_id not in found]
+        if archived:
+            positions = np.flatnonzero(np.isin(self._ids, archived))
+            timestamps = dict(zip(self._ids[positions].tolist(), self._timestamps[positions].tolist()))
+            for start in range(0, len(archived), chunk_size):
+                chunk = archived[start:start + chunk_size]
+                chunk_ms = [timestamps[log_id] for log_id in chunk]
+                rows = self.db._read_range(
+                    'trading_logs', self.COLUMNS, min(chunk_ms), max(chunk_ms) + 1, 'timestamp_ms',
+                    where=f" AND id IN ({', '.join('?' * len(chunk))})", params=tuple(chunk), as_dict=False,
                 )
-            ''')
-            
-            # 포트폴리오 스냅샷 테이블 (일별 포트폴리오 가치 추적용)
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS portfolio_snapshots (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    date TEXT NOT NULL UNIQUE,
-                    krw_balance REAL NOT NULL,
-                    btc_balance REAL NOT NULL,
-                    btc_avg_price REAL,
-                    total_value REAL NOT NULL,
-                    profit_loss REAL DEFAULT 0,
-                    profit_loss_percent REAL DEFAULT 0,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                for log_id, *values in rows:
+                    found[log_id] = market_context(*values)
+        return found
+
+
+class SimilarityIndex:
+    """분석 로그 시장 상황 특징 행렬 (find_similar_contexts 가 사용)
+
+    첫 조회 때 아카이브까지 모든 로그의 SIMILARITY_SOURCE_COLUMNS 를 읽어 (로그 수 x 특징 수) float32 행렬과
+    (id, timestamp_ms) 키 배열을 만든다. 이후 save_analysis_log(s) 가 저장한 로그는 행을 다시 읽지 않고
+    바로 덧붙이고, 다른 프로세스가 쓴 로그는 trading_logs 변경 토큰을 보고 그 뒤의 id 만 읽는다.
+    path (디렉터리) 를 주면 행렬을 features.npy / keys.npy 로 저장해 두었다가 다음 실행 때 features.npy 를
+    메모리 매핑으로 열고 저장 이후의 로그만 읽는다. 덧붙인 행은 save() 나 close() 때 파일에 합쳐진다.
+    로그를 삭제한 경우에는 refresh(full=True) 로 다시 만든다.
+    """
+
+    FEATURES_FILE = 'features.npy'
+    KEYS_FILE = 'keys.npy'
+
+    def __init__(self, db: 'TradingDatabase', path: Optional[str] = None, batch_size: int = 100000):
+        self.db = db
+        self.path = path
+        self.batch_size = batch_size
+        self._lock = threading.RLock()
+        self._positions = [ANALYSIS_LOG_COLUMNS.index(name) for name in SIMILARITY_SOURCE_COLUMNS[1:]]
+        width = len(SIMILARITY_FEATURES)
+        # 파일에서 연 (또는 처음 만든) 부분과 그 뒤에 덧붙인 부분 (용량을 두 배씩 늘린다)
+        self._base_features = np.empty((0, width), dtype=np.float32)
+        self._base_keys = np.empty((0, 2), dtype=np.int64)
+        self._tail_features = np.empty((0, width), dtype=np.float32)
+        self._tail_keys = np.empty((0, 2), dtype=np.int64)
+        self._tail_size = 0
+        self._sums = np.zeros((3, width))
+        self._last_id: Optional[int] = None
+
+    def __len__(self) -> int:
+        return len(self._base_keys) + self._tail_size
+
+    def refresh(self, full: bool = False) -> int:
+        """행렬을 최신 로그까지 맞추고 로그 수 반환 (처음에는 저장 파일을 열거나 전체를 읽는다)"""
+        token, _ = self.db.get_change_tokens(['trading_logs'])['trading_logs']
+        with self._lock:
+            if full or self._last_id is None:
+                if full or not self._load():
+                    self._build()
+            if token > self._last_id:
+                for page in self.db._iter_keyset('trading_logs', SIMILARITY_SOURCE_COLUMNS[1:], self.batch_size,
+                                                 after_id=self._last_id, row_format='tuple'):
+                    self._append([row[0] for row in page], [row[1:] for row in page])
+                self._last_id = max(self._last_id, token)
+            return len(self)
+
+    def add(self, log_ids: Sequence[int], rows: Sequence[tuple]):
+        """방금 저장한 로그 덧붙이기 (rows 는 ANALYSIS_LOG_COLUMNS 순서의 값 튜플)
+
+        행렬을 아직 만들지 않았거나 그 사이에 다른 로그가 들어왔으면 아무것도 하지 않는다
+        (다음 refresh 가 id 로 읽는다).
+        """
+        with self._lock:
+            if not log_ids or self._last_id is None or log_ids[0] != self._last_id + 1:
+                return
+            self._append(list(log_ids), [tuple(row[i] for i in self._positions) for row in rows])
+            self._last_id = max(self._last_id, log_ids[-1])
+
+    def find(self, k: int, timestamp_ms: Optional[int] = None, min_gap_ms: int = 0) -> Tuple[Optional[int], List[Tuple[int, float]]]:
+        """(질의 로그 id, [(로그 id, 거리), ...]) - timestamp_ms 이전의 마지막 로그 (없으면 최신 로그) 를 질의로
+
+        후보는 질의 로그보다 min_gap_ms 이상 앞선 로그다. 질의할 로그가 없으면 (None, []).
+        """
+        self.refresh()
+        with self._lock:
+            blocks = [(self._base_features, self._base_keys),
+                      (self._tail_features[:self._tail_size], self._tail_keys[:self._tail_size])]
+            # 질의 로그: (timestamp_ms, id) 가 가장 큰 로그 (timestamp_ms 이하 중에서)
+            best = None
+            for features, keys in blocks:
+                if not len(keys):
+                    continue
+                times = keys[:, 1] if timestamp_ms is None else np.where(keys[:, 1] <= timestamp_ms, keys[:, 1], MIN_KEY)
+                latest = int(times.max())
+                if latest == MIN_KEY:
+                    continue
+                tied = np.flatnonzero(times == latest)
+                index = int(tied[keys[tied, 0].argmax()])
+                if best is None or (latest, int(keys[index, 0])) > best[:2]:
+                    best = (latest, int(keys[index, 0]), np.asarray(features[index], dtype=np.float64))
+            if best is None:
+                return None, []
+            query_ms, query_id, query = best
+            mean, std = feature_scale(self._sums)
+            ids, distances = nearest(
+                ((features, keys[:, 0], keys[:, 1] <= query_ms - min_gap_ms) for features, keys in blocks),
+                query, mean, std, k,
+            )
+        return query_id, list(zip(ids.tolist(), distances.tolist()))
+
+    def save(self, path: Optional[str] = None) -> Optional[str]:
+        """행렬을 path (기본: 생성 시 준 디렉터리) 에 저장하고 메모리 매핑으로 다시 열기 (경로가 없으면 None)"""
+        path = path or self.path
+        if path is None:
+            return None
+        with self._lock:
+            os.makedirs(path, exist_ok=True)
+            features = np.concatenate([self._base_features, self._tail_features[:self._tail_size]])
+            keys = np.concatenate([self._base_keys, self._tail_keys[:self._tail_size]])
+            # 특징 먼저, 키 나중 - 읽을 때 행 수가 어긋나면 다시 만든다
+            for name, array in ((self.FEATURES_FILE, features), (self.KEYS_FILE, keys)):
+                temporary = os.path.join(path, f'.{name}.tmp')
+                with open(temporary, 'wb') as file:
+                    np.save(file, array)
+                os.replace(temporary, os.path.join(path, name))
+            if path == self.path:
+                self._base_features = np.load(os.path.join(path, self.FEATURES_FILE), mmap_mode='r')
+                self._base_keys = keys
+                self._tail_size = 0
+        return path
+
+    def close(self):
+        """덧붙인 행이 있으면 저장 디렉터리에 합쳐 두기"""
+        with self._lock:
+            if self.path is not None and self._tail_size:
+                self.save()
+
+    def _load(self) -> bool:
+        """저장 파일 열기 (없거나 특징 구성이 다르면 False)"""
+        if self.path is None:
+            return False
+        try:
+            features = np.load(os.path.join(self.path, self.FEATURES_FILE), mmap_mode='r')
+            keys = np.load(os.path.join(self.path, self.KEYS_FILE))
+        except (OSError, ValueError):
+            return False
+        if features.ndim != 2 or features.shape[1] != len(SIMILARITY_FEATURES) or len(features) != len(keys):
+            return False
+        self._base_features, self._base_keys = features, keys
+        self._tail_size = 0
+        self._sums = np.zeros_like(self._sums)
+        for start in range(0, len(features), self.batch_size):
+            self._sums += feature_sums(features[start:start + self.batch_size])
+        self._last_id = int(keys[:, 0].max()) if len(keys) else 0
+        logger.info("유사 상황 인덱스 불러오기 (%s건, %s)", f"{len(keys):,}", self.path)
+        return True
+
+    def _build(self):
+        """아카이브 포함 모든 로그로 행렬을 새로 만들기 (저장 디렉터리가 있으면 저장)"""
+        features, keys = [], []
+        for page in self.db._iter_keyset('trading_logs', SIMILARITY_SOURCE_COLUMNS[1:], self.batch_size,
+                                         time_range=(MIN_KEY, MAX_KEY), row_format='tuple'):
+            keys.append(np.array([row[:2] for row in page], dtype=np.int64).reshape(-1, 2))
+            features.append(feature_matrix([row[2:] for row in page]))
+        width = len(SIMILARITY_FEATURES)
+        self._base_features = np.concatenate(features) if features else np.empty((0, width), dtype=np.float32)
+        self._base_keys = np.concatenate(keys) if keys else np.empty((0, 2), dtype=np.int64)
+        self._tail_features = np.empty((0, width), dtype=np.float32)
+        self._tail_keys = np.empty((0, 2), dtype=np.int64)
+        self._tail_size = 0
+        self._sums = feature_sums(self._base_features)
+        self._last_id = int(self._base_keys[:, 0].max()) if len(self._base_keys) else 0
+        if self.path is not None and not self.db.read_only:
+            self.save()
+
+    def _append(self, log_ids: List[int], rows: List[tuple]):
+        """로그 (id, (timestamp_ms, current_price, ...)) 를 덧붙이기 (시각이 없는 로그는 건너뛴다)"""
+        kept = [(log_id, row) for log_id, row in zip(log_ids, rows) if row[0] is not None]
+        if not kept:
+            return
+        features = feature_matrix([row[1:] for _, row in kept])
+        keys = np.array([(log_id, row[0]) for log_id, row in kept], dtype=np.int64)
+        size = self._tail_size + len(kept)
+        if size > len(self._tail_keys):
+            capacity = max(size, 2 * len(self._tail_keys), 1024)
+            grown_features = np.empty((capacity, len(SIMILARITY_FEATURES)), dtype=np.float32)
+            grown_keys = np.empty((capacity, 2), dtype=np.int64)
+            grown_features[:self._tail_size] = self._tail_features[:self._tail_size]
+            grown_keys[:self._tail_size] = self._tail_keys[:self._tail_size]
+            self._tail_features, self._tail_keys = grown_features, grown_keys
+        self._tail_features[self._tail_size:size] = features
+        self._tail_keys[self._tail_size:size] = keys
+        self._tail_size = size
+        self._sums += feature_sums(features)
+
+
+class TradingDatabase:
+    def __init__(self, db_path: str = "trading_data.db", reuse_connections: bool = True,
+                 journal_mode: str = "WAL", synchronous: str = "NORMAL",
+                 cache_size: int = -16000, mmap_size: int = 256 * 1024 * 1024,
+                 indexed_fields: Sequence[str] = (), payload_codec: Optional[str] = None,
+                 compression_level: int = 6, write_behind: bool = False,
+                 flush_interval: float = 0.5, flush_size: int = 200, max_queue: int = 10000,
+                 durable_trades: bool = True, archive_dir: Optional[str] = None,
+                 archive_after_days: int = 90, read_only: bool = False,
+                 snapshot_path: Optional[str] = None, snapshot_interval: float = 60.0,
+                 context_cache_size: int = 1024, similarity_index_dir: Optional[str] = None):
+        """매매 데이터 SQLite 데이터베이스 초기화
+
+        reuse_connections=True 이면 스레드마다 연결을 하나씩 열어 객체가 살아있는 동안 재사용하고,
+        False 이면 예전처럼 메서드 호출마다 새 연결을 연다.
+        cache_size 는 SQLite 규칙을 따른다 (음수: KiB 단위, 양수: 페이지 수).
+        indexed_fields 에 EXTRACTED_FIELDS 컬럼 이름을 주면 그 컬럼에 인덱스를 만든다.
+        payload_codec ('zlib', 'zstd', 'auto') 을 주면 PAYLOAD_COLUMNS 를 압축해서 저장한다.
+        학습된 압축 사전이 있으면 함께 쓰며, 읽을 때는 설정과 관계없이 투명하게 풀어준다.
+        write_behind=True 이면 save_analysis_log / save_trade 가 커밋을 기다리지 않고 큐에 넣은 뒤
+        바로 반환하며 (반환값 None), 백그라운드 스레드가 flush_size 건 또는 flush_interval 초마다
+        묶어서 커밋한다. durable_trades=True 이면 거래는 큐를 비운 뒤 동기적으로 커밋한다.
+        flush() / close() 를 호출하거나 프로세스가 정상 종료하면 남은 큐를 모두 기록한다.
+        archive_old_rows() 는 archive_after_days 일보다 오래된 trading_logs / actual_trades 행을
+        archive_dir (기본: <DB 이름>_archive/) 의 월별 SQLite 파일로 옮긴다. 기간을 받는 조회 메서드는
+        범위와 겹치는 월 파일만 ATTACH 해서 함께 읽는다.
+        read_only=True 이면 대시보드 같은 조회 전용 프로세스용으로 DB 를 mode=ro URI 로 열고
+        (PRAGMA query_only, 스키마 DDL 생략) 쓰기 메서드는 sqlite3.OperationalError 를 낸다. 파일을 절대
+        바꾸지 않으므로 스키마가 최신이 아니면 sqlite3.OperationalError 를 내고, 봇이나
+        `python db_tools.py migrate <DB>` 로 먼저 마이그레이션해야 한다.
+        snapshot_path 를 주면 (read_only 포함) 본 DB 대신 온라인 백업 API 로 만든 사본에서 읽으며,
+        사본이 snapshot_interval 초보다 오래되면 다음 조회 때 다시 복사한다.
+        get_market_context(s) 는 첫 호출 때 분석 로그 시각 인덱스를 메모리에 만들고, 파싱한 시장 상황을
+        context_cache_size 개까지 캐시한다 (MarketContextIndex).
+        find_similar_contexts 는 첫 호출 때 시장 상황 특징 행렬을 만들고, similarity_index_dir 을 주면
+        그 디렉터리에 저장해 두었다가 다음 실행 때 메모리 매핑으로 연다 (SimilarityIndex).
+        """
+        journal_mode = journal_mode.upper()
+        synchronous = synchronous.upper()
+        if journal_mode not in JOURNAL_MODES:
+            raise ValueError(f"지원하지 않는 journal_mode: {journal_mode}")
+        if synchronous not in SYNCHRONOUS_LEVELS:
+            raise ValueError(f"지원하지 않는 synchronous 수준: {synchronous}")
+        unknown_fields = [name for name in indexed_fields if name not in EXTRACTED_FIELDS]
+        if unknown_fields:
+            raise ValueError(f"추출 컬럼이 아닙니다: {', '.join(unknown_fields)}")
+        read_only = read_only or snapshot_path is not None
+        if read_only and write_behind:
+            raise ValueError("read_only 모드에서는 write_behind 를 쓸 수 없습니다")
+        if read_only and not os.path.exists(db_path):
+            raise FileNotFoundError(f"데이터베이스 파일이 없습니다: {db_path}")
+
+        self.db_path = db_path
+        self.reuse_connections = reuse_connections
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        self.cache_size = int(cache_size)
+        self.mmap_size = int(mmap_size)
+        self.indexed_fields = tuple(indexed_fields)
+        self.payload_codec = resolve_payload_codec(payload_codec)
+        self.compression_level = int(compression_level)
+        self._compression_dictionaries: Dict[int, bytes] = {}
+        self._table_columns: Dict[str, Tuple[str, ...]] = {}
+        self._column_types: Dict[str, Dict[str, str]] = {}
+        self._search_tokenizers: Dict[str, Optional[str]] = {}
+        self._active_dictionary_id = 0
+        self.archive_dir = archive_dir or os.path.splitext(db_path)[0] + '_archive'
+        self.archive_after_days = archive_after_days
+        self.read_only = read_only
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = snapshot_interval
+        self._snapshot_conn: Optional[sqlite3.Connection] = None
+        self._snapshot_at: Optional[float] = None
+        self._snapshot_lock = threading.Lock()
+        self.market_context_index = MarketContextIndex(self, context_cache_size)
+        self.similarity_index = SimilarityIndex(self, similarity_index_dir)
+
+        self._local = threading.local()
+        self._connections: Dict[threading.Thread, sqlite3.Connection] = {}
+        self._connections_lock = threading.Lock()
+        if read_only:
+            version = self._schema_version()
+            if version < SCHEMA_VERSION:
+                # 조회 전용 프로세스는 마이그레이션하지 않는다 (journal_mode 를 포함해 파일을 바꾸지 않음)
+                raise SchemaOutdatedError(db_path, version)
+        if snapshot_path is not None:
+            self.refresh_snapshot()
+        if not read_only:
+            self.init_database()
+
+        self.durable_trades = durable_trades
+        self._writer: Optional[WriteBehindWriter] = None
+        if write_behind:
+            self._writer = WriteBehindWriter(self, flush_interval, flush_size, max_queue)
+            atexit.register(self._drain_at_exit)
+
+    def _drain_at_exit(self):
+        """프로세스 종료 시 write-behind 큐 비우기"""
+        if self._writer is not None:
+            try:
+                self._writer.close()
+            except WriteBehindError as e:
+                logger.error("종료 중 %s", e)
+
+    def flush(self):
+        """write-behind 큐에 쌓인 건을 모두 커밋할 때까지 대기 (write-behind 가 아니면 아무 일도 하지 않음)
+
+        재시도 끝에 기록하지 못한 건이 있으면 그 행들을 담은 WriteBehindError 를 낸다.
+        """
+        if self._writer is not None:
+            self._writer.flush()
+
+    def write_behind_stats(self) -> Dict:
+        """write-behind 큐 깊이·커밋 지연 지표 (write-behind 가 아니면 빈 dict, failed_pending: 알리지 않은 실패 건수)"""
+        return self._writer.stats() if self._writer is not None else {}
+
+    def _drain_writer(self):
+        """바로 커밋하는 저장 전에 앞선 write-behind 큐를 비워 저장 순서 맞추기
+
+        앞선 묶음의 실패는 이 저장과 무관하므로 여기서 올리지 않는다 (flush()/close() 와
+        write_behind_stats 의 failed_pending 으로 알린다).
+        """
+        if self._writer is not None:
+            self._writer.drain()
+
+    def checkpoint(self, mode: str = 'TRUNCATE') -> Tuple[int, int, int]:
+        """WAL 내용을 본 DB 파일에 반영 (PRAGMA wal_checkpoint) - (busy, WAL 페이지 수, 반영한 페이지 수)
+
+        write-behind 큐를 먼저 비운다. TRUNCATE 는 반영 후 WAL 파일을 비우므로 파일 크기를 잴 때 쓴다.
+        """
+        mode = mode.upper()
+        if mode not in CHECKPOINT_MODES:
+            raise ValueError(f"알 수 없는 체크포인트 모드: {mode} (가능: {', '.join(CHECKPOINT_MODES)})")
+        self._drain_writer()
+        with self._connection() as conn:
+            return tuple(conn.execute(f'PRAGMA wal_checkpoint({mode})').fetchone())
+
+    def vacuum(self):
+        """DB 파일을 다시 써서 지운 행이 차지하던 공간 돌려주기 (압축 변환·아카이브 뒤 파일 크기를 줄일 때)
+
+        트랜잭션 밖에서 실행해야 하므로 현재 스레드 연결에서 바로 실행한다. write-behind 큐를 먼저 비운다.
+        """
+        self._drain_writer()
+        self._thread_connection().execute('VACUUM')
+
+    @staticmethod
+    def _read_only_uri(path: str) -> str:
+        """파일을 읽기 전용으로 여는 SQLite URI"""
+        return 'file:' + pathname2url(os.path.abspath(path)) + '?mode=ro'
+
+    def _open_connection(self) -> sqlite3.Connection:
+        """PRAGMA 설정이 적용된 새 연결 생성"""
+        # 스레드별 연결을 close()에서 한꺼번에 닫을 수 있도록 스레드 검사는 끈다
+        if self.read_only:
+            # journal_mode 는 DB 파일에 기록되는 설정이라 쓰는 쪽에서 정한 값을 그대로 따른다
+            conn = sqlite3.connect(self._read_only_uri(self.snapshot_path or self.db_path),
+                                   uri=True, check_same_thread=False)
+            conn.execute("PRAGMA query_only=ON")
+        else:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute(f"PRAGMA journal_mode={self.journal_mode}")
+            conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        conn.execute(f"PRAGMA cache_size={self.cache_size}")
+        conn.execute(f"PRAGMA mmap_size={self.mmap_size}")
+        conn.create_function('epoch_ms', 2, to_epoch_ms, deterministic=True)
+        return conn
+
+    def _thread_connection(self) -> sqlite3.Connection:
+        """현재 스레드 전용 연결 (없으면 생성)
+
+        새 연결을 만들 때 이미 끝난 스레드의 연결을 닫는다. Streamlit 처럼 실행마다 새 스레드를 쓰는
+        프로세스에서도 열린 연결 수가 살아 있는 스레드 수를 넘지 않는다.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._open_connection()
+            self._local.conn = conn
+            with self._connections_lock:
+                finished = [thread for thread in self._connections if not thread.is_alive()]
+                stale = [self._connections.pop(thread) for thread in finished]
+                self._connections[threading.current_thread()] = conn
+            for old in stale:
+                old.close()
+        return conn
+
+    def _schema_version(self) -> int:
+        """본 DB 의 스키마 버전 (PRAGMA user_version, 읽기 전용으로 확인)"""
+        conn = sqlite3.connect(self._read_only_uri(self.db_path), uri=True)
+        try:
+            return conn.execute('PRAGMA user_version').fetchone()[0]
+        finally:
+            conn.close()
+
+    def refresh_snapshot(self) -> float:
+        """본 DB 를 snapshot_path 로 다시 복사하고 걸린 시간(초) 반환
+
+        백업은 한 번의 읽기 트랜잭션으로 일관된 시점을 복사하며, WAL 모드에서는 쓰는 쪽을 막지 않는다.
+        사본으로의 기록도 한 트랜잭션이라 사본을 읽던 연결은 이전 또는 새 내용 중 하나만 본다.
+        """
+        if self.snapshot_path is None:
+            raise ValueError("snapshot_path 가 설정되지 않았습니다")
+        started = time.perf_counter()
+        with self._snapshot_lock:
+            if self._snapshot_conn is None:
+                self._snapshot_conn = sqlite3.connect(self.snapshot_path, check_same_thread=False)
+            source = sqlite3.connect(self._read_only_uri(self.db_path), uri=True)
+            try:
+                source.backup(self._snapshot_conn)
+            finally:
+                source.close()
+            self._snapshot_at = time.monotonic()
+        return time.perf_counter() - started
+
+    def _refresh_snapshot_if_stale(self):
+        """사본이 snapshot_interval 초보다 오래되었으면 갱신 (다른 스레드가 갱신 중이면 기존 사본으로 읽음)"""
+        if time.monotonic() - self._snapshot_at < self.snapshot_interval:
+            return
+        if self._snapshot_lock.locked():
+            return
+        self.refresh_snapshot()
+
+    @contextmanager
+    def _connection(self):
+        """트랜잭션 범위의 연결 제공 (정상 종료 시 커밋, 예외 시 롤백)"""
+        if self.snapshot_path is not None:
+            self._refresh_snapshot_if_stale()
+        if self.reuse_connections:
+            conn = self._thread_connection()
+            with conn:
+                yield conn
+        else:
+            conn = self._open_connection()
+            try:
+                with conn:
+                    yield conn
+            finally:
+                conn.close()
+
+    def close(self):
+        """write-behind 큐를 비우고 이 객체가 연 모든 스레드별 연결 닫기
+
+        write-behind 묶음 중 기록하지 못한 건이 있으면 연결을 모두 닫은 뒤 WriteBehindError 를 낸다.
+        """
+        writer = getattr(self, '_writer', None)
+        try:
+            if writer is not None:
+                self._writer = None
+                atexit.unregister(self._drain_at_exit)
+                writer.close()
+        finally:
+            self._close_connections()
+
+    def _close_connections(self):
+        """유사 상황 인덱스를 저장하고 모든 스레드별 연결·스냅샷 연결 닫기"""
+        similarity_index = getattr(self, 'similarity_index', None)
+        if similarity_index is not None and not self.read_only:
+            similarity_index.close()
+        with self._connections_lock:
+            connections, self._connections = list(self._connections.values()), {}
+            self._local = threading.local()
+        for conn in connections:
+            conn.close()
+        with self._snapshot_lock:
+            if self._snapshot_conn is not None:
+                self._snapshot_conn.close()
+                self._snapshot_conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def init_database(self):
+        """스키마를 최신 버전으로 맞추기
+
+        PRAGMA user_version 이 SCHEMA_VERSION 이면 DDL 없이 끝나고, 아니면 MIGRATIONS 의 남은 단계를
+        순서대로 한 트랜잭션에서 적용한다. 버전이 없던 기존 DB 는 1단계부터 적용된다 (모두 IF NOT EXISTS).
+        마이그레이션이 남긴 채우기 작업 (schema_follow_ups) 은 끝난 것만 지우므로, 도중에 프로세스가
+        죽거나 예외가 나면 다음에 열 때 다시 실행된다.
+        """
+        with self._connection() as conn:
+            version = conn.execute('PRAGMA user_version').fetchone()[0]
+        if version < SCHEMA_VERSION:
+            self._migrate()
+
+        if self.indexed_fields:
+            with self._connection() as conn:
+                for name in self.indexed_fields:
+                    conn.execute(f'CREATE INDEX IF NOT EXISTS idx_trading_logs_{name} ON trading_logs ({name})')
+        if self.payload_codec:
+            self._active_dictionary_id = self._latest_dictionary_id(self.payload_codec)
+        self._run_follow_ups()
+
+    def _migrate(self):
+        """남은 마이그레이션 적용 (다른 프로세스와 겹치지 않도록 쓰기 잠금을 잡고 버전을 다시 읽는다)
+
+        각 단계가 돌려준, 커밋 뒤에 실행할 채우기 메서드 이름은 버전과 같은 트랜잭션에서
+        schema_follow_ups 에 마이그레이션 순서대로 기록한다 (_run_follow_ups 가 실행).
+        """
+        with self._connection() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            version = conn.execute('PRAGMA user_version').fetchone()[0]
+            pending = [(number, description) for number, description in MIGRATIONS if number > version]
+            if not pending:
+                conn.commit()
+                return
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS schema_follow_ups (
+                    name TEXT PRIMARY KEY,
+                    version INTEGER NOT NULL
                 )
             ''')
-            
-            # AI 자기반성 테이블 (과거 매매 결과 분석 및 학습)
+            for number, description in pending:
+                for name in getattr(self, f'_migrate_v{number}')(conn) or []:
+                    conn.execute('INSERT OR IGNORE INTO schema_follow_ups (name, version) VALUES (?, ?)',
+                                 (name, number))
+                logger.info("스키마 마이그레이션 v%s: %s", number, description)
+            conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+            conn.commit()
+            logger.info("데이터베이스 스키마 v%s → v%s: %s", version, SCHEMA_VERSION, self.db_path)
+
+    def _run_follow_ups(self):
+        """schema_follow_ups 의 채우기 작업을 기록 순서대로 실행하고 끝난 것만 목록에서 지우기
+
+        메서드가 False 를 돌려주면 (예: FTS5 를 지원하지 않아 create_search_index 를 할 수 없음)
+        목록에 남겨 두고 다음에 열 때 다시 시도한다.
+        """
+        with self._connection() as conn:
+            if not conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_follow_ups'"
+            ).fetchone():
+                return
+            names = [row[0] for row in conn.execute('SELECT name FROM schema_follow_ups ORDER BY rowid')]
+        for name in names:
+            if getattr(self, name)() is False:
+                continue
+            with self._connection() as conn:
+                conn.execute('DELETE FROM schema_follow_ups WHERE name = ?', (name,))
+
+    def _migrate_v1(self, conn: sqlite3.Connection) -> List[str]:
+        """기본 테이블, epoch·추출 컬럼, 압축 사전, 아카이브 목록, 거래 통계와 트리거, 관리 인덱스"""
+        cursor = conn.cursor()
+
+        # 매매 분석 로그 테이블
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS trading_logs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp TEXT NOT NULL,
+                current_price REAL NOT NULL,
+                krw_balance REAL,
+                btc_balance REAL,
+                total_portfolio_value REAL,
+                investment_status_json TEXT,
+                ai_decision TEXT NOT NULL,
+                ai_reason TEXT,
+                ai_confidence TEXT,
+                ai_analysis_full_json TEXT,
+                market_data_json TEXT,
+                analysis_type TEXT,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        # 실제 거래 기록 테이블
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS actual_trades (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp TEXT NOT NULL,
+                trade_type TEXT NOT NULL, -- 'buy' or 'sell'
+                price REAL NOT NULL,
+                amount REAL NOT NULL,
+                total_value REAL NOT NULL,
+                fee REAL DEFAULT 0,
+                order_id TEXT,
+                success BOOLEAN DEFAULT 1,
+                error_message TEXT,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        # 포트폴리오 스냅샷 테이블 (일별 포트폴리오 가치 추적용)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS portfolio_snapshots (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                date TEXT NOT NULL UNIQUE,
+                krw_balance REAL NOT NULL,
+                btc_balance REAL NOT NULL,
+                btc_avg_price REAL,
+                total_value REAL NOT NULL,
+                profit_loss REAL DEFAULT 0,
+                profit_loss_percent REAL DEFAULT 0,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        # AI 자기반성 테이블 (과거 매매 결과 분석 및 학습)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS self_reflections (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                reflection_date TEXT NOT NULL,
+                analysis_period_start TEXT NOT NULL,
+                analysis_period_end TEXT NOT NULL,
+                total_trades_analyzed INTEGER DEFAULT 0,
+                successful_trades INTEGER DEFAULT 0,
+                failed_trades INTEGER DEFAULT 0,
+                total_profit_loss REAL DEFAULT 0,
+                win_rate REAL DEFAULT 0,
+                market_conditions_then TEXT,
+                market_conditions_now TEXT,
+                reflection_content TEXT NOT NULL,
+                lessons_learned TEXT,
+                improvement_suggestions TEXT,
+                confidence_adjustment REAL DEFAULT 0,
+                strategy_modifications TEXT,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        # JSONL 마이그레이션 체크포인트 테이블 (파일별 마지막 커밋 바이트 오프셋)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS import_checkpoints (
+                source_path TEXT PRIMARY KEY,
+                byte_offset INTEGER NOT NULL DEFAULT 0,
+                rows_imported INTEGER NOT NULL DEFAULT 0,
+                rows_rejected INTEGER NOT NULL DEFAULT 0,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        # 정수 epoch 시간 컬럼 추가 및 기존 행 채우기
+        for table, columns in EPOCH_COLUMNS.items():
+            added = self._ensure_columns(cursor, table, columns)
+            if 'timestamp_ms' in added:
+                cursor.execute(f'UPDATE {table} SET timestamp_ms = epoch_ms(timestamp, 0)')
+            if 'created_at_ms' in added:
+                cursor.execute(f'UPDATE {table} SET created_at_ms = epoch_ms(created_at, 1)')
+
+        # JSON 문서에서 뽑아 둔 컬럼 추가 (새로 추가된 경우 기존 행 채우기)
+        extracted_added = self._ensure_columns(cursor, 'trading_logs', {
+            name: 'TEXT' if column_type == 'JSON' else column_type
+            for name, (column_type, _, _) in EXTRACTED_FIELDS.items()
+        })
+
+        # 압축 사전 테이블 (사전 ID 는 압축된 값의 헤더에 기록된다)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS compression_dictionaries (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                codec TEXT NOT NULL,
+                dictionary BLOB NOT NULL,
+                sample_count INTEGER DEFAULT 0,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        # 월별 아카이브 파티션 목록 (경로는 DB 파일 기준 상대 경로, id 범위는 테이블별)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS archive_partitions (
+                month TEXT PRIMARY KEY,
+                path TEXT NOT NULL,
+                start_ms INTEGER NOT NULL,
+                end_ms INTEGER NOT NULL,
+                trading_logs_rows INTEGER DEFAULT 0,
+                trading_logs_min_id INTEGER,
+                trading_logs_max_id INTEGER,
+                actual_trades_rows INTEGER DEFAULT 0,
+                actual_trades_min_id INTEGER,
+                actual_trades_max_id INTEGER,
+                archived_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        # 거래·AI 결정 통계 테이블 (트리거로 증분 갱신, 새로 만든 경우 기존 행으로 채우기)
+        stats_exists = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'trading_stats'"
+        ).fetchone()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS trading_stats (
+                scope TEXT NOT NULL,
+                key TEXT NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                total REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (scope, key)
+            )
+        ''')
+        for name, definition in STATS_TRIGGERS.items():
+            cursor.execute(f'CREATE TRIGGER IF NOT EXISTS {name} {definition}')
+        if not stats_exists:
+            cursor.executemany(ADD_STATS_SQL, self._aggregate_stats(conn, 'main'))
+
+        self._sync_indexes(cursor)
+        return ['backfill_extracted_fields'] if extracted_added else []
+
+    def _migrate_v2(self, conn: sqlite3.Connection):
+        """예측 정확도·시장 상황·외부 이벤트·전략 성과 테이블 (운영 DB 에 먼저 만들어진 정의 그대로)"""
+        cursor = conn.cursor()
+
+        # AI 예측 정확도 (분석 로그별 1시간/4시간/24시간 뒤 가격과 적중 여부)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS prediction_accuracy (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                log_id INTEGER,
+                prediction_date DATETIME NOT NULL,
+                ai_prediction TEXT NOT NULL,
+                ai_confidence REAL,
+                predicted_direction TEXT,
+                actual_price_1h REAL,
+                actual_price_4h REAL,
+                actual_price_24h REAL,
+                prediction_correct_1h BOOLEAN,
+                prediction_correct_4h BOOLEAN,
+                prediction_correct_24h BOOLEAN,
+                accuracy_score REAL DEFAULT 0,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (log_id) REFERENCES trading_logs (id)
+            )
+        ''')
+
+        # 시장 상황 분석
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS market_context_analysis (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                analysis_date DATETIME NOT NULL,
+                market_trend TEXT,              -- bull/bear/sideways
+                volatility_level TEXT,          -- high/medium/low
+                volume_trend TEXT,              -- increasing/decreasing/stable
+                rsi_zone TEXT,                  -- overbought/oversold/neutral
+                strategy_effectiveness REAL DEFAULT 0,
+                market_phase TEXT,              -- early/mid/late
+                fear_greed_index INTEGER,
+                kimchi_premium REAL,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        # 외부 이벤트 (뉴스·정책 등)와 실제 가격 영향
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS external_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                event_date DATETIME NOT NULL,
+                event_type TEXT NOT NULL,       -- news/policy/technical/social
+                event_title TEXT,
+                event_description TEXT,
+                source TEXT,
+                predicted_impact TEXT,          -- bullish/bearish/neutral
+                actual_impact_1h REAL,
+                actual_impact_24h REAL,
+                impact_accuracy REAL DEFAULT 0,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        # 전략별 성과
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS strategy_performance (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                strategy_name TEXT NOT NULL,
+                date_used DATETIME NOT NULL,
+                market_condition TEXT,
+                entry_price REAL,
+                exit_price REAL,
+                position_size REAL,
+                hold_duration_hours REAL,
+                profit_loss REAL,
+                profit_loss_percent REAL,
+                strategy_confidence REAL,
+                success BOOLEAN,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+    def _migrate_v3(self, conn: sqlite3.Connection) -> List[str]:
+        """가격 틱·캔들 테이블과 트리거 (기존 분석 로그의 가격은 커밋 뒤 backfill_price_ticks 로 채운다)"""
+        cursor = conn.cursor()
+
+        # 가격 틱 (분석 로그 저장 시 트리거로 추가, 같은 밀리초의 두 번째 틱은 무시)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS price_ticks (
+                timestamp_ms INTEGER PRIMARY KEY,
+                price REAL NOT NULL,
+                high_24h REAL,
+                low_24h REAL,
+                volume_24h REAL
+            )
+        ''')
+
+        # 해상도별 OHLC 캔들 (bucket_ms: UTC 기준 구간 시작, 틱이 추가될 때 트리거로 갱신)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS price_candles (
+                resolution TEXT NOT NULL,
+                bucket_ms INTEGER NOT NULL,
+                open REAL NOT NULL,
+                high REAL NOT NULL,
+                low REAL NOT NULL,
+                close REAL NOT NULL,
+                open_ms INTEGER NOT NULL,
+                close_ms INTEGER NOT NULL,
+                ticks INTEGER NOT NULL DEFAULT 1,
+                PRIMARY KEY (resolution, bucket_ms)
+            ) WITHOUT ROWID
+        ''')
+        for name, definition in PRICE_TRIGGERS.items():
+            cursor.execute(f'CREATE TRIGGER IF NOT EXISTS {name} {definition}')
+        return ['backfill_price_ticks']
+
+    def _migrate_v4(self, conn: sqlite3.Connection):
+        """prediction_accuracy 에 결정 시각(epoch ms) 컬럼과 log_id 유일 인덱스 추가 (같은 로그는 한 번만 채점)"""
+        cursor = conn.cursor()
+        self._ensure_columns(cursor, 'prediction_accuracy', {'prediction_ms': 'INTEGER'})
+        cursor.execute('''
+            DELETE FROM prediction_accuracy WHERE log_id IS NOT NULL AND id NOT IN (
+                SELECT MIN(id) FROM prediction_accuracy WHERE log_id IS NOT NULL GROUP BY log_id
+            )
+        ''')
+        cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_prediction_accuracy_log_id ON prediction_accuracy (log_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_prediction_accuracy_prediction_ms ON prediction_accuracy (prediction_ms)')
+
+    def _migrate_v5(self, conn: sqlite3.Connection) -> List[str]:
+        """AI 판단 근거·자기반성 FTS5 색인과 동기화 트리거 (기존 행은 커밋 뒤 rebuild_search_index 로 색인)
+
+        FTS5 를 지원하지 않는 SQLite 에서는 create_search_index 를 남겨 두어, SQLite 를 올린 뒤 다시 연
+        때 색인을 만든다.
+        """
+        return ['rebuild_search_index'] if self._create_search_tables(conn) else ['create_search_index']
+
+    def _create_search_tables(self, conn: sqlite3.Connection) -> bool:
+        """{table}_fts 색인과 트리거 만들기 (FTS5 를 쓸 수 없으면 경고 후 False)"""
+        cursor = conn.cursor()
+        for table, columns in SEARCH_COLUMNS.items():
+            for tokenizer in SEARCH_TOKENIZERS:
+                try:
+                    cursor.execute(f'''
+                        CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts USING fts5(
+                            {', '.join(columns)}, content='{table}', content_rowid='id', tokenize='{tokenizer}'
+                        )
+                    ''')
+                    break
+                except sqlite3.OperationalError as e:
+                    last_error = e
+            else:
+                logger.warning("전문 검색 색인을 만들 수 없습니다 (FTS5 미지원 SQLite): %s", last_error)
+                return False
+            for name, definition in _search_triggers(table, columns).items():
+                cursor.execute(f'CREATE TRIGGER IF NOT EXISTS {name} {definition}')
+        return True
+
+    def _migrate_v6(self, conn: sqlite3.Connection):
+        """변경 토큰용 테이블별 수정·삭제 카운터 (table_changes) 와 카운터 트리거"""
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS table_changes (
+                name TEXT PRIMARY KEY,
+                changes INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        cursor.executemany('INSERT OR IGNORE INTO table_changes (name) VALUES (?)',
+                           [(table,) for table in CHANGE_TOKEN_TABLES])
+        for table in CHANGE_TOKEN_TABLES:
+            for name, definition in _change_counter_triggers(table).items():
+                cursor.execute(f'CREATE TRIGGER IF NOT EXISTS {name} {definition}')
+
+    def _latest_dictionary_id(self, codec: str) -> int:
+        """코덱의 가장 최근 압축 사전 ID (없으면 0)"""
+        with self._connection() as conn:
+            row = conn.execute(
+                'SELECT MAX(id) FROM compression_dictionaries WHERE codec = ?', (codec,)
+            ).fetchone()
+        return row[0] or 0
+
+    def _compression_dictionary(self, dictionary_id: int) -> Optional[bytes]:
+        """압축 사전 조회 (객체에 캐시)"""
+        if not dictionary_id:
+            return None
+        dictionary = self._compression_dictionaries.get(dictionary_id)
+        if dictionary is None:
+            with self._connection() as conn:
+                row = conn.execute(
+                    'SELECT dictionary FROM compression_dictionaries WHERE id = ?', (dictionary_id,)
+                ).fetchone()
+            if row is None:
+                raise ValueError(f"압축 사전을 찾을 수 없습니다 (ID: {dictionary_id})")
+            dictionary = self._compression_dictionaries[dictionary_id] = bytes(row[0])
+        return dictionary
+
+    def _zstd_codec(self, dictionary_id: int):
+        """현재 스레드용 zstd (압축기, 해제기) - 사전 준비 비용이 커서 사전별로 재사용한다"""
+        codecs = getattr(self._local, 'zstd_codecs', None)
+        if codecs is None:
+            codecs = self._local.zstd_codecs = {}
+        codec = codecs.get(dictionary_id)
+        if codec is None:
+            dictionary = self._compression_dictionary(dictionary_id)
+            dict_data = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+            codec = codecs[dictionary_id] = (
+                zstandard.ZstdCompressor(level=self.compression_level, dict_data=dict_data),
+                zstandard.ZstdDecompressor(dict_data=dict_data),
+            )
+        return codec
+
+    def encode_payload(self, text: str, codec: Optional[str] = None, dictionary_id: Optional[int] = None):
+        """JSON 텍스트를 저장 형식으로 변환 (codec: 기본은 payload_codec, '' 이면 텍스트 그대로)"""
+        codec = self.payload_codec if codec is None else codec
+        if not codec:
+            return text
+        if dictionary_id is None:
+            dictionary_id = self._active_dictionary_id if codec == self.payload_codec else 0
+        dictionary = self._compression_dictionary(dictionary_id)
+        data = text.encode('utf-8')
+        if codec == 'zstd':
+            compressed = self._zstd_codec(dictionary_id)[0].compress(data)
+        else:
+            compressor = zlib.compressobj(self.compression_level, zdict=dictionary) if dictionary \
+                else zlib.compressobj(self.compression_level)
+            compressed = compressor.compress(data) + compressor.flush()
+        return PAYLOAD_HEADER.pack(PAYLOAD_CODEC_IDS[codec], dictionary_id) + compressed
+
+    def decode_payload(self, value):
+        """저장된 값을 JSON 텍스트로 복원 (압축되지 않은 텍스트는 그대로)"""
+        if not isinstance(value, (bytes, memoryview)):
+            return value
+        value = bytes(value)
+        codec_id, dictionary_id = PAYLOAD_HEADER.unpack_from(value)
+        body = value[PAYLOAD_HEADER.size:]
+        if codec_id == PAYLOAD_CODEC_IDS['zstd']:
+            if zstandard is None:
+                raise ValueError("zstd 로 압축된 데이터를 읽으려면 zstandard 패키지가 필요합니다")
+            data = self._zstd_codec(dictionary_id)[1].decompress(body)
+        elif codec_id == PAYLOAD_CODEC_IDS['zlib']:
+            dictionary = self._compression_dictionary(dictionary_id)
+            decompressor = zlib.decompressobj(zdict=dictionary) if dictionary else zlib.decompressobj()
+            data = decompressor.decompress(body) + decompressor.flush()
+        else:
+            raise ValueError(f"알 수 없는 압축 코덱 ID: {codec_id}")
+        return data.decode('utf-8')
+
+    def _column_names(self, table: str, columns: Optional[Sequence[str]]) -> List[str]:
+        """컬럼 이름 목록 (None 이면 테이블의 전체 컬럼) - 테이블에 없는 컬럼 이름은 거부"""
+        known = self._table_columns.get(table)
+        if known is None:
+            with self._connection() as conn:
+                info = conn.execute(f'PRAGMA main.table_info({table})').fetchall()
+            known = tuple(row[1] for row in info)
+            self._column_types[table] = {row[1]: row[2] for row in info}
+            self._table_columns[table] = known
+        if columns is None:
+            return list(known)
+        unknown = [column for column in columns if column not in known]
+        if unknown:
+            raise ValueError(f"{table} 에 없는 컬럼: {', '.join(unknown)}")
+        return list(columns)
+
+    @staticmethod
+    def _archive_partitions(conn: sqlite3.Connection) -> List[Dict]:
+        """등록된 월별 아카이브 파티션 (월 순서)"""
+        cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row
+        return [dict(row) for row in cursor.execute('SELECT * FROM archive_partitions ORDER BY month')]
+
+    @staticmethod
+    def _partition_alias(month: str) -> str:
+        """파티션을 ATTACH 할 때 쓰는 스키마 이름"""
+        return 'archive_' + month.replace('-', '_')
+
+    def _partition_path(self, partition: Dict) -> str:
+        """파티션 파일의 절대 경로 (등록된 경로는 DB 파일 기준 상대 경로)"""
+        return os.path.join(os.path.dirname(os.path.abspath(self.db_path)), partition['path'])
+
+    @staticmethod
+    def _attach_limit(conn: sqlite3.Connection) -> int:
+        """한 연결에 동시에 ATTACH 할 수 있는 DB 수"""
+        getlimit = getattr(conn, 'getlimit', None)  # Python 3.11+
+        return getlimit(sqlite3.SQLITE_LIMIT_ATTACHED) if getlimit else 10
+
+    def _attach(self, conn: sqlite3.Connection, partitions: Sequence[Dict]):
+        """파티션 파일 ATTACH (이미 붙어 있으면 그대로 두고, 한도를 넘으면 이번에 필요 없는 것부터 분리)"""
+        attached = [row[1] for row in conn.execute('PRAGMA database_list') if row[1].startswith('archive_')]
+        needed = {self._partition_alias(partition['month']) for partition in partitions}
+        limit = self._attach_limit(conn)
+        for partition in partitions:
+            alias = self._partition_alias(partition['month'])
+            if alias in attached:
+                continue
+            while len(attached) >= limit:
+                victim = next(name for name in attached if name not in needed)
+                conn.execute(f'DETACH DATABASE {victim}')
+                attached.remove(victim)
+            conn.execute(f'ATTACH DATABASE ? AS {alias}', (self._partition_path(partition),))
+            attached.append(alias)
+
+    def _segments(self, conn: sqlite3.Connection, table: str, key: str,
+                  lo: int, hi: int) -> List[Tuple[int, int, List[Dict]]]:
+        """키 구간 [lo, hi) 를 함께 ATTACH 할 수 있는 파티션 묶음별 구간으로 나누기 (plan_segments 참고)
+
+        key 가 timestamp_ms 이면 파티션의 월 범위, id 이면 파티션에 들어 있는 id 범위로 겹침을 판단한다.
+        """
+        if table not in ARCHIVE_TABLES:
+            return [(lo, hi, [])]
+        partitions = [p for p in self._archive_partitions(conn) if p[f'{table}_rows']]
+        if key == 'timestamp_ms':
+            ranges = [(p['start_ms'], p['end_ms'], p['month']) for p in partitions]
+        else:
+            ranges = [(p[f'{table}_min_id'], p[f'{table}_max_id'] + 1, p['month']) for p in partitions]
+        by_month = {p['month']: p for p in partitions}
+        return [
+            (segment_lo, segment_hi, [by_month[month] for month in months])
+            for segment_lo, segment_hi, months in plan_segments(lo, hi, ranges, self._attach_limit(conn))
+        ]
+
+    def _union_sql(self, conn: sqlite3.Connection, table: str, expressions: Sequence[str],
+                   partitions: Sequence[Dict], where: str) -> str:
+        """본 DB 와 파티션들의 같은 테이블을 UNION ALL 로 잇는 SELECT (파라미터는 분기 수만큼 반복)
+
+        파티션에 아직 없는 컬럼(아카이브 이후 추가된 컬럼)은 NULL 로 채운다.
+        """
+        branches = [f"SELECT {', '.join(expressions)} FROM main.{table} WHERE {where}"]
+        for partition in partitions:
+            alias = self._partition_alias(partition['month'])
+            available = {row[1] for row in conn.execute(f'PRAGMA {alias}.table_info({table})')}
+            select = [
+                expression if not expression.isidentifier() or expression in available else f'NULL AS {expression}'
+                for expression in expressions
+            ]
+            branches.append(f"SELECT {', '.join(select)} FROM {alias}.{table} WHERE {where}")
+        return ' UNION ALL '.join(branches)
+
+    def _read_range(self, table: str, columns: Optional[Sequence[str]], lo: int, hi: int, order_by: str,
+                    descending: bool = False, where: str = '', params: tuple = (),
+                    as_dict: bool = True) -> List:
+        """timestamp_ms 가 [lo, hi) 인 행을 본 DB 와 겹치는 아카이브 파티션에서 함께 읽기
+
+        order_by 는 컬럼 이름 기준 정렬이며, descending 이면 구간도 최신 것부터 읽는다.
+        where 는 ' AND ...' 형태의 추가 조건이다. as_dict 가 거짓이면 튜플 목록을 반환한다.
+        """
+        if columns is not None and not all(column.isidentifier() for column in columns):
+            names = list(columns)  # 식이 섞인 내부 호출
+        else:
+            names = self._column_names(table, columns)
+        # UNION ALL 의 ORDER BY 는 결과 컬럼만 쓸 수 있으므로 정렬 컬럼을 뒤에 붙여 읽고 떼어낸다
+        order_columns = [term.split()[0] for term in order_by.split(',')]
+        select = names + [column for column in order_columns if column not in names]
+
+        rows = []
+        with self._connection() as conn:
+            segments = self._segments(conn, table, 'timestamp_ms', lo, hi)
+            for segment_lo, segment_hi, partitions in (reversed(segments) if descending else segments):
+                self._attach(conn, partitions)
+                sql = self._union_sql(conn, table, select, partitions, f'timestamp_ms >= ? AND timestamp_ms < ?{where}')
+                rows.extend(conn.execute(f'{sql} ORDER BY {order_by}',
+                                         (segment_lo, segment_hi, *params) * (len(partitions) + 1)))
+        if as_dict:
+            return [dict(zip(names, row)) for row in rows]
+        return [row[:len(names)] for row in rows] if len(select) > len(names) else rows
+
+    def _row_converter(self, table: str, names: Sequence[str], row_format: str):
+        """값 튜플 → row_format 행 변환 함수 (trading_logs 의 압축된 JSON 컬럼은 풀어준다, 변환이 없으면 None)"""
+        check_row_format(row_format)
+        names = tuple(names)
+        payload = [i for i, name in enumerate(names) if name in PAYLOAD_COLUMNS] if table == 'trading_logs' else []
+        decode = self.decode_payload
+
+        def decoded(row: tuple) -> tuple:
+            if not any(isinstance(row[i], (bytes, memoryview)) for i in payload):
+                return row
+            values = list(row)
+            for i in payload:
+                values[i] = decode(values[i])
+            return tuple(values)
+
+        if row_format == 'dict':
+            if payload:
+                return lambda row: dict(zip(names, decoded(row)))
+            return lambda row: dict(zip(names, row))
+        if row_format == 'record':
+            self._column_names(table, None)  # 선언 타입 읽어 두기
+            types = self._column_types[table]
+            make = record_class(table, tuple((name, types.get(name, '')) for name in names))._make
+            return (lambda row: make(decoded(row))) if payload else make
+        return decoded if payload else None
+
+    def _format_rows(self, table: str, names: Sequence[str], rows: List[tuple], row_format: str = 'dict') -> List:
+        """값 튜플 목록을 row_format 에 맞게 변환 ('dict' 는 dict 목록, 나머지는 Rows)"""
+        convert = self._row_converter(table, names, row_format)
+        if convert is not None:
+            rows = list(map(convert, rows))
+        return rows if row_format == 'dict' else Rows(rows, names)
+
+    def train_compression_dictionary(self, codec: Optional[str] = None, sample_size: int = 2000,
+                                     dictionary_size: int = 64 * 1024) -> int:
+        """최근 trading_logs 의 JSON 컬럼으로 압축 사전을 만들어 저장하고 사전 ID 반환
+
+        zstd 는 zstandard.train_dictionary 로 학습하고, zlib 은 표본 문서를 이어 붙인 뒤
+        끝부분 32KB 를 미리 채워 둘 사전(zdict)으로 쓴다. 이후 이 객체의 쓰기는 새 사전을 사용한다.
+        """
+        codec = resolve_payload_codec(codec or self.payload_codec or 'auto')
+        with self._connection() as conn:
+            rows = conn.execute(f'''
+                SELECT {', '.join(PAYLOAD_COLUMNS)} FROM trading_logs
+                ORDER BY id DESC LIMIT ?
+            ''', (sample_size,)).fetchall()
+        samples = [
+            self.decode_payload(value).encode('utf-8')
+            for row in rows for value in row if value
+        ]
+        if not samples:
+            raise ValueError("압축 사전을 만들 표본 데이터가 없습니다")
+
+        if codec == 'zstd':
+            dictionary = zstandard.train_dictionary(dictionary_size, samples).as_bytes()
+        else:
+            # zlib 은 사전의 뒷부분일수록 가까운 거리로 참조되므로 최근 표본이 끝에 오도록 둔다
+            dictionary = b''.join(reversed(samples))[-ZLIB_MAX_DICTIONARY:]
+
+        with self._connection() as conn:
+            cursor = conn.cursor()
             cursor.execute('''
-                CREATE TABLE IF NOT EXISTS self_reflections (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    reflection_date TEXT NOT NULL,
-                    analysis_period_start TEXT NOT NULL,
-                    analysis_period_end TEXT NOT NULL,
-                    total_trades_analyzed INTEGER DEFAULT 0,
-                    successful_trades INTEGER DEFAULT 0,
-                    failed_trades INTEGER DEFAULT 0,
-                    total_profit_loss REAL DEFAULT 0,
-                    win_rate REAL DEFAULT 0,
-                    market_conditions_then TEXT,
-                    market_conditions_now TEXT,
-                    reflection_content TEXT NOT NULL,
-                    lessons_learned TEXT,
-                    improvement_suggestions TEXT,
-                    confidence_adjustment REAL DEFAULT 0,
-                    strategy_modifications TEXT,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                INSERT INTO compression_dictionaries (codec, dictionary, sample_count)
+                VALUES (?, ?, ?)
+            ''', (codec, dictionary, len(samples)))
+            dictionary_id = cursor.lastrowid
+            conn.commit()
+        self._compression_dictionaries[dictionary_id] = dictionary
+        if codec == self.payload_codec:
+            self._active_dictionary_id = dictionary_id
+        logger.info("압축 사전 생성 완료 (ID: %s, %s, %s bytes, 표본 %s개)",
+                    dictionary_id, codec, f"{len(dictionary):,}", len(samples))
+        return dictionary_id
+
+    def convert_payload_storage(self, codec: Optional[str], use_dictionary: bool = True,
+                                batch_size: int = 500) -> Dict:
+        """기존 trading_logs 의 JSON 컬럼을 지정한 코덱으로 제자리 변환 (codec=None 이면 압축 해제)
+
+        변환 전후의 컬럼 바이트 수와 압축률을 dict 로 반환한다.
+        파일 크기를 실제로 줄이려면 변환 후 VACUUM 이 필요하다.
+        """
+        codec = resolve_payload_codec(codec)
+        dictionary_id = 0
+        if codec and use_dictionary:
+            dictionary_id = self._latest_dictionary_id(codec) or self.train_compression_dictionary(codec)
+
+        bytes_before = bytes_after = rows_converted = 0
+        last_id = 0
+        columns = ', '.join(PAYLOAD_COLUMNS)
+        assignments = ', '.join(f'{column} = ?' for column in PAYLOAD_COLUMNS)
+        while True:
+            with self._connection() as conn:
+                rows = conn.execute(f'''
+                    SELECT id, {columns} FROM trading_logs
+                    WHERE id > ? ORDER BY id LIMIT ?
+                ''', (last_id, batch_size)).fetchall()
+                if not rows:
+                    break
+                params = []
+                for log_id, *values in rows:
+                    encoded = []
+                    for value in values:
+                        if value is None:
+                            encoded.append(None)
+                            continue
+                        text = self.decode_payload(value)
+                        new_value = self.encode_payload(text, codec or '', dictionary_id)
+                        bytes_before += len(value.encode('utf-8') if isinstance(value, str) else value)
+                        bytes_after += len(new_value.encode('utf-8') if isinstance(new_value, str) else new_value)
+                        encoded.append(new_value)
+                    params.append((*encoded, log_id))
+                conn.executemany(f'UPDATE trading_logs SET {assignments} WHERE id = ?', params)
+                conn.commit()
+            rows_converted += len(rows)
+            last_id = rows[-1][0]
+
+        ratio = bytes_before / bytes_after if bytes_after else 0
+        logger.info("JSON 컬럼 변환 완료 (%s): %s건, %s → %s bytes (압축률 %.2fx)",
+                    codec or '무압축', rows_converted, f"{bytes_before:,}", f"{bytes_after:,}", ratio)
+        return {
+            'codec': codec,
+            'dictionary_id': dictionary_id,
+            'rows_converted': rows_converted,
+            'bytes_before': bytes_before,
+            'bytes_after': bytes_after,
+            'compression_ratio': ratio,
+        }
+
+    def backfill_extracted_fields(self, batch_size: int = 1000) -> int:
+        """저장된 JSON 문서에서 EXTRACTED_FIELDS 컬럼을 다시 채우고 갱신한 행 수 반환"""
+        assignments = ', '.join(f'{name} = ?' for name in EXTRACTED_FIELDS)
+        updated = 0
+        last_id = 0
+        while True:
+            with self._connection() as conn:
+                rows = conn.execute('''
+                    SELECT id, market_data_json, ai_analysis_full_json FROM trading_logs
+                    WHERE id > ? ORDER BY id LIMIT ?
+                ''', (last_id, batch_size)).fetchall()
+                if not rows:
+                    break
+                params = []
+                for log_id, market_data_json, ai_analysis_json in rows:
+                    try:
+                        market_data = json.loads(self.decode_payload(market_data_json) or '{}')
+                        ai_analysis = json.loads(self.decode_payload(ai_analysis_json) or '{}')
+                    except ValueError:
+                        continue
+                    params.append((*extract_fields(market_data, ai_analysis), log_id))
+                conn.executemany(f'UPDATE trading_logs SET {assignments} WHERE id = ?', params)
+                conn.commit()
+            updated += len(params)
+            last_id = rows[-1][0]
+        if updated:
+            logger.info("추출 컬럼 채우기 완료 (%s건)", updated)
+        return updated
+
+    def backfill_price_ticks(self, batch_size: int = 5000) -> int:
+        """저장된 분석 로그(아카이브 포함)의 가격을 price_ticks 에 채우고 새로 추가한 틱 수 반환
+
+        이미 있는 시각의 틱은 건너뛰므로 여러 번 실행해도 캔들이 중복 집계되지 않는다.
+        """
+        added = 0
+        for page in self.iter_logs(batch_size=batch_size, columns=PRICE_TICK_LOG_COLUMNS,
+                                   batches=True, row_format='tuple'):
+            added += self._insert_price_ticks([
+                row[1:] for row in page if row[1] is not None and (row[2] or 0) > 0
+            ])
+        if added:
+            logger.info("가격 틱 채우기 완료 (%s건)", added)
+        return added
+
+    def archive_old_rows(self, older_than_days: Optional[int] = None, now=None) -> Dict[str, Dict[str, int]]:
+        """older_than_days (기본: archive_after_days) 일보다 오래된 trading_logs / actual_trades 행을
+        월별 아카이브 파일로 옮기고 월별로 옮긴 행 수를 반환
+
+        행은 먼저 아카이브 파일에 커밋한 뒤 본 DB 에서 지우므로 중간에 멈춰도 행을 잃지 않으며,
+        다시 실행하면 남은 행을 이어서 정리한다. 옮긴 행도 trading_stats 통계에는 그대로 남는다.
+        본 DB 파일 크기를 실제로 줄이려면 VACUUM 이 필요하다.
+        """
+        days = self.archive_after_days if older_than_days is None else older_than_days
+        cutoff_ms = to_epoch_ms((now or local_now()) - timedelta(days=days))
+        self.flush()
+        with self._connection() as conn:
+            months = sorted({
+                row[0] for table in ARCHIVE_TABLES for row in conn.execute(f'''
+                    SELECT DISTINCT strftime('%Y-%m', timestamp_ms / 1000 + {LOCAL_OFFSET_SECONDS}, 'unixepoch')
+                    FROM {table} WHERE timestamp_ms < ?
+                ''', (cutoff_ms,))
+            })
+        if not months:
+            return {}
+
+        os.makedirs(self.archive_dir, exist_ok=True)
+        moved = {month: self._archive_month(month, cutoff_ms) for month in months}
+        total = {table: sum(counts[table] for counts in moved.values()) for table in ARCHIVE_TABLES}
+        logger.info("아카이브 완료: %s (분석 로그 %s건, 거래 %s건 → %s)",
+                    ', '.join(months), total['trading_logs'], total['actual_trades'], self.archive_dir)
+        return moved
+
+    def _archive_month(self, month: str, cutoff_ms: int) -> Dict[str, int]:
+        """한 달치 행 중 cutoff_ms 이전 것을 그 달의 아카이브 파일로 이동"""
+        start_ms, end_ms = month_bounds_ms(month)
+        move_end = min(end_ms, cutoff_ms)
+        stem = os.path.splitext(os.path.basename(self.db_path))[0]
+        path = os.path.join(self.archive_dir, f'{stem}_{month}.db')
+        partition = {
+            'month': month,
+            'path': os.path.relpath(os.path.abspath(path), os.path.dirname(os.path.abspath(self.db_path))),
+        }
+        alias = self._partition_alias(month)
+        in_range = 'timestamp_ms >= ? AND timestamp_ms < ?'
+
+        with self._connection() as conn:
+            self._attach(conn, [partition])
+
+            # 1단계: 아카이브 파일에 복사하고 커밋
+            for table in ARCHIVE_TABLES:
+                self._ensure_archive_table(conn, alias, table)
+                columns = ', '.join(self._column_names(table, None))
+                conn.execute(f'''
+                    INSERT OR REPLACE INTO {alias}.{table} ({columns})
+                    SELECT {columns} FROM main.{table} WHERE {in_range}
+                ''', (start_ms, move_end))
+            conn.commit()
+
+            # 2단계: 아카이브에 들어간 행만 본 DB 에서 삭제, 삭제 트리거가 뺀 통계는 다시 더하고 파티션 등록
+            copied = f'{in_range} AND id IN (SELECT id FROM {alias}.{{table}})'
+            conn.execute('BEGIN IMMEDIATE')
+            archived_stats = self._aggregate_stats(conn, 'main', copied, (start_ms, move_end))
+            search_columns = SEARCH_COLUMNS['trading_logs'] if self._search_tokenizer('trading_logs') else ()
+            archived_text = conn.execute(
+                f"SELECT id, {', '.join(search_columns)} FROM main.trading_logs WHERE {copied.format(table='trading_logs')}",
+                (start_ms, move_end)
+            ).fetchall() if search_columns else []
+            counts = {}
+            for table in ARCHIVE_TABLES:
+                counts[table] = conn.execute(
+                    f'DELETE FROM main.{table} WHERE {copied.format(table=table)}', (start_ms, move_end)
+                ).rowcount
+            conn.executemany(ADD_STATS_SQL, archived_stats)
+            # 옮긴 로그도 계속 검색되도록 삭제 트리거가 뺀 색인 항목을 다시 넣는다
+            if archived_text:
+                conn.executemany(
+                    f"INSERT INTO trading_logs_fts (rowid, {', '.join(search_columns)}) "
+                    f"VALUES ({', '.join('?' * (len(search_columns) + 1))})", archived_text
                 )
-            ''')
-            
+
+            ranges = {
+                table: conn.execute(f'SELECT COUNT(*), MIN(id), MAX(id) FROM {alias}.{table}').fetchone()
+                for table in ARCHIVE_TABLES
+            }
+            conn.execute('''
+                INSERT OR REPLACE INTO archive_partitions (
+                    month, path, start_ms, end_ms,
+                    trading_logs_rows, trading_logs_min_id, trading_logs_max_id,
+                    actual_trades_rows, actual_trades_min_id, actual_trades_max_id
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (month, partition['path'], start_ms, end_ms, *ranges['trading_logs'], *ranges['actual_trades']))
             conn.commit()
-            print(f"데이터베이스 초기화 완료: {self.db_path}")
-    
-    def save_analysis_log(self, market_data: Dict, ai_analysis: Dict, timestamp: str, analysis_type: str = "enhanced") -> int:
-        """AI 분석 결과를 데이터베이스에 저장"""
-        with sqlite3.connect(self.db_path) as conn:
+        return counts
+
+    def _ensure_archive_table(self, conn: sqlite3.Connection, alias: str, table: str):
+        """아카이브 파일에 본 DB 와 같은 구조의 테이블·시간 인덱스 만들기 (빠진 컬럼은 추가)"""
+        ddl = conn.execute(
+            "SELECT sql FROM main.sqlite_master WHERE type = 'table' AND name = ?", (table,)
+        ).fetchone()[0]
+        conn.execute(re.sub(r'^CREATE TABLE\s+"?\w+"?', f'CREATE TABLE IF NOT EXISTS {alias}.{table}', ddl, count=1))
+        existing = {row[1] for row in conn.execute(f'PRAGMA {alias}.table_info({table})')}
+        for _, name, column_type, *_ in conn.execute(f'PRAGMA main.table_info({table})').fetchall():
+            if name not in existing:
+                conn.execute(f'ALTER TABLE {alias}.{table} ADD COLUMN {name} {column_type}')
+        for name, definition in MANAGED_INDEXES.items():
+            if definition.startswith(f'{table} ') and 'timestamp_ms' in definition:
+                conn.execute(f'CREATE INDEX IF NOT EXISTS {alias}.{name} ON {definition}')
+
+    @staticmethod
+    def _ensure_columns(cursor: sqlite3.Cursor, table: str, columns: Dict[str, str]) -> List[str]:
+        """테이블에 없는 컬럼 추가 후 새로 추가한 컬럼 이름 목록 반환"""
+        existing = {row[1] for row in cursor.execute(f'PRAGMA table_info({table})')}
+        added = []
+        for name, column_type in columns.items():
+            if name not in existing:
+                cursor.execute(f'ALTER TABLE {table} ADD COLUMN {name} {column_type}')
+                added.append(name)
+        return added
+
+    @staticmethod
+    def _sync_indexes(cursor: sqlite3.Cursor):
+        """관리 인덱스 생성 및 은퇴한 인덱스 제거"""
+        for name in RETIRED_INDEXES:
+            cursor.execute(f'DROP INDEX IF EXISTS {name}')
+        for name, definition in MANAGED_INDEXES.items():
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {definition}')
+
+    def _analysis_log_row(self, market_data: Dict, ai_analysis: Dict, timestamp: str,
+                          analysis_type: str = "enhanced") -> tuple:
+        """trading_logs INSERT 파라미터 생성"""
+        investment_status = market_data.get('investment_status', {})
+        created_at, created_at_ms = _utc_now_columns()
+        return (
+            timestamp,
+            market_data.get('current_price', 0),
+            investment_status.get('krw_balance', 0),
+            investment_status.get('btc_balance', 0),
+            investment_status.get('total_portfolio_value', 0),
+            json.dumps(investment_status, ensure_ascii=False),
+            ai_analysis.get('decision', ''),
+            ai_analysis.get('reason', ''),
+            ai_analysis.get('confidence', ''),
+            self.encode_payload(json.dumps(ai_analysis, ensure_ascii=False)),  # 전체 AI 분석 결과 저장
+            self.encode_payload(json.dumps(market_data, ensure_ascii=False)),  # 전체 마켓 데이터 저장
+            analysis_type,
+            created_at,
+            to_epoch_ms(timestamp),
+            created_at_ms,
+            *extract_fields(market_data, ai_analysis)
+        )
+
+    def _analysis_log_record_row(self, log: Dict, analysis_type: str = "enhanced") -> tuple:
+        """JSONL 로그 형식의 레코드 (market_data / ai_analysis / timestamp)로 INSERT 파라미터 생성"""
+        return self._analysis_log_row(
+            log.get('market_data', {}),
+            log.get('ai_analysis', {}),
+            log.get('timestamp') or local_now().isoformat(),
+            log.get('analysis_type', analysis_type)
+        )
+
+    def _trade_row(self, trade_type: str, price: float, amount: float,
+                   total_value: float, fee: float = 0, order_id: str = None,
+                   success: bool = True, error_message: str = None, trade_time: str = None) -> tuple:
+        """actual_trades INSERT 파라미터 생성"""
+        # 거래 시간 처리 (전달받은 시간이 있으면 사용, 없으면 현재 시간)
+        trade_timestamp = trade_time if trade_time else local_now().isoformat()
+        created_at, created_at_ms = _utc_now_columns()
+        return (
+            trade_timestamp,
+            trade_type,
+            price,
+            amount,
+            total_value,
+            fee,
+            order_id,
+            success,
+            error_message,
+            created_at,
+            to_epoch_ms(trade_timestamp),
+            created_at_ms
+        )
+
+    def _portfolio_snapshot_row(self, date: str, krw_balance: float, btc_balance: float,
+                                btc_avg_price: float = 0, total_value: float = 0,
+                                profit_loss: float = 0, profit_loss_percent: float = 0) -> tuple:
+        """portfolio_snapshots INSERT 파라미터 생성"""
+        return (
+            date, krw_balance, btc_balance, btc_avg_price,
+            total_value, profit_loss, profit_loss_percent
+        )
+
+    @staticmethod
+    def _executemany_ids(cursor: sqlite3.Cursor, sql: str, rows: List[tuple]) -> List[int]:
+        """executemany 실행 후 새로 생성된 행 ID 목록 반환
+
+        한 트랜잭션 안에서 쓰기 잠금을 쥔 채 연속으로 삽입하므로 AUTOINCREMENT ID는
+        마지막 ID까지 빈틈없이 이어진다. 기존 행을 지우는 INSERT OR REPLACE 에는 쓰지 않는다
+        (교체된 행의 ID가 범위 안에 끼어든다).
+        """
+        if not rows:
+            return []
+        cursor.executemany(sql, rows)
+        last_id = cursor.execute('SELECT last_insert_rowid()').fetchone()[0]
+        return list(range(last_id - len(rows) + 1, last_id + 1))
+
+    def _add_to_similarity_index(self, log_ids: List[int], rows: List[tuple]):
+        """커밋한 로그를 유사 상황 행렬에 덧붙이기
+
+        로그는 이미 저장됐으므로 여기서 난 오류는 저장 실패로 올리지 않고 기록만 한다.
+        덧붙이지 못한 로그는 다음 find_similar_contexts 의 refresh 가 id 로 읽어 온다.
+        """
+        try:
+            self.similarity_index.add(log_ids, rows)
+        except Exception as e:
+            logger.warning("유사 상황 행렬 갱신 실패 (로그 %s건은 저장됨): %s", len(log_ids), e)
+
+    def save_analysis_log(self, market_data: Dict, ai_analysis: Dict, timestamp: str, analysis_type: str = "enhanced") -> Optional[int]:
+        """AI 분석 결과를 데이터베이스에 저장 (write-behind 모드에서는 큐에 넣고 None 반환)"""
+        row = self._analysis_log_row(market_data, ai_analysis, timestamp, analysis_type)
+        if self._writer is not None:
+            self._writer.put(INSERT_ANALYSIS_LOG_SQL, row)
+            return None
+        with self._connection() as conn:
             cursor = conn.cursor()
-            
-            investment_status = market_data.get('investment_status', {})
-            
-            cursor.execute('''
-                INSERT INTO trading_logs (
-                    timestamp, current_price, krw_balance, btc_balance, 
-                    total_portfolio_value, investment_status_json,
-                    ai_decision, ai_reason, ai_confidence,
-                    ai_analysis_full_json, market_data_json, analysis_type
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                timestamp,
-                market_data.get('current_price', 0),
-                investment_status.get('krw_balance', 0),
-                investment_status.get('btc_balance', 0),
-                investment_status.get('total_portfolio_value', 0),
-                json.dumps(investment_status, ensure_ascii=False),
-                ai_analysis.get('decision', ''),
-                ai_analysis.get('reason', ''),
-                ai_analysis.get('confidence', ''),
-                json.dumps(ai_analysis, ensure_ascii=False),  # 전체 AI 분석 결과 저장
-                json.dumps(market_data, ensure_ascii=False),  # 전체 마켓 데이터 저장
-                analysis_type
-            ))
-            
+
+            cursor.execute(INSERT_ANALYSIS_LOG_SQL, row)
+
             log_id = cursor.lastrowid
             conn.commit()
-            print(f"분석 로그 저장 완료 (ID: {log_id}) - 전체 분석 결과 포함")
-            return log_id
+        self._add_to_similarity_index([log_id], [row])
+        logger.info("분석 로그 저장 완료 (ID: %s) - 전체 분석 결과 포함", log_id)
+        return log_id
+
+    def save_analysis_logs(self, logs: List[Dict], analysis_type: str = "enhanced") -> List[int]:
+        """AI 분석 결과 여러 건을 한 트랜잭션으로 일괄 저장
+
+        logs 의 각 항목은 market_data, ai_analysis, timestamp (선택: analysis_type) 키를 가진다.
+        저장된 로그 ID 목록을 입력 순서대로 반환한다. write-behind 모드에서는 앞선 큐를 먼저 비워
+        저장 순서를 지킨다 (앞선 묶음이 실패해도 이 저장은 진행한다).
+        """
+        rows = [self._analysis_log_record_row(log, analysis_type) for log in logs]
+        self._drain_writer()
+        with self._connection() as conn:
+            log_ids = self._executemany_ids(conn.cursor(), INSERT_ANALYSIS_LOG_SQL, rows)
+            conn.commit()
+        self._add_to_similarity_index(log_ids, rows)
+        logger.info("분석 로그 일괄 저장 완료 (%s건)", len(log_ids))
+        return log_ids
     
     def save_trade(self, trade_type: str, price: float, amount: float, 
                    total_value: float, fee: float = 0, order_id: str = None, 
-                   success: bool = True, error_message: str = None, trade_time: str = None) -> int:
-        """실제 거래 내역을 데이터베이스에 저장"""
-        with sqlite3.connect(self.db_path) as conn:
+                   success: bool = True, error_message: str = None, trade_time: str = None,
+                   durable: Optional[bool] = None) -> Optional[int]:
+        """실제 거래 내역을 데이터베이스에 저장
+
+        write-behind 모드에서 durable 이 거짓이면 큐에 넣고 None 을 반환한다.
+        durable (기본: durable_trades 설정) 이 참이면 앞선 큐를 먼저 비워 순서를 지킨 뒤 바로 커밋한다.
+        앞선 큐의 로그 묶음이 실패했더라도 거래는 저장한다 (실패는 flush()/close() 가 따로 알린다).
+        """
+        row = self._trade_row(
+            trade_type, price, amount, total_value, fee,
+            order_id, success, error_message, trade_time
+        )
+        if self._writer is not None:
+            if not (self.durable_trades if durable is None else durable):
+                self._writer.put(INSERT_TRADE_SQL, row)
+                return None
+            self._drain_writer()
+        with self._connection() as conn:
             cursor = conn.cursor()
-            
-            # 거래 시간 처리 (전달받은 시간이 있으면 사용, 없으면 현재 시간)
-            trade_timestamp = trade_time if trade_time else datetime.now().isoformat()
-            
-            cursor.execute('''
-                INSERT INTO actual_trades (
-                    timestamp, trade_type, price, amount, total_value,
-                    fee, order_id, success, error_message
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                trade_timestamp,
-                trade_type,
-                price,
-                amount, 
-                total_value,
-                fee,
-                order_id,
-                success,
-                error_message
-            ))
-            
+
+            cursor.execute(INSERT_TRADE_SQL, row)
+
             trade_id = cursor.lastrowid
             conn.commit()
-            print(f"거래 내역 저장 완료 (ID: {trade_id}, {trade_type.upper()}: {price:,}원 x {amount} BTC)")
+            logger.info("거래 내역 저장 완료 (ID: %s, %s: %s원 x %s BTC)", trade_id, trade_type.upper(), f"{price:,}", amount)
             return trade_id
+
+    def save_trades(self, trades: List[Dict]) -> List[int]:
+        """거래 내역 여러 건을 한 트랜잭션으로 일괄 저장
+
+        trades 의 각 항목은 save_trade 의 인자와 같은 키를 가진다.
+        저장된 거래 ID 목록을 입력 순서대로 반환한다. write-behind 모드에서는 앞선 큐를 먼저 비워
+        저장 순서를 지킨다 (앞선 묶음이 실패해도 이 저장은 진행한다).
+        """
+        rows = [self._trade_row(**trade) for trade in trades]
+        self._drain_writer()
+        with self._connection() as conn:
+            trade_ids = self._executemany_ids(conn.cursor(), INSERT_TRADE_SQL, rows)
+            conn.commit()
+        logger.info("거래 내역 일괄 저장 완료 (%s건)", len(trade_ids))
+        return trade_ids
     
     def save_portfolio_snapshot(self, date: str, krw_balance: float, btc_balance: float,
                               btc_avg_price: float = 0, total_value: float = 0,
                               profit_loss: float = 0, profit_loss_percent: float = 0):
         """일별 포트폴리오 스냅샷 저장"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connection() as conn:
             cursor = conn.cursor()
             
-            cursor.execute('''
-                INSERT OR REPLACE INTO portfolio_snapshots (
-                    date, krw_balance, btc_balance, btc_avg_price,
-                    total_value, profit_loss, profit_loss_percent
-                ) VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (
+            cursor.execute(INSERT_PORTFOLIO_SNAPSHOT_SQL, self._portfolio_snapshot_row(
                 date, krw_balance, btc_balance, btc_avg_price,
                 total_value, profit_loss, profit_loss_percent
             ))
             
             conn.commit()
-            print(f"포트폴리오 스냅샷 저장 완료 ({date})")
-    
-    def get_recent_logs(self, limit: int = 10) -> List[Dict]:
-        """최근 분석 로그 조회"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
+            logger.info("포트폴리오 스냅샷 저장 완료 (%s)", date)
+
+    def save_portfolio_snapshots(self, snapshots: List[Dict]) -> List[int]:
+        """일별 포트폴리오 스냅샷 여러 건을 한 트랜잭션으로 일괄 저장
+
+        snapshots 의 각 항목은 save_portfolio_snapshot 의 인자와 같은 키를 가진다.
+        같은 날짜가 이미 있으면 교체되며, 저장된 스냅샷 ID 목록을 입력 순서대로 반환한다.
+        INSERT OR REPLACE 는 ID가 이어지지 않으므로 한 건씩 실행해 lastrowid 를 모으고,
+        입력 안에서 날짜가 겹치면 두 항목 모두 마지막으로 남은 행의 ID를 받는다.
+        """
+        rows = [self._portfolio_snapshot_row(**snapshot) for snapshot in snapshots]
+        ids_by_date = {}
+        with self._connection() as conn:
             cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT * FROM trading_logs 
+            for row in rows:
+                cursor.execute(INSERT_PORTFOLIO_SNAPSHOT_SQL, row)
+                ids_by_date[row[0]] = cursor.lastrowid
+            conn.commit()
+        snapshot_ids = [ids_by_date[row[0]] for row in rows]
+        logger.info("포트폴리오 스냅샷 일괄 저장 완료 (%s건)", len(snapshot_ids))
+        return snapshot_ids
+
+    def get_recent_logs(self, limit: int = 10, columns: Optional[Sequence[str]] = None,
+                        row_format: str = 'dict') -> List:
+        """최근 분석 로그 조회 (columns 를 주면 그 컬럼만 읽는다, 아카이브로 옮긴 로그는 제외)
+
+        row_format 은 'dict' / 'tuple' / 'record' 중 하나다 (records.py 참고). 다른 조회 메서드도 같다.
+        """
+        names = self._column_names('trading_logs', columns)
+        with self._connection() as conn:
+            rows = conn.execute(f'''
+                SELECT {', '.join(names)} FROM trading_logs 
                 ORDER BY created_at DESC 
                 LIMIT ?
-            ''', (limit,))
-            
-            rows = cursor.fetchall()
-            return [dict(row) for row in rows]
+            ''', (limit,)).fetchall()
+        return self._format_rows('trading_logs', names, rows, row_format)
     
-    def get_logs_by_date_range(self, start_date: str, end_date: str) -> List[Dict]:
-        """날짜 범위별 분석 로그 조회"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT * FROM trading_logs 
-                WHERE created_at BETWEEN ? AND ?
-                ORDER BY created_at ASC
-            ''', (start_date, end_date))
-            
-            rows = cursor.fetchall()
-            return [dict(row) for row in rows]
+    def get_logs_by_date_range(self, start_date: str, end_date: str,
+                               columns: Optional[Sequence[str]] = None, row_format: str = 'dict') -> List:
+        """날짜 범위별 분석 로그 조회 (분석 시각 기준 [start_date, end_date), 날짜만 주면 그 날 포함)"""
+        start_ms, end_ms = date_range_ms(start_date, end_date)
+        names = self._column_names('trading_logs', columns)
+        rows = self._read_range('trading_logs', names, start_ms, end_ms, 'timestamp_ms ASC', as_dict=False)
+        return self._format_rows('trading_logs', names, rows, row_format)
     
-    def get_trades_by_date(self, start_date: str, end_date: str = None) -> List[Dict]:
-        """날짜별 거래 내역 조회"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            if end_date:
-                cursor.execute('''
-                    SELECT * FROM actual_trades 
-                    WHERE DATE(created_at) BETWEEN ? AND ?
-                    ORDER BY created_at DESC
-                ''', (start_date, end_date))
-            else:
-                cursor.execute('''
-                    SELECT * FROM actual_trades 
-                    WHERE DATE(created_at) = ?
-                    ORDER BY created_at DESC
-                ''', (start_date,))
-            
-            rows = cursor.fetchall()
-            return [dict(row) for row in rows]
+    def get_recent_log_summaries(self, limit: int = 10, row_format: str = 'dict') -> List:
+        """최근 분석 로그 요약 조회 (JSON 문서 컬럼 제외, 전체 문서는 get_log_by_id 로 조회)"""
+        return self.get_recent_logs(limit, columns=LOG_SUMMARY_COLUMNS, row_format=row_format)
+
+    def get_log_by_id(self, log_id: int, row_format: str = 'dict'):
+        """분석 로그 한 건의 전체 내용 조회 (없으면 None)"""
+        names = self._column_names('trading_logs', None)
+        with self._connection() as conn:
+            row = conn.execute(f"SELECT {', '.join(names)} FROM trading_logs WHERE id = ?", (log_id,)).fetchone()
+        return self._format_rows('trading_logs', names, [row], row_format)[0] if row else None
     
-    def get_portfolio_history(self, days: int = 30) -> List[Dict]:
-        """포트폴리오 변화 이력 조회"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
+    def get_trades_by_date(self, start_date: str, end_date: str = None, row_format: str = 'dict') -> List:
+        """날짜별 거래 내역 조회 (거래 시각 기준, end_date 가 없으면 start_date 하루)"""
+        start_ms, end_ms = date_range_ms(start_date, end_date)
+        names = self._column_names('actual_trades', None)
+        rows = self._read_range('actual_trades', names, start_ms, end_ms, 'timestamp_ms DESC',
+                                descending=True, as_dict=False)
+        return self._format_rows('actual_trades', names, rows, row_format)
+
+    def _iter_keyset(self, table: str, columns: Optional[Sequence[str]], batch_size: int,
+                     after_id: Optional[int] = None, time_range: Optional[Tuple[int, int]] = None,
+                     row_format: str = 'dict') -> Iterator[List]:
+        """키셋 페이지네이션으로 batch_size 건씩 읽어 행 목록을 차례로 반환 (OFFSET 미사용)
+
+        time_range 가 없으면 id 순서로 after_id 다음부터, 있으면 (timestamp_ms, id) 순서로
+        [start_ms, end_ms) 범위를 읽는다. 페이지마다 짧은 쿼리를 새로 실행하므로 긴 읽기
+        트랜잭션을 붙잡지 않고 메모리 사용량은 batch_size 에 비례한다. 아카이브 파티션은
+        키 구간별로 나눠 겹치는 것만 ATTACH 해서 함께 읽는다.
+        페이지 키 컬럼(id, timestamp_ms)은 columns 에 없어도 결과에 포함된다.
+        """
+        if batch_size <= 0:
+            raise ValueError("batch_size 는 1 이상이어야 합니다")
+        keys = ['timestamp_ms', 'id'] if time_range else ['id']
+        if columns is not None:
+            columns = [key for key in keys if key not in columns] + list(columns)
+        names = self._column_names(table, columns)
+        convert = self._row_converter(table, names, row_format)
+        id_index = names.index('id')
+        ms_index = names.index('timestamp_ms') if time_range else None
+
+        if time_range:
+            key, (lo, hi) = 'timestamp_ms', time_range
+            where, order_by = 'timestamp_ms >= ? AND timestamp_ms < ? AND (timestamp_ms > ? OR id > ?)', 'timestamp_ms, id'
+        else:
+            key, lo, hi = 'id', (after_id or 0) + 1, MAX_KEY
+            where, order_by = 'id > ? AND id < ?', 'id'
+        with self._connection() as conn:
+            segments = self._segments(conn, table, key, lo, hi)
+
+        for segment_lo, segment_hi, partitions in segments:
+            last_ms, last_id = segment_lo, (-1 if time_range else segment_lo - 1)
+            while True:
+                params = (last_ms, segment_hi, last_ms, last_id) if time_range else (last_id, segment_hi)
+                with self._connection() as conn:
+                    self._attach(conn, partitions)
+                    sql = self._union_sql(conn, table, names, partitions, where)
+                    rows = conn.execute(f'{sql} ORDER BY {order_by} LIMIT ?',
+                                        params * (len(partitions) + 1) + (batch_size,)).fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1][id_index]
+                if time_range:
+                    last_ms = rows[-1][ms_index]
+                page = rows if convert is None else list(map(convert, rows))
+                yield page if row_format == 'dict' else Rows(page, names)
+                if len(rows) < batch_size:
+                    break
+
+    @staticmethod
+    def _open_range_ms(start_date, end_date) -> Tuple[int, int]:
+        """[start_date, end_date) 의 epoch 밀리초 범위 (한쪽이 None 이면 그 방향은 제한 없음)"""
+        # date_range_ms(x, x) 는 날짜만 준 끝값을 다음 날 0시로 바꾼다
+        start_ms = date_range_ms(start_date, start_date)[0] if start_date is not None else MIN_KEY
+        end_ms = date_range_ms(end_date, end_date)[1] if end_date is not None else MAX_KEY
+        return start_ms, end_ms
+
+    def _iter_rows(self, table: str, after_id: Optional[int], start_date, end_date, batch_size: int,
+                   columns: Optional[Sequence[str]], batches: bool, row_format: str = 'dict'):
+        """iter_* 공통: 날짜를 주면 시간순, 아니면 id 순으로 행(또는 batches=True 이면 목록) 반환"""
+        time_range = None
+        if start_date is not None or end_date is not None:
+            if after_id is not None:
+                raise ValueError("after_id 와 start_date/end_date 는 함께 쓸 수 없습니다")
+            time_range = self._open_range_ms(start_date, end_date)
+        pages = self._iter_keyset(table, columns, batch_size, after_id, time_range, row_format)
+        return pages if batches else (row for page in pages for row in page)
+
+    def iter_logs(self, after_id: Optional[int] = None, start_date=None, end_date=None,
+                  batch_size: int = 500, columns: Optional[Sequence[str]] = None,
+                  batches: bool = False, row_format: str = 'dict') -> Iterator:
+        """분석 로그를 메모리에 한꺼번에 올리지 않고 순서대로 읽는 제너레이터
+
+        기본은 id 순서로 after_id 다음 로그부터 읽는다. start_date/end_date 를 주면 분석 시각 기준
+        [start_date, end_date) 범위를 시간순으로 읽는다 (get_logs_by_date_range 와 같은 범위 규칙,
+        한쪽만 주면 그 방향으로 제한 없음). batches=True 이면 batch_size 건씩 목록으로 반환한다
+        (row_format 이 'tuple' / 'record' 이면 페이지마다 Rows).
+        """
+        return self._iter_rows('trading_logs', after_id, start_date, end_date, batch_size,
+                               columns, batches, row_format)
+
+    def iter_trades(self, after_id: Optional[int] = None, start_date=None, end_date=None,
+                    batch_size: int = 500, columns: Optional[Sequence[str]] = None,
+                    batches: bool = False, row_format: str = 'dict') -> Iterator:
+        """거래 내역 스트리밍 조회 (iter_logs 와 같은 규칙, 날짜는 거래 시각 기준)"""
+        return self._iter_rows('actual_trades', after_id, start_date, end_date, batch_size,
+                               columns, batches, row_format)
+
+    def iter_portfolio_snapshots(self, after_id: Optional[int] = None, batch_size: int = 500,
+                                 columns: Optional[Sequence[str]] = None, batches: bool = False,
+                                 row_format: str = 'dict') -> Iterator:
+        """포트폴리오 스냅샷 스트리밍 조회 (id 순서)"""
+        return self._iter_rows('portfolio_snapshots', after_id, None, None, batch_size,
+                               columns, batches, row_format)
+
+    def iter_reflections(self, after_id: Optional[int] = None, batch_size: int = 500,
+                         columns: Optional[Sequence[str]] = None, batches: bool = False,
+                         row_format: str = 'dict') -> Iterator:
+        """자기반성 기록 스트리밍 조회 (id 순서)"""
+        return self._iter_rows('self_reflections', after_id, None, None, batch_size,
+                               columns, batches, row_format)
+
+    def _load_columns(self, table: str, start_date, end_date, columns: Optional[Sequence[str]],
+                      default_columns: Sequence[str], batch_size: int) -> Tuple[Dict, Dict[str, str]]:
+        """로더 공통: 시간순 키셋 페이지를 컬럼별 NumPy 배열로 모으기 → (배열, 컬럼 종류)"""
+        names = list(columns) if columns is not None else list(default_columns)
+        sources = source_columns(names)
+        self._column_names(table, sources)
+        types = self._column_types[table]
+        kinds = {name: column_kind(name, types.get(name)) for name in names}
+        pages = self._iter_keyset(table, sources, batch_size, time_range=self._open_range_ms(start_date, end_date),
+                                  row_format='tuple')
+        return collect_columns(pages, names, kinds), kinds
+
+    def load_trades_frame(self, start_date=None, end_date=None, columns: Optional[Sequence[str]] = None,
+                          batch_size: int = 10000):
+        """거래 내역을 고정 dtype 의 DataFrame 으로 읽기 (거래 시각 순, 아카이브 포함)
+
+        dtype 규칙은 frames.py 참고 (시간 datetime64[ms, UTC], trade_type category, success bool 등).
+        columns 가 없으면 epoch 밀리초 컬럼을 뺀 전체 컬럼을 읽는다. 날짜 범위 규칙은 iter_trades 와 같다.
+        """
+        return to_dataframe(*self._load_columns('actual_trades', start_date, end_date, columns,
+                                                FRAME_COLUMNS['actual_trades'], batch_size))
+
+    def load_trades_array(self, start_date=None, end_date=None, columns: Optional[Sequence[str]] = None,
+                          batch_size: int = 10000) -> np.ndarray:
+        """거래 내역을 NumPy 구조체 배열로 읽기 (load_trades_frame 과 같은 컬럼·순서)"""
+        return to_structured(*self._load_columns('actual_trades', start_date, end_date, columns,
+                                                 FRAME_COLUMNS['actual_trades'], batch_size))
+
+    def load_logs_frame(self, start_date=None, end_date=None, columns: Optional[Sequence[str]] = None,
+                        batch_size: int = 10000):
+        """분석 로그를 고정 dtype 의 DataFrame 으로 읽기 (분석 시각 순, 기본은 요약 컬럼)"""
+        return to_dataframe(*self._load_columns('trading_logs', start_date, end_date, columns,
+                                                FRAME_COLUMNS['trading_logs'], batch_size))
+
+    def load_logs_array(self, start_date=None, end_date=None, columns: Optional[Sequence[str]] = None,
+                        batch_size: int = 10000) -> np.ndarray:
+        """분석 로그를 NumPy 구조체 배열로 읽기 (load_logs_frame 과 같은 컬럼·순서)"""
+        return to_structured(*self._load_columns('trading_logs', start_date, end_date, columns,
+                                                 FRAME_COLUMNS['trading_logs'], batch_size))
+
+    def _insert_price_ticks(self, rows: List[tuple]) -> int:
+        """(timestamp_ms, price, high_24h, low_24h, volume_24h) 목록 저장 → 새로 추가된 틱 수"""
+        if not rows:
+            return 0
+        with self._connection() as conn:
             cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT * FROM portfolio_snapshots 
+            cursor.executemany(INSERT_PRICE_TICK_SQL, rows)
+            conn.commit()
+            return cursor.rowcount
+
+    def save_price_ticks(self, ticks: List[Dict]) -> int:
+        """분석 로그 밖에서 받은 가격(시세 수집 등)을 한 트랜잭션으로 저장하고 새로 추가된 틱 수 반환
+
+        ticks 의 각 항목은 timestamp (ISO 문자열 또는 datetime) 와 price 를 갖고, high_24h / low_24h /
+        volume_24h 는 선택이다. 이미 틱이 있는 시각은 건너뛴다. 캔들은 트리거로 함께 갱신된다.
+        """
+        rows = [
+            (to_epoch_ms(tick['timestamp']), tick['price'],
+             tick.get('high_24h'), tick.get('low_24h'), tick.get('volume_24h'))
+            for tick in ticks
+        ]
+        invalid = sum(1 for row in rows if row[0] is None)
+        if invalid:
+            raise ValueError(f"시각을 해석할 수 없는 틱 {invalid}건")
+        return self._insert_price_ticks(rows)
+
+    def get_price_series(self, start_date=None, end_date=None, max_points: int = 500,
+                         resolution: Optional[str] = None, row_format: str = 'dict') -> Dict:
+        """[start_date, end_date) 의 가격 시계열을 점 max_points 개 이내로 조회 → {'resolution', 'rows'}
+
+        resolution 을 주지 않으면 틱 → 1m → 1h → 1d 순서로 구간의 점을 max_points + 1 개까지만 읽어
+        예산 안에 드는 가장 세밀한 해상도를 고른다 (1d 도 넘치면 1d 전체). 분석 로그를 훑지 않고
+        price_ticks / price_candles 의 기본 키 범위만 읽는다. 행은 시간순 PRICE_SERIES_COLUMNS 이며
+        캔들의 timestamp_ms 는 구간 시작(UTC 기준), 틱은 open = high = low = close 이다.
+        날짜 범위 규칙은 iter_logs 와 같다 (한쪽이 None 이면 그 방향으로 제한 없음).
+        """
+        choices = ('tick',) + tuple(CANDLE_RESOLUTIONS)
+        if resolution is not None and resolution not in choices:
+            raise ValueError(f"지원하지 않는 해상도: {resolution} ({', '.join(choices)})")
+        if max_points <= 0:
+            raise ValueError("max_points 는 1 이상이어야 합니다")
+        lo, hi = self._open_range_ms(start_date, end_date)
+        lo = max(lo, 0)
+        candidates = (resolution,) if resolution else choices
+        with self._connection() as conn:
+            for candidate in candidates:
+                # 마지막 후보(또는 지정한 해상도)는 예산과 관계없이 전부 읽는다
+                limit = -1 if candidate == candidates[-1] else max_points + 1
+                if candidate == 'tick':
+                    rows = conn.execute('''
+                        SELECT timestamp_ms, price, price, price, price, 1 FROM price_ticks
+                        WHERE timestamp_ms >= ? AND timestamp_ms < ?
+                        ORDER BY timestamp_ms LIMIT ?
+                    ''', (lo, hi, limit)).fetchall()
+                else:
+                    ms = CANDLE_RESOLUTIONS[candidate]
+                    rows = conn.execute('''
+                        SELECT bucket_ms, open, high, low, close, ticks FROM price_candles
+                        WHERE resolution = ? AND bucket_ms >= ? AND bucket_ms < ?
+                        ORDER BY bucket_ms LIMIT ?
+                    ''', (candidate, lo - lo % ms, hi, limit)).fetchall()
+                if limit < 0 or len(rows) <= max_points:
+                    break
+        return {
+            'resolution': candidate,
+            'rows': self._format_rows('price_candles', PRICE_SERIES_COLUMNS, rows, row_format),
+        }
+
+    def backfill_prediction_accuracy(self, full: bool = False, batch_size: int = 50000) -> int:
+        """아직 채점하지 않은 분석 로그의 1시간/4시간/24시간 결과를 prediction_accuracy 에 저장하고
+        새로 저장하거나 다시 채점한 건수 반환
+
+        가격 틱의 마지막 시각보다 24시간 이상 앞선 (모든 기간의 결과가 정해진) 로그만 채점한다.
+        기본은 이미 채점한 가장 늦은 결정 시각부터 이어서 읽고, full=True 이면 전체 이력(아카이브 포함)을
+        다시 훑는다 (나중에 가져온 과거 로그 채점용). 로그마다 한 행만 저장되므로 여러 번 실행해도 같다.
+        틱이 비어 가격을 몰라 NULL 로 남긴 기간은 실행할 때마다 그 사이 들어온 틱으로 다시 채점한다
+        (_rescore_predictions). 채점 규칙은 predictions.py 참고.
+        """
+        horizon = max(PREDICTION_HORIZONS.values())
+        with self._connection() as conn:
+            last_tick = conn.execute('SELECT MAX(timestamp_ms) FROM price_ticks').fetchone()[0]
+            since = None if full else conn.execute('SELECT MAX(prediction_ms) FROM prediction_accuracy').fetchone()[0]
+            if last_tick is None:
+                return 0
+            since = MIN_KEY if since is None else since
+            ticks = conn.execute('SELECT timestamp_ms, price FROM price_ticks WHERE timestamp_ms >= ? ORDER BY timestamp_ms',
+                                 (max(since, 0) - horizon,)).fetchall()
+        tick_ms = np.fromiter((row[0] for row in ticks), dtype=np.int64, count=len(ticks))
+        tick_price = np.fromiter((row[1] for row in ticks), dtype=np.float64, count=len(ticks))
+        del ticks
+
+        saved = 0
+        pages = self._iter_keyset('trading_logs', ['timestamp', 'ai_decision', 'ai_confidence', 'current_price'],
+                                  batch_size, time_range=(since, last_tick - horizon + 1), row_format='tuple')
+        for page in pages:
+            timestamp_ms, log_ids, timestamps, decisions, confidences, prices = zip(*page)
+            scores = score_predictions(np.array(timestamp_ms, dtype=np.int64),
+                                       np.array(prices, dtype=np.float64), decisions, tick_ms, tick_price)
+            levels = {label: _nan_to_none(confidence_value(label)) for label in set(confidences)}
+            rows = list(zip(
+                log_ids, timestamps, timestamp_ms, [decision or '' for decision in decisions],
+                [levels[label] for label in confidences], scores['predicted_direction'],
+                *(_sql_values(scores[name]) for name in PREDICTION_SCORE_COLUMNS)
+            ))
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                cursor.executemany(INSERT_PREDICTION_SQL, rows)
+                conn.commit()
+                saved += cursor.rowcount
+        rescored = self._rescore_predictions()
+        if saved or rescored:
+            logger.info("예측 정확도 채점 완료 (%s건, 다시 채점 %s건)", saved, rescored)
+        return saved + rescored
+
+    def _rescore_predictions(self) -> int:
+        """결과를 모르는 기간(NULL)이 남은 채점 행을 다시 채점해 새로 알게 된 행만 갱신하고 건수 반환
+
+        행마다 [결정 시각, 결정 시각 + 24시간] 의 틱만 읽는다 (겹치는 구간은 합쳐서 한 번에).
+        """
+        horizon = max(PREDICTION_HORIZONS.values())
+        unknown = ' OR '.join(f'prediction_correct_{name} IS NULL' for name in PREDICTION_HORIZONS)
+        known = ' + '.join(f'(prediction_correct_{name} IS NOT NULL)' for name in PREDICTION_HORIZONS)
+        with self._connection() as conn:
+            pending = conn.execute(f'''
+                SELECT log_id, prediction_ms, ai_prediction, {known} FROM prediction_accuracy
+                WHERE log_id IS NOT NULL AND prediction_ms IS NOT NULL AND predicted_direction IS NOT NULL
+                  AND ({unknown})
+                ORDER BY prediction_ms
+            ''').fetchall()
+            if not pending:
+                return 0
+            spans = []
+            for _, prediction_ms, _, _ in pending:
+                if spans and prediction_ms <= spans[-1][1]:
+                    spans[-1][1] = max(spans[-1][1], prediction_ms + horizon)
+                else:
+                    spans.append([prediction_ms, prediction_ms + horizon])
+            ticks = [
+                row for lo, hi in spans
+                for row in conn.execute('SELECT timestamp_ms, price FROM price_ticks WHERE timestamp_ms >= ? AND timestamp_ms <= ? '
+                                        'ORDER BY timestamp_ms', (lo, hi))
+            ]
+        log_ids, prediction_ms, decisions, known_before = zip(*pending)
+        prices = self._rows_by_id('trading_logs', ['id', 'current_price'], list(log_ids))
+        base_price = np.array([prices.get(log_id, (log_id, None))[1] for log_id in log_ids], dtype=np.float64)
+        tick_ms = np.fromiter((row[0] for row in ticks), dtype=np.int64, count=len(ticks))
+        tick_price = np.fromiter((row[1] for row in ticks), dtype=np.float64, count=len(ticks))
+        scores = score_predictions(np.array(prediction_ms, dtype=np.int64), base_price, decisions, tick_ms, tick_price)
+
+        known_after = sum(~np.isnan(scores[f'prediction_correct_{name}']) for name in PREDICTION_HORIZONS)
+        improved = np.flatnonzero(known_after > np.array(known_before))
+        if not len(improved):
+            return 0
+        values = [_sql_values(scores[name][improved]) for name in PREDICTION_SCORE_COLUMNS]
+        assignments = ', '.join(f'{name} = ?' for name in PREDICTION_SCORE_COLUMNS)
+        with self._connection() as conn:
+            conn.executemany(f'UPDATE prediction_accuracy SET {assignments} WHERE log_id = ?',
+                             zip(*values, [log_ids[i] for i in improved]))
+            conn.commit()
+        return len(improved)
+
+    def get_prediction_accuracy(self, start_date=None, end_date=None) -> Dict:
+        """결정 시각이 [start_date, end_date) 인 채점 결과의 기간별 적중률 (전체와 결정별)
+
+        {'total': {...}, 'by_decision': {'BUY': {...}, ...}} 의 각 값은
+        {'predictions': 채점한 결정 수, 'accuracy_score': 평균 점수, '1h': {'scored', 'hits', 'hit_rate'}, ...}
+        이며 가격을 몰라 채점하지 못한 기간은 scored 에서 빠진다 (scored 가 0 이면 hit_rate 는 None).
+        """
+        lo, hi = self._open_range_ms(start_date, end_date)
+        sums = ', '.join(f'COUNT(prediction_correct_{name}), IFNULL(SUM(prediction_correct_{name}), 0)'
+                         for name in PREDICTION_HORIZONS)
+        with self._connection() as conn:
+            rows = conn.execute(f'''
+                SELECT ai_prediction, COUNT(*), IFNULL(SUM(accuracy_score), 0), COUNT(accuracy_score), {sums}
+                FROM prediction_accuracy
+                WHERE prediction_ms >= ? AND prediction_ms < ?
+                GROUP BY ai_prediction
+            ''', (lo, hi)).fetchall()
+
+        def summary(values) -> Dict:
+            count, score_sum, score_count = values[0], values[1], values[2]
+            result = {'predictions': count, 'accuracy_score': score_sum / score_count if score_count else None}
+            for k, name in enumerate(PREDICTION_HORIZONS):
+                scored, hits = values[3 + 2 * k], values[4 + 2 * k]
+                result[name] = {'scored': scored, 'hits': hits, 'hit_rate': hits / scored if scored else None}
+            return result
+
+        by_decision = {}
+        total = [0] * (3 + 2 * len(PREDICTION_HORIZONS))
+        for decision, *values in rows:
+            by_decision[decision] = summary(values)
+            total = [a + b for a, b in zip(total, values)]
+        return {'total': summary(total), 'by_decision': by_decision}
+
+    def get_portfolio_history(self, days: int = 30, row_format: str = 'dict') -> List:
+        """포트폴리오 변화 이력 조회"""
+        names = self._column_names('portfolio_snapshots', None)
+        with self._connection() as conn:
+            rows = conn.execute(f'''
+                SELECT {', '.join(names)} FROM portfolio_snapshots 
                 ORDER BY date ASC 
                 LIMIT ?
-            ''', (days,))
-            
-            rows = cursor.fetchall()
-            return [dict(row) for row in rows]
+            ''', (days,)).fetchall()
+        return self._format_rows('portfolio_snapshots', names, rows, row_format)
     
+    def get_change_tokens(self, tables: Optional[Sequence[str]] = None) -> Dict[str, Tuple[int, int]]:
+        """테이블별 변경 토큰 (가장 큰 id, 수정·삭제 횟수) - 행이 없으면 (0, 0)
+
+        가장 큰 id 는 AUTOINCREMENT 시퀀스라 새 행이 저장될 때마다 커지고, 수정·삭제 횟수는 table_changes
+        트리거가 센다 (값 수정, 아카이브 이동, 압축 변환, 다시 채점 포함). 값이 같으면 그 사이 테이블이
+        바뀌지 않은 것이므로 조회 결과 캐시의 키로 쓸 수 있다. 연결을 재사용하는 경우 PRAGMA data_version 과
+        이 연결의 total_changes 가 그대로이면 다른 연결의 커밋이 없었던 것이라 이전 값을 그대로 쓴다.
+        """
+        tables = tuple(tables or CHANGE_TOKEN_TABLES)
+        with self._connection() as conn:
+            version = (conn.execute('PRAGMA data_version').fetchone()[0], conn.total_changes)
+            cached = getattr(self._local, 'change_tokens', None) if self.reuse_connections else None
+            if cached is None or cached[0] != version:
+                cached = (version, dict(conn.execute('SELECT name, seq FROM sqlite_sequence')),
+                          dict(conn.execute('SELECT name, changes FROM table_changes')))
+                if self.reuse_connections:
+                    self._local.change_tokens = cached
+        return {table: (cached[1].get(table, 0), cached[2].get(table, 0)) for table in tables}
+
     def get_trading_stats(self) -> Dict:
-        """거래 통계 조회"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            # 총 거래 횟수
-            cursor.execute('SELECT COUNT(*) as total_trades FROM actual_trades WHERE success = 1')
-            total_trades = cursor.fetchone()[0]
-            
-            # 매수/매도 횟수
-            cursor.execute('SELECT trade_type, COUNT(*) as count FROM actual_trades WHERE success = 1 GROUP BY trade_type')
-            trade_counts = dict(cursor.fetchall())
-            
-            # 총 수수료
-            cursor.execute('SELECT SUM(fee) as total_fee FROM actual_trades WHERE success = 1')
-            total_fee = cursor.fetchone()[0] or 0
-            
-            # AI 결정 통계
-            cursor.execute('SELECT ai_decision, COUNT(*) as count FROM trading_logs GROUP BY ai_decision')
-            ai_decisions = dict(cursor.fetchall())
-            
-            return {
-                'total_trades': total_trades,
-                'buy_count': trade_counts.get('buy', 0),
-                'sell_count': trade_counts.get('sell', 0),
-                'total_fee': total_fee,
-                'ai_decisions': ai_decisions
-            }
+        """거래 통계 조회 (트리거가 갱신하는 trading_stats 한 번 읽기)"""
+        with self._connection() as conn:
+            rows = conn.execute(
+                'SELECT scope, key, count, total FROM trading_stats WHERE count != 0'
+            ).fetchall()
+
+        trade_counts = {key: count for scope, key, count, _ in rows if scope == 'trade'}
+        total_fee = sum(total for scope, _, _, total in rows if scope == 'trade')
+        return {
+            'total_trades': sum(trade_counts.values()),
+            'buy_count': trade_counts.get('buy', 0),
+            'sell_count': trade_counts.get('sell', 0),
+            'total_fee': total_fee,
+            'ai_decisions': {key: count for scope, key, count, _ in rows if scope == 'ai_decision'}
+        }
+
+    def rebuild_stats(self) -> Dict:
+        """trading_stats 를 원본 테이블(아카이브 포함) 전체 집계로 다시 계산 (어긋났을 때 복구용)"""
+        with self._connection() as conn:
+            rows = self._all_aggregate_stats(conn)
+            conn.execute('DELETE FROM trading_stats')
+            conn.executemany(ADD_STATS_SQL, rows)
+            conn.commit()
+        logger.info("거래 통계 재계산 완료")
+        return self.get_trading_stats()
+
+    def verify_stats(self, tolerance: float = 1e-6) -> Dict:
+        """trading_stats 와 전체 집계 결과를 비교해 다른 항목만 반환 (빈 dict 이면 일치)"""
+        stats = self.get_trading_stats()
+        expected = self._scan_trading_stats()
+        mismatches = {}
+        for key, value in expected.items():
+            if key == 'total_fee':
+                same = abs(stats[key] - value) <= tolerance * max(1.0, abs(value))
+            else:
+                same = stats[key] == value
+            if not same:
+                mismatches[key] = {'stats': stats[key], 'expected': value}
+        return mismatches
+
+    def _scan_trading_stats(self) -> Dict:
+        """거래 통계를 원본 테이블(아카이브 포함) 전체 집계로 계산 (verify_stats 기준값)"""
+        with self._connection() as conn:
+            rows = self._all_aggregate_stats(conn)
+
+        trade_counts: Dict[str, int] = {}
+        ai_decisions: Dict[str, int] = {}
+        total_fee = 0
+        for scope, key, count, total in rows:
+            if scope == 'trade':
+                trade_counts[key] = trade_counts.get(key, 0) + count
+                total_fee += total
+            else:
+                ai_decisions[key] = ai_decisions.get(key, 0) + count
+        return {
+            'total_trades': sum(trade_counts.values()),
+            'buy_count': trade_counts.get('buy', 0),
+            'sell_count': trade_counts.get('sell', 0),
+            'total_fee': total_fee,
+            'ai_decisions': ai_decisions
+        }
+
+    @staticmethod
+    def _aggregate_stats(conn: sqlite3.Connection, schema: str, condition: str = '1',
+                         params: tuple = (), tables: Sequence[str] = ARCHIVE_TABLES) -> List[tuple]:
+        """한 스키마의 trading_stats 집계 행 (scope, key, count, total)"""
+        return [
+            row for table in tables
+            for row in conn.execute(STATS_AGGREGATE_SQL[table].format(
+                schema=schema, condition=condition.format(schema=schema, table=table)), params)
+        ]
+
+    def _all_aggregate_stats(self, conn: sqlite3.Connection) -> List[tuple]:
+        """본 DB 와 모든 아카이브 파티션의 trading_stats 집계 행 (파티션은 하나씩 ATTACH)"""
+        rows = self._aggregate_stats(conn, 'main')
+        for partition in self._archive_partitions(conn):
+            self._attach(conn, [partition])
+            rows += self._aggregate_stats(conn, self._partition_alias(partition['month']))
+        return rows
+
+    def load_trade_arrays(self) -> TradeArrays:
+        """성공한 거래 전체(아카이브 포함)를 시간순 열별 배열로 한 번에 읽기"""
+        rows = self._read_range('actual_trades', [*TRADE_ARRAY_COLUMNS, 'id'], MIN_KEY, MAX_KEY,
+                                'timestamp_ms, id', where=' AND success = 1', as_dict=False)
+        return TradeArrays.from_rows(rows)
+
+    def analyze_performance_windows(self, windows: Optional[Dict] = None, end=None) -> Dict[str, Dict]:
+        """여러 기간의 FIFO 실현 손익·승률·수수료·거래대금을 한 번에 계산
+
+        windows 는 이름 → 기간이며, 기간은 timedelta (end 로부터 거슬러 올라간 기간),
+        None (전체), (start, end) 튜플 (to_epoch_ms 가 받는 값, None 은 제한 없음) 중 하나이다.
+        기본값은 1d / 7d / 30d / all 이고 end 기본값은 현재 시각이다.
+        """
+        end_ms = to_epoch_ms(end if end is not None else local_now())
+        ranges = {}
+        for name, window in (windows or PERFORMANCE_WINDOWS).items():
+            if window is None:
+                ranges[name] = (None, None)
+            elif isinstance(window, timedelta):
+                ranges[name] = (end_ms - int(window.total_seconds() * 1000), end_ms)
+            else:
+                start, stop = window
+                ranges[name] = (None if start is None else to_epoch_ms(start),
+                                None if stop is None else to_epoch_ms(stop))
+        return window_stats(self.load_trade_arrays(), ranges)
     
     def analyze_trading_performance(self, days_back: int = 7) -> Dict:
-        """과거 매매 성과 분석"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            # 분석 기간 설정
-            end_date = datetime.now()
-            start_date = end_date - timedelta(days=days_back)
-            
-            # 해당 기간의 거래 조회
-            cursor.execute('''
-                SELECT * FROM actual_trades 
-                WHERE created_at BETWEEN ? AND ? AND success = 1
-                ORDER BY created_at
-            ''', (start_date.isoformat(), end_date.isoformat()))
-            
-            trades = cursor.fetchall()
-            
-            if not trades:
-                return {
-                    'total_trades': 0,
-                    'total_profit_loss': 0,
-                    'win_rate': 0,
-                    'successful_trades': 0,
-                    'failed_trades': 0,
-                    'analysis_period': f"{start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}"
-                }
-            
-            # 매매 성과 계산 (간단한 방식)
-            total_profit_loss = 0
-            successful_trades = 0
-            failed_trades = 0
-            
-            # BTC 보유량과 평균 매수가격 추적
-            btc_balance = 0
-            krw_balance = 1000000  # 초기 자본 (시뮬레이션)
-            
-            for trade in trades:
-                if trade[2] == 'buy':  # trade_type
-                    btc_bought = trade[4] / trade[3]  # total_value / price
-                    btc_balance += btc_bought
-                    krw_balance -= trade[4]  # total_value
-                elif trade[2] == 'sell':  # trade_type
-                    btc_sold = trade[4]  # amount
-                    btc_balance -= btc_sold
-                    krw_balance += trade[5]  # total_value
-                    
-                    # 간단한 수익 계산 (매도 시점에서)
-                    profit = trade[5] - (btc_sold * trade[3])  # 매도금액 - (수량 * 매도가격)
-                    total_profit_loss += profit
-                    
-                    if profit > 0:
-                        successful_trades += 1
-                    else:
-                        failed_trades += 1
-            
-            total_trades = len(trades)
-            win_rate = (successful_trades / total_trades * 100) if total_trades > 0 else 0
-            
-            return {
-                'total_trades': total_trades,
-                'successful_trades': successful_trades,
-                'failed_trades': failed_trades,
-                'total_profit_loss': total_profit_loss,
-                'win_rate': win_rate,
-                'analysis_period_start': start_date.strftime('%Y-%m-%d'),
-                'analysis_period_end': end_date.strftime('%Y-%m-%d'),
-                'trades_data': trades
-            }
+        """과거 매매 성과 분석 (최근 days_back 일, 전체 이력 기준 FIFO 실현 손익)"""
+        end_date = local_now()
+        start_date = end_date - timedelta(days=days_back)
+        stats = self.analyze_performance_windows({'period': (start_date, end_date)}, end=end_date)['period']
+
+        trades = self._read_range('actual_trades', None, stats['start_ms'], stats['end_ms'], 'timestamp_ms',
+                                  where=' AND success = 1', as_dict=False)
+
+        return {
+            'total_trades': stats['total_trades'],
+            'successful_trades': stats['successful_trades'],
+            'failed_trades': stats['failed_trades'],
+            'total_profit_loss': stats['total_profit_loss'],
+            'win_rate': stats['win_rate'],
+            'total_fee': stats['total_fee'],
+            'turnover': stats['turnover'],
+            'analysis_period_start': start_date.strftime('%Y-%m-%d'),
+            'analysis_period_end': end_date.strftime('%Y-%m-%d'),
+            'trades_data': trades
+        }
     
     def save_reflection(self, reflection_data: Dict) -> int:
         """AI 자기반성 내용을 데이터베이스에 저장"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connection() as conn:
             cursor = conn.cursor()
             
             cursor.execute('''
@@ -358,7 +2876,7 @@ class TradingDatabase:
                     improvement_suggestions, confidence_adjustment, strategy_modifications
                 ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             ''', (
-                reflection_data.get('reflection_date', datetime.now().isoformat()),
+                reflection_data.get('reflection_date', local_now().isoformat()),
                 reflection_data.get('analysis_period_start', ''),
                 reflection_data.get('analysis_period_end', ''),
                 reflection_data.get('total_trades_analyzed', 0),
@@ -377,67 +2895,346 @@ class TradingDatabase:
             
             reflection_id = cursor.lastrowid
             conn.commit()
-            print(f"자기반성 저장 완료 (ID: {reflection_id})")
+            logger.info("자기반성 저장 완료 (ID: %s)", reflection_id)
             return reflection_id
     
-    def get_recent_reflections(self, limit: int = 5) -> List[Dict]:
+    def get_recent_reflections(self, limit: int = 5, row_format: str = 'dict') -> List:
         """최근 자기반성 내용 조회"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT * FROM self_reflections 
+        names = self._column_names('self_reflections', None)
+        with self._connection() as conn:
+            rows = conn.execute(f'''
+                SELECT {', '.join(names)} FROM self_reflections 
                 ORDER BY created_at DESC 
                 LIMIT ?
-            ''', (limit,))
-            
-            rows = cursor.fetchall()
-            return [dict(row) for row in rows]
+            ''', (limit,)).fetchall()
+        return self._format_rows('self_reflections', names, rows, row_format)
     
+    def _search_tokenizer(self, table: str) -> Optional[str]:
+        """table 의 전문 검색 색인 토크나이저 (색인이 없으면 None)"""
+        if table not in SEARCH_COLUMNS:
+            raise ValueError(f"검색할 수 없는 테이블: {table} ({', '.join(SEARCH_COLUMNS)})")
+        tokenizers = self._search_tokenizers
+        if table not in tokenizers:
+            with self._connection() as conn:
+                row = conn.execute(
+                    "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (f'{table}_fts',)
+                ).fetchone()
+            tokenizers[table] = next((t for t in SEARCH_TOKENIZERS if row and f"'{t}'" in row[0]), None)
+        return tokenizers[table]
+
+    def create_search_index(self) -> bool:
+        """전문 검색 색인이 없으면 만들고 기존 행을 색인 (FTS5 를 쓸 수 없으면 False)"""
+        with self._connection() as conn:
+            if not self._create_search_tables(conn):
+                return False
+        self._search_tokenizers.clear()
+        self.rebuild_search_index()
+        return True
+
+    def rebuild_search_index(self) -> Dict[str, int]:
+        """전문 검색 색인을 처음부터 다시 만들고 테이블별 색인 행 수 반환 (아카이브로 옮긴 로그 포함)"""
+        counts = {}
+        with self._connection() as conn:
+            for table, columns in SEARCH_COLUMNS.items():
+                if self._search_tokenizer(table) is None:
+                    continue
+                conn.execute(f"INSERT INTO {table}_fts ({table}_fts) VALUES ('rebuild')")
+                counts[table] = conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+                conn.commit()
+                if table not in ARCHIVE_TABLES:
+                    continue
+                for partition in self._archive_partitions(conn):
+                    if not partition[f'{table}_rows']:
+                        continue
+                    self._attach(conn, [partition])
+                    alias = self._partition_alias(partition['month'])
+                    counts[table] += conn.execute(f'''
+                        INSERT INTO {table}_fts (rowid, {', '.join(columns)})
+                        SELECT id, {', '.join(columns)} FROM {alias}.{table}
+                        WHERE id NOT IN (SELECT id FROM main.{table})
+                    ''').rowcount
+                    conn.commit()
+        if counts:
+            logger.info("전문 검색 색인 완료: %s", ', '.join(f"{table} {count}건" for table, count in counts.items()))
+        return counts
+
+    def _rows_by_id(self, table: str, names: Sequence[str], ids: Sequence[int]) -> Dict[int, tuple]:
+        """id 목록의 행 읽기 (id 범위가 겹치는 아카이브 파티션까지, 첫 컬럼은 id)"""
+        if not ids:
+            return {}
+        rows = {}
+        placeholders = ', '.join('?' * len(ids))
+        with self._connection() as conn:
+            for _, _, partitions in self._segments(conn, table, 'id', min(ids), max(ids) + 1):
+                self._attach(conn, partitions)
+                sql = self._union_sql(conn, table, names, partitions, f'id IN ({placeholders})')
+                rows.update((row[0], row) for row in conn.execute(sql, tuple(ids) * (len(partitions) + 1)))
+        return rows
+
+    def search(self, query: str, table: str = 'trading_logs', page: int = 1, page_size: int = 20,
+               highlight: Tuple[str, str] = ('[', ']')) -> Dict:
+        """AI 판단 근거 (trading_logs) 또는 자기반성 (self_reflections) 전문 검색
+
+        검색어의 모든 단어를 포함하는 행을 bm25 관련도 순으로 page 쪽 (1부터) 만큼 반환한다.
+        결과는 {'total', 'page', 'page_size', 'rows'} 이고 각 행은 SEARCH_RESULT_COLUMNS 에 rank (작을수록
+        관련도 높음) 와 snippet (일치 부분을 highlight 로 감싼 발췌) 이 붙는다. 아카이브로 옮긴 로그도 찾는다.
+        단어 처리 규칙은 fts_query 참고 - 검색어 전체가 3글자 미만이면 (예: '김치') 색인 대신 LIKE 로
+        본 DB 를 훑어 최신 순으로 반환한다 (rank 는 None). 색인이 없을 때 (FTS5 미지원 SQLite) 도 같다.
+        """
+        if page < 1 or page_size < 1:
+            raise ValueError("page 와 page_size 는 1 이상이어야 합니다")
+        tokenizer = self._search_tokenizer(table)
+        terms = search_terms(query)
+        result = {'total': 0, 'page': page, 'page_size': page_size, 'rows': []}
+        if not terms:
+            return result
+
+        offset = (page - 1) * page_size
+        expression = fts_query(query, tokenizer) if tokenizer is not None else None
+        with self._connection() as conn:
+            if expression is not None:
+                result['total'] = conn.execute(
+                    f'SELECT COUNT(*) FROM {table}_fts WHERE {table}_fts MATCH ?', (expression,)
+                ).fetchone()[0]
+                ranked = conn.execute(f'''
+                    SELECT rowid, bm25({table}_fts) AS rank FROM {table}_fts
+                    WHERE {table}_fts MATCH ? ORDER BY rank LIMIT ? OFFSET ?
+                ''', (expression, page_size, offset)).fetchall()
+            else:
+                like = ' OR '.join(f"{column} LIKE ? ESCAPE '\\'" for column in SEARCH_COLUMNS[table])
+                pattern = '%' + re.sub(r'([%_\\])', r'\\\1', ' '.join(terms)) + '%'
+                params = (pattern,) * len(SEARCH_COLUMNS[table])
+                result['total'] = conn.execute(f'SELECT COUNT(*) FROM {table} WHERE {like}', params).fetchone()[0]
+                ranked = [(row[0], None) for row in conn.execute(
+                    f'SELECT id FROM {table} WHERE {like} ORDER BY id DESC LIMIT ? OFFSET ?',
+                    params + (page_size, offset)
+                )]
+
+        names = SEARCH_RESULT_COLUMNS[table]
+        rows = self._rows_by_id(table, names, [log_id for log_id, _ in ranked])
+        text_columns = [names.index(column) for column in SEARCH_COLUMNS[table]]
+        for row_id, rank in ranked:
+            row = rows.get(row_id)
+            if row is None:
+                continue  # 색인과 어긋난 행 (rebuild_search_index 로 맞출 수 있다)
+            snippet = next(filter(None, (search_snippet(row[i], terms, highlight=highlight) for i in text_columns)), None)
+            result['rows'].append({**dict(zip(names, row)), 'rank': rank, 'snippet': snippet})
+        return result
+
     def get_market_context(self, timestamp: str) -> Dict:
-        """특정 시점의 시장 상황 조회"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
+        """특정 시점의 시장 상황 조회 (그 시각 이전의 마지막 분석 로그 기준, 없으면 빈 dict)"""
+        timestamp_ms = to_epoch_ms(timestamp)
+        return self.market_context_index.context(MIN_KEY if timestamp_ms is None else timestamp_ms)
+
+    def get_market_contexts(self, timestamps) -> List[Dict]:
+        """여러 시점의 시장 상황을 한 번에 조회 (입력 순서, 각 항목은 get_market_context 와 같다)
+
+        timestamps 는 ISO 문자열 / datetime 목록 또는 epoch 밀리초 정수 배열이다. 시각 인덱스에서
+        이진 탐색으로 로그를 찾고, 캐시에 없는 로그만 id 로 묶어 읽는다 (MarketContextIndex 참고).
+        """
+        if isinstance(timestamps, np.ndarray) and np.issubdtype(timestamps.dtype, np.integer):
+            timestamps_ms = timestamps.astype(np.int64)
+        else:
+            timestamps_ms = np.array([
+                MIN_KEY if value is None else value for value in map(to_epoch_ms, timestamps)
+            ], dtype=np.int64)
+        return self.market_context_index.contexts(timestamps_ms)
+
+    def find_similar_contexts(self, k: int = 5, timestamp=None, min_gap_hours: float = 24.0) -> List[Dict]:
+        """시장 상황이 가장 비슷했던 과거 분석 로그 k 개 (가까운 순)
+
+        기준은 timestamp 이전의 마지막 분석 로그 (기본: 최신 로그) 이고, 그보다 min_gap_hours 이상 앞선
+        로그만 후보로 본다 (바로 앞 로그들은 당연히 비슷하므로). 비교 특징과 거리는 similarity 모듈 참고.
+        각 항목은 SIMILAR_CONTEXT_COLUMNS 에 distance (작을수록 비슷함), features (특징 이름 → 값),
+        outcome (prediction_accuracy 채점 결과와 기간별 실제 변동률 return_{기간}, 아직 채점 전이면 None) 이 붙는다.
+        """
+        if k < 1:
+            raise ValueError("k 는 1 이상이어야 합니다")
+        timestamp_ms = None if timestamp is None else to_epoch_ms(timestamp)
+        _, matches = self.similarity_index.find(k, timestamp_ms, int(min_gap_hours * 3_600_000))
+        if not matches:
+            return []
+        log_ids = [log_id for log_id, _ in matches]
+        rows = self._rows_by_id('trading_logs', SIMILAR_CONTEXT_COLUMNS + SIMILARITY_SOURCE_COLUMNS[2:], log_ids)
+        with self._connection() as conn:
+            outcomes = {
+                row[0]: dict(zip(PREDICTION_SCORE_COLUMNS, row[1:]))
+                for row in conn.execute(f'''
+                    SELECT log_id, {', '.join(PREDICTION_SCORE_COLUMNS)} FROM prediction_accuracy
+                    WHERE log_id IN ({', '.join('?' * len(log_ids))})
+                ''', log_ids)
+            }
+
+        width = len(SIMILAR_CONTEXT_COLUMNS)
+        results = []
+        for log_id, distance in matches:
+            row = rows.get(log_id)
+            if row is None:
+                continue  # 인덱스를 만든 뒤 삭제된 로그
+            item = dict(zip(SIMILAR_CONTEXT_COLUMNS, row[:width]))
+            item['distance'] = distance
+            item['features'] = {
+                name: None if np.isnan(value) else float(value)
+                for name, value in zip(SIMILARITY_FEATURES, feature_matrix([row[width:]], np.float64)[0])
+            }
+            outcome = outcomes.get(log_id)
+            if outcome is not None:
+                price = item['current_price']
+                for name in PREDICTION_HORIZONS:
+                    actual = outcome[f'actual_price_{name}']
+                    outcome[f'return_{name}'] = actual / price - 1 if actual and price else None
+            item['outcome'] = outcome
+            results.append(item)
+        return results
+
+    def get_import_checkpoint(self, json_file_path: str) -> Optional[Dict]:
+        """JSONL 마이그레이션 체크포인트 조회 (없으면 None)"""
+        with self._connection() as conn:
             cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT * FROM trading_logs 
-                WHERE timestamp <= ?
-                ORDER BY timestamp DESC
-                LIMIT 1
-            ''', (timestamp,))
-            
+            cursor.row_factory = sqlite3.Row
+            cursor.execute(
+                'SELECT * FROM import_checkpoints WHERE source_path = ?',
+                (os.path.abspath(json_file_path),)
+            )
             row = cursor.fetchone()
-            if row:
-                log = dict(row)
-                # 시장 데이터 파싱
-                try:
-                    market_data = json.loads(log.get('market_data_json', '{}'))
-                    return {
-                        'price': log.get('current_price', 0),
-                        'technical_indicators': market_data.get('technical_indicators', {}),
-                        'fear_greed': market_data.get('fear_greed_index', []),
-                        'timestamp': log.get('timestamp', '')
-                    }
-                except:
-                    return {'price': log.get('current_price', 0), 'timestamp': log.get('timestamp', '')}
-            return {}
+            return dict(row) if row else None
+
+    def migrate_from_json(self, json_file_path: str, chunk_size: int = 1000, resume: bool = True,
+                          reject_path: Optional[str] = None, progress_interval: float = 5.0) -> Dict:
+        """기존 JSONL 로그를 SQLite로 스트리밍 마이그레이션
+
+        chunk_size 줄마다 한 트랜잭션으로 커밋하고, 같은 트랜잭션에서 import_checkpoints 에
+        다음에 읽을 바이트 오프셋을 기록한다. 중단된 경우 다시 호출하면 그 위치부터 이어서
+        가져오며, resume=False 이면 처음부터 다시 가져온다.
+        파싱할 수 없는 줄과 저장할 때 제약 조건 (NOT NULL 등) 을 어기는 줄은 reject_path
+        (기본: <파일>.rejects) 에 오프셋·오류와 함께 기록하고 건너뛴다.
+        줄 끝 개행이 없는 마지막 줄은 아직 쓰이는 중일 수 있으므로 파싱에 실패하면 다음 실행으로 미룬다.
+        진행 상황(rows/s, MB/s)은 progress_interval 초마다 출력하고, 최종 통계를 dict 로 반환한다.
+        """
+        source_path = os.path.abspath(json_file_path)
+        if reject_path is None:
+            reject_path = json_file_path + '.rejects'
 
-    def migrate_from_json(self, json_file_path: str):
-        """기존 JSON 로그를 SQLite로 마이그레이션"""
         try:
-            with open(json_file_path, 'r', encoding='utf-8') as f:
-                for line in f:
-                    if line.strip():
-                        data = json.loads(line.strip())
-                        self.save_analysis_log(
-                            data.get('market_data', {}),
-                            data.get('ai_analysis', {}),
-                            data.get('timestamp', datetime.now().isoformat())
-                        )
-            print(f"JSON 데이터 마이그레이션 완료: {json_file_path}")
+            file_size = os.path.getsize(source_path)
         except FileNotFoundError:
-            print(f"JSON 파일을 찾을 수 없습니다: {json_file_path}")
-        except Exception as e:
-            print(f"마이그레이션 중 오류 발생: {e}") 
\ No newline at end of file
+            logger.error("JSON 파일을 찾을 수 없습니다: %s", json_file_path)
+            return {}
+
+        checkpoint = self.get_import_checkpoint(source_path) if resume else None
+        start_offset = checkpoint['byte_offset'] if checkpoint else 0
+        if start_offset > file_size:
+            logger.warning("체크포인트(%s bytes)가 파일 크기보다 커서 처음부터 다시 가져옵니다: %s",
+                           f"{start_offset:,}", json_file_path)
+            start_offset = 0
+            checkpoint = None
+        total_imported = checkpoint['rows_imported'] if checkpoint else 0
+        total_rejected = checkpoint['rows_rejected'] if checkpoint else 0
+        if start_offset:
+            logger.info("체크포인트에서 재개: %s / %s bytes", f"{start_offset:,}", f"{file_size:,}")
+
+        stats = {'rows_imported': 0, 'rows_rejected': 0, 'bytes_read': 0}
+        started = time.perf_counter()
+        last_report = started
+
+        def report(label: str):
+            elapsed = max(time.perf_counter() - started, 1e-9)
+            stats['elapsed_sec'] = elapsed
+            stats['rows_per_sec'] = stats['rows_imported'] / elapsed
+            stats['bytes_per_sec'] = stats['bytes_read'] / elapsed
+            logger.info("%s: %s / %s bytes | %s건 저장, %s건 거부 | %s rows/s, %s MB/s",
+                        label, f"{start_offset + stats['bytes_read']:,}", f"{file_size:,}",
+                        f"{stats['rows_imported']:,}", f"{stats['rows_rejected']:,}",
+                        f"{stats['rows_per_sec']:,.0f}", f"{stats['bytes_per_sec'] / 1e6:,.1f}")
+
+        def reject_entry(line_offset: int, error: Exception, raw_line: bytes) -> str:
+            return json.dumps({
+                'source': source_path,
+                'byte_offset': line_offset,
+                'error': str(error),
+                'line': raw_line.decode('utf-8', errors='replace').rstrip('\r\n'),
+            }, ensure_ascii=False) + '\n'
+
+        def commit_chunk(rows: List[tuple], sources: List[Tuple[int, bytes]], rejects: List[str], offset: int):
+            nonlocal total_imported, total_rejected
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                if rows:
+                    try:
+                        cursor.executemany(INSERT_ANALYSIS_LOG_SQL, rows)
+                    except sqlite3.IntegrityError:
+                        # 제약 조건을 어기는 줄이 섞여 있음: 청크를 되돌리고 한 줄씩 다시 넣어 그 줄만 거부한다
+                        conn.rollback()
+                        kept = []
+                        for row, (line_offset, raw_line) in zip(rows, sources):
+                            try:
+                                cursor.execute(INSERT_ANALYSIS_LOG_SQL, row)
+                                kept.append(row)
+                            except sqlite3.IntegrityError as e:
+                                rejects.append(reject_entry(line_offset, e, raw_line))
+                        rows = kept
+                if rejects:
+                    # 체크포인트 커밋보다 먼저 기록해 둔다 (재실행 시 중복 기록될 수는 있어도 유실되지는 않는다)
+                    with open(reject_path, 'a', encoding='utf-8') as reject_file:
+                        reject_file.writelines(rejects)
+                total_imported += len(rows)
+                total_rejected += len(rejects)
+                cursor.execute('''
+                    INSERT INTO import_checkpoints (source_path, byte_offset, rows_imported, rows_rejected, updated_at)
+                    VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+                    ON CONFLICT(source_path) DO UPDATE SET
+                        byte_offset = excluded.byte_offset,
+                        rows_imported = excluded.rows_imported,
+                        rows_rejected = excluded.rows_rejected,
+                        updated_at = excluded.updated_at
+                ''', (source_path, offset, total_imported, total_rejected))
+                conn.commit()
+            stats['rows_imported'] += len(rows)
+            stats['rows_rejected'] += len(rejects)
+
+        rows: List[tuple] = []
+        sources: List[Tuple[int, bytes]] = []
+        rejects: List[str] = []
+        offset = start_offset
+        with open(source_path, 'rb') as f:
+            f.seek(start_offset)
+            for raw_line in f:
+                line_offset = offset
+                complete = raw_line.endswith(b'\n')
+                try:
+                    line = raw_line.decode('utf-8').strip()
+                    if line:
+                        data = json.loads(line)
+                        if not isinstance(data, dict):
+                            raise ValueError(f"JSON 객체가 아닙니다: {type(data).__name__}")
+                        rows.append(self._analysis_log_record_row(data))
+                        sources.append((line_offset, raw_line))
+                except (ValueError, TypeError, AttributeError) as e:
+                    if not complete:
+                        # 아직 쓰이는 중인 마지막 줄: 오프셋을 넘기지 않고 다음 실행에서 다시 읽는다
+                        break
+                    rejects.append(reject_entry(line_offset, e, raw_line))
+
+                offset += len(raw_line)
+                stats['bytes_read'] += len(raw_line)
+                if len(rows) + len(rejects) >= chunk_size:
+                    commit_chunk(rows, sources, rejects, offset)
+                    rows, sources, rejects = [], [], []
+                    if time.perf_counter() - last_report >= progress_interval:
+                        report("마이그레이션 진행")
+                        last_report = time.perf_counter()
+
+        if rows or rejects or offset != start_offset or checkpoint is None:
+            commit_chunk(rows, sources, rejects, offset)
+        report(f"JSON 데이터 마이그레이션 완료 ({json_file_path})")
+        if stats['rows_rejected']:
+            logger.warning("거부된 줄은 %s 에 기록되었습니다", reject_path)
+        stats.update({
+            'source_path': source_path,
+            'start_offset': start_offset,
+            'end_offset': offset,
+            'file_size': file_size,
+            'total_rows_imported': total_imported,
+            'total_rows_rejected': total_rejected,
+        })
+        return stats
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🛠️ TradingDatabase 관리 도구
+TradingDatabase maintenance tools
+
+    python db_tools.py migrate trading_enhanced.db                    # 스키마를 최신으로 (대시보드 실행 전)
+    python db_tools.py compress trading_enhanced.db --codec auto --vacuum
+    python db_tools.py compress trading_enhanced.db --codec none     # 압축 해제
+    python db_tools.py archive trading_enhanced.db --days 90 --vacuum
+    python db_tools.py export trading_enhanced.db export/ --format parquet
+    python db_tools.py score trading_enhanced.db                      # 예측 적중 채점 (cron 등에서 주기 실행)
+    python db_tools.py similar trading_enhanced.db -k 5               # 최신 로그와 비슷했던 과거 상황
+"""
+
+import argparse
+import logging
+import os
+import time
+
+from columnar_export import export_columnar, load_export_state
+from database import PAYLOAD_COLUMNS, TradingDatabase, resolve_payload_codec
+from predictions import PREDICTION_HORIZONS
+
+
+def _file_size(db: TradingDatabase) -> int:
+    """WAL 내용을 본 파일에 반영한 뒤의 DB 파일 크기"""
+    db.checkpoint('TRUNCATE')
+    return os.path.getsize(db.db_path)
+
+
+def _time_recent_logs(db: TradingDatabase, limit: int = 100, repeat: int = 5) -> float:
+    """get_recent_logs(limit) 평균 시간 (ms)"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        db.get_recent_logs(limit)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def _time_encoding(db: TradingDatabase, codec, sample_size: int = 200):
+    """표본 JSON 텍스트의 행당 압축/해제 시간 (µs)"""
+    rows = db.get_recent_logs(sample_size, columns=PAYLOAD_COLUMNS, row_format='tuple')
+    texts = [value for row in rows for value in row if value]
+    if not texts:
+        return 0.0, 0.0
+    start = time.perf_counter()
+    encoded = [db.encode_payload(text, codec or '') for text in texts]
+    encode_us = (time.perf_counter() - start) / len(texts) * 1e6
+    start = time.perf_counter()
+    for value in encoded:
+        db.decode_payload(value)
+    decode_us = (time.perf_counter() - start) / len(texts) * 1e6
+    return encode_us, decode_us
+
+
+def migrate_command(args):
+    """스키마를 최신 버전으로 맞추기 (조회 전용 대시보드는 마이그레이션하지 않는다)"""
+    start = time.perf_counter()
+    TradingDatabase(args.db).close()
+    print(f"🗂️ 스키마 최신 ({time.perf_counter() - start:.2f}s): {args.db}")
+
+
+def compress_command(args):
+    """기존 DB 의 JSON 컬럼을 제자리 압축(또는 해제)하고 압축률과 지연 비용 보고"""
+    codec = None if args.codec == 'none' else resolve_payload_codec(args.codec)
+    db = TradingDatabase(args.db, payload_codec=codec, compression_level=args.level)
+    size_before = _file_size(db)
+
+    read_before = _time_recent_logs(db)
+    if codec and args.train_dictionary:
+        db.train_compression_dictionary(codec)
+    result = db.convert_payload_storage(codec, use_dictionary=not args.no_dictionary)
+    read_after = _time_recent_logs(db)
+    encode_us, decode_us = _time_encoding(db, codec)
+
+    if args.vacuum:
+        db.vacuum()
+    size_after = _file_size(db)
+    db.close()
+
+    print()
+    print(f"📦 압축 결과 ({codec or '무압축'})")
+    print(f"  JSON 컬럼: {result['bytes_before']:,} → {result['bytes_after']:,} bytes "
+          f"(압축률 {result['compression_ratio']:.2f}x)")
+    print(f"  DB 파일:   {size_before:,} → {size_after:,} bytes{'' if args.vacuum else ' (VACUUM 전)'}")
+    print(f"⏱️ 지연 비용")
+    print(f"  쓰기: 문서당 압축 {encode_us:,.1f} µs")
+    print(f"  읽기: 문서당 해제 {decode_us:,.1f} µs | get_recent_logs(100) {read_before:,.2f} → {read_after:,.2f} ms")
+
+
+def archive_command(args):
+    """오래된 분석 로그·거래를 월별 아카이브 파일로 옮기고 본 DB 크기 변화 보고"""
+    db = TradingDatabase(args.db, archive_dir=args.archive_dir, archive_after_days=args.days)
+    size_before = _file_size(db)
+    moved = db.archive_old_rows()
+    if args.vacuum:
+        db.vacuum()
+    size_after = _file_size(db)
+    db.close()
+
+    print()
+    print(f"🗄️ 아카이브 결과 ({args.days}일 이전 → {db.archive_dir})")
+    for month, counts in moved.items():
+        print(f"  {month}: 분석 로그 {counts['trading_logs']:,}건, 거래 {counts['actual_trades']:,}건")
+    if not moved:
+        print("  옮길 행이 없습니다")
+    print(f"  DB 파일: {size_before:,} → {size_after:,} bytes{'' if args.vacuum else ' (VACUUM 전)'}")
+
+
+def export_command(args):
+    """지난 내보내기 이후 새 행만 컬럼형 파일로 내보내기"""
+    db = TradingDatabase(args.db)
+    start = time.perf_counter()
+    exported = export_columnar(db, args.export_dir, file_format=args.format, compression=args.compression,
+                               batch_size=args.batch_size, include_payloads=args.include_payloads)
+    elapsed = time.perf_counter() - start
+    db.close()
+
+    state = load_export_state(args.export_dir)
+    print()
+    print(f"🧊 내보내기 결과 ({args.format}, {elapsed:.2f}s → {args.export_dir})")
+    for table, count in exported.items():
+        print(f"  {table}: 새 행 {count:,}건 | 누적 {state[table]['rows']:,}건, 마지막 id {state[table]['last_id']}")
+
+
+def score_command(args):
+    """아직 채점하지 않은 AI 결정을 채점하고 기간별 적중률 보고"""
+    db = TradingDatabase(args.db)
+    start = time.perf_counter()
+    saved = db.backfill_prediction_accuracy(full=args.full, batch_size=args.batch_size)
+    elapsed = time.perf_counter() - start
+    accuracy = db.get_prediction_accuracy()
+    db.close()
+
+    print()
+    print(f"🎯 채점 결과 (새로 {saved:,}건, {elapsed:.2f}s)")
+    for decision, summary in [('전체', accuracy['total'])] + sorted(accuracy['by_decision'].items()):
+        rates = ' | '.join(
+            f"{name} {'-' if stats['hit_rate'] is None else format(stats['hit_rate'], '.1%')} ({stats['scored']:,})"
+            for name, stats in summary.items() if isinstance(stats, dict)
+        )
+        print(f"  {decision:<5} {summary['predictions']:>8,}건 | {rates}")
+
+
+def similar_command(args):
+    """유사 상황 인덱스를 최신 로그까지 맞춰 저장하고, 기준 로그와 비슷했던 과거 상황 출력"""
+    index_dir = args.index_dir or os.path.splitext(args.db)[0] + '_similarity'
+    db = TradingDatabase(args.db, similarity_index_dir=index_dir)
+    start = time.perf_counter()
+    size = db.similarity_index.refresh(full=args.rebuild)
+    elapsed = time.perf_counter() - start
+    similar = db.find_similar_contexts(args.k, timestamp=args.at, min_gap_hours=args.min_gap_hours)
+    db.similarity_index.save()
+    db.close()
+
+    print()
+    print(f"🧭 유사 상황 (인덱스 {size:,}건, {elapsed:.2f}s → {index_dir})")
+    if not similar:
+        print("  비교할 과거 로그가 없습니다")
+    for item in similar:
+        outcome = item['outcome'] or {}
+        returns = ' | '.join(
+            f"{name} {'-' if outcome.get(f'return_{name}') is None else format(outcome[f'return_{name}'], '+.2%')}"
+            for name in PREDICTION_HORIZONS
+        )
+        print(f"  #{item['id']:<8} {item['timestamp'][:16]}  거리 {item['distance']:.3f}  "
+              f"{item['ai_decision'] or '-':<4} | 이후 변동 {returns}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TradingDatabase 관리 도구")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    migrate = subparsers.add_parser('migrate', help="스키마를 최신 버전으로 마이그레이션")
+    migrate.add_argument('db', help="대상 SQLite 파일")
+    migrate.set_defaults(func=migrate_command)
+
+    compress = subparsers.add_parser('compress', help="JSON 컬럼 제자리 압축/해제")
+    compress.add_argument('db', help="대상 SQLite 파일")
+    compress.add_argument('--codec', default='auto', choices=['auto', 'zlib', 'zstd', 'none'])
+    compress.add_argument('--level', type=int, default=6, help="압축 수준")
+    compress.add_argument('--train-dictionary', action='store_true', help="기존 사전이 있어도 새로 학습")
+    compress.add_argument('--no-dictionary', action='store_true', help="압축 사전 없이 압축")
+    compress.add_argument('--vacuum', action='store_true', help="변환 후 VACUUM 으로 파일 크기 줄이기")
+    compress.set_defaults(func=compress_command)
+
+    archive = subparsers.add_parser('archive', help="오래된 행을 월별 아카이브 파일로 이동")
+    archive.add_argument('db', help="대상 SQLite 파일")
+    archive.add_argument('--days', type=int, default=90, help="이보다 오래된 행을 옮긴다 (일)")
+    archive.add_argument('--archive-dir', help="아카이브 디렉터리 (기본: <DB 이름>_archive/)")
+    archive.add_argument('--vacuum', action='store_true', help="이동 후 VACUUM 으로 파일 크기 줄이기")
+    archive.set_defaults(func=archive_command)
+
+    export = subparsers.add_parser('export', help="새 행만 Parquet/Feather 로 증분 내보내기")
+    export.add_argument('db', help="대상 SQLite 파일")
+    export.add_argument('export_dir', help="내보내기 디렉터리 (상태 파일 포함)")
+    export.add_argument('--format', default='parquet', choices=['parquet', 'feather'])
+    export.add_argument('--compression', default='zstd', help="압축 코덱 (zstd, lz4, snappy 등)")
+    export.add_argument('--batch-size', type=int, default=50000, help="한 번에 읽을 행 수")
+    export.add_argument('--include-payloads', action='store_true', help="원본 JSON 컬럼도 포함")
+    export.set_defaults(func=export_command)
+
+    score = subparsers.add_parser('score', help="AI 결정의 1시간/4시간/24시간 적중 여부 채점")
+    score.add_argument('db', help="대상 SQLite 파일")
+    score.add_argument('--full', action='store_true', help="전체 이력을 다시 훑기 (나중에 가져온 과거 로그 포함)")
+    score.add_argument('--batch-size', type=int, default=50000, help="한 번에 읽을 로그 수")
+    score.set_defaults(func=score_command)
+
+    similar = subparsers.add_parser('similar', help="시장 상황이 비슷했던 과거 분석 로그 찾기")
+    similar.add_argument('db', help="대상 SQLite 파일")
+    similar.add_argument('-k', type=int, default=5, help="찾을 로그 수")
+    similar.add_argument('--at', help="기준 시각 (기본: 최신 로그)")
+    similar.add_argument('--min-gap-hours', type=float, default=24.0, help="기준 로그보다 이만큼 앞선 로그만 후보")
+    similar.add_argument('--index-dir', help="인덱스 저장 디렉터리 (기본: <DB 이름>_similarity/)")
+    similar.add_argument('--rebuild', action='store_true', help="인덱스를 처음부터 다시 만들기")
+    similar.set_defaults(func=similar_command)
+
+    args = parser.parse_args()
+    # 라이브러리 진행 메시지 (마이그레이션·변환·아카이브 등) 를 화면에 표시
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+🧮 DataFrame / NumPy 구조체 배열 로더
+Columnar loaders with explicit dtypes
+
+키셋 페이지(값 튜플 목록)를 받는 대로 컬럼별 NumPy 배열로 옮겨 쌓고, 마지막에 한 번 이어 붙여
+고정된 dtype 의 DataFrame 또는 구조체 배열을 만든다. 행마다 dict 를 만들거나 pandas 가 타입을
+추측하게 두지 않는다.
+
+    시간      timestamp / created_at → datetime64[ms] (timestamp_ms / created_at_ms 에서 변환, UTC)
+              DataFrame 은 datetime64[ms, UTC], 구조체 배열은 UTC 기준 datetime64[ms]
+    범주      trade_type / ai_decision / ai_confidence / analysis_type → category (구조체 배열은 고정 폭 문자열)
+    논리      BOOLEAN 컬럼 (success) → bool (NULL 은 False)
+    실수      REAL 컬럼 → float64 (NULL 은 NaN)
+    정수      INTEGER 컬럼 → int64 (NULL 이 있으면 DataFrame 은 Int64, 구조체 배열은 float64)
+    문자열    나머지 → pandas 기본 문자열 dtype (구조체 배열은 object)
+"""
+
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+# 시간 컬럼 이름 → 실제로 읽는 epoch 밀리초 컬럼
+TIME_COLUMNS = {'timestamp': 'timestamp_ms', 'created_at': 'created_at_ms'}
+
+# 값의 종류가 몇 개뿐인 문자열 컬럼 (category)
+CATEGORICAL_COLUMNS = ('trade_type', 'ai_decision', 'ai_confidence', 'analysis_type')
+
+# 페이지 단위 변환 결과의 중간 dtype (정수·논리·시간은 NULL 을 NaN 으로 받기 위해 float64 로 모은다)
+_STAGING_DTYPES = {'datetime': np.float64, 'float': np.float64, 'int': np.float64, 'bool': np.float64}
+
+
+def column_kind(name: str, declared: str) -> str:
+    """컬럼의 로더 타입 ('datetime', 'category', 'bool', 'float', 'int', 'text')"""
+    declared = (declared or '').upper()
+    if name in TIME_COLUMNS:
+        return 'datetime'
+    if name in CATEGORICAL_COLUMNS:
+        return 'category'
+    if declared == 'BOOLEAN':
+        return 'bool'
+    if declared == 'REAL':
+        return 'float'
+    if declared == 'INTEGER':
+        return 'int'
+    return 'text'
+
+
+def source_columns(names: Sequence[str]) -> List[str]:
+    """로더 컬럼을 읽기 위해 SELECT 할 테이블 컬럼 (시간 컬럼은 epoch 밀리초 컬럼으로 대체, 중복 제거)"""
+    return list(dict.fromkeys(TIME_COLUMNS.get(name, name) for name in names))
+
+
+class ColumnBuffer:
+    """페이지마다 컬럼별 NumPy 배열을 쌓아 두었다가 한 번에 이어 붙이는 버퍼"""
+
+    def __init__(self, names: Sequence[str], kinds: Dict[str, str]):
+        self.names = list(names)
+        self.kinds = kinds
+        self.chunks: Dict[str, List[np.ndarray]] = {name: [] for name in names}
+        self.rows = 0
+
+    def add(self, page: Sequence[tuple], columns: Sequence[str]):
+        """값 튜플 목록 한 페이지를 컬럼 배열로 옮기기 (columns 는 튜플의 컬럼 이름 순서)"""
+        if not page:
+            return
+        positions = {column: i for i, column in enumerate(columns)}
+        values_by_column = list(zip(*page))
+        for name in self.names:
+            values = values_by_column[positions[TIME_COLUMNS.get(name, name)]]
+            dtype = _STAGING_DTYPES.get(self.kinds[name], object)
+            self.chunks[name].append(np.array(values, dtype=dtype))
+        self.rows += len(page)
+
+    def finish(self) -> Dict[str, np.ndarray]:
+        """컬럼별 최종 배열 (시간: datetime64[ms], 논리: bool, 정수: NULL 이 없으면 int64)"""
+        arrays = {}
+        for name in self.names:
+            kind = self.kinds[name]
+            chunks = self.chunks[name]
+            values = np.concatenate(chunks) if chunks else np.empty(0, dtype=_STAGING_DTYPES.get(kind, object))
+            if kind == 'datetime':
+                missing = np.isnan(values)
+                values = np.where(missing, 0, values).astype(np.int64).astype('datetime64[ms]')
+                values[missing] = np.datetime64('NaT')
+            elif kind == 'bool':
+                values = np.nan_to_num(values) != 0
+            elif kind == 'int' and not np.isnan(values).any():
+                values = values.astype(np.int64)
+            arrays[name] = values
+            self.chunks[name] = []
+        return arrays
+
+
+def collect_columns(pages: Iterable, names: Sequence[str], kinds: Dict[str, str]) -> Dict[str, np.ndarray]:
+    """Rows 페이지 스트림을 컬럼별 배열로 모으기"""
+    buffer = ColumnBuffer(names, kinds)
+    for page in pages:
+        buffer.add(page, page.columns)
+    return buffer.finish()
+
+
+def to_dataframe(arrays: Dict[str, np.ndarray], kinds: Dict[str, str]):
+    """컬럼 배열 → 고정 dtype DataFrame"""
+    import pandas as pd  # DataFrame 로더에서만 필요
+
+    data = {}
+    for name, values in arrays.items():
+        kind = kinds[name]
+        if kind == 'datetime':
+            data[name] = pd.DatetimeIndex(values).tz_localize('UTC')
+        elif kind == 'category':
+            data[name] = pd.Categorical(values)
+        elif kind == 'int' and values.dtype != np.int64:
+            data[name] = pd.array(values, dtype='Int64')
+        else:
+            data[name] = values
+    return pd.DataFrame(data, columns=list(arrays))
+
+
+def to_structured(arrays: Dict[str, np.ndarray], kinds: Dict[str, str]) -> np.ndarray:
+    """컬럼 배열 → NumPy 구조체 배열 (범주 컬럼은 가장 긴 값에 맞춘 고정 폭 문자열, NULL 은 빈 문자열)"""
+    fields: List[Tuple[str, object]] = []
+    columns = {}
+    for name, values in arrays.items():
+        if kinds[name] == 'category':
+            values = np.where(np.equal(values, None), '', values).astype(str)
+            if values.dtype.itemsize == 0:
+                values = values.astype('U1')
+        columns[name] = values
+        fields.append((name, values.dtype))
+    result = np.empty(len(next(iter(columns.values()))) if columns else 0, dtype=fields)
+    for name, values in columns.items():
+        result[name] = values
+    return result
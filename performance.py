@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+📈 NumPy 기반 매매 성과 계산
+Vectorized FIFO performance engine
+
+성공한 거래를 시간순 배열로 한 번만 읽어 두고, 매도마다 FIFO 로 실현 손익을 계산한 뒤
+누적합 + searchsorted 로 여러 기간(1일/7일/30일/전체/사용자 지정)의 통계를 한 번에 구한다.
+
+FIFO 원가는 "처음 q 개를 사는 데 든 비용" 곡선 C(q) (매수 수량·비용 누적합의 구간 선형 함수)로
+계산한다. 매도 i 가 누적 매칭 수량을 M(i-1) 에서 M(i) 로 늘리면 그 원가는 C(M(i)) - C(M(i-1)) 이다.
+보유량보다 많이 파는 매도(기록 이전부터 보유하던 BTC 등)는 매칭되지 않은 수량으로 따로 집계하며
+이후 매수분을 미리 끌어다 쓰지 않는다.
+"""
+
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+# 거래 배열로 읽는 actual_trades 식 (성공한 거래를 timestamp_ms, id 순서로 읽는다)
+TRADE_ARRAY_COLUMNS = ('timestamp_ms', "trade_type = 'buy'", 'price', 'amount', 'total_value', 'IFNULL(fee, 0)')
+
+# 이보다 작은 매칭 수량은 누적합 반올림 오차로 보고 0 으로 취급 (1 satoshi = 1e-8 BTC)
+AMOUNT_EPSILON = 1e-12
+
+# window_stats 가 기간마다 돌려주는 값 (누적합으로 계산)
+WINDOW_SUMS = (
+    'total_trades', 'buy_count', 'sell_count', 'closed_trades', 'successful_trades',
+    'total_profit_loss', 'total_fee', 'turnover', 'unmatched_amount',
+)
+
+
+class TradeArrays:
+    """시간순으로 정렬된 성공 거래의 열별 배열"""
+
+    __slots__ = ('timestamp_ms', 'is_buy', 'price', 'amount', 'total_value', 'fee')
+
+    def __init__(self, timestamp_ms: np.ndarray, is_buy: np.ndarray, price: np.ndarray,
+                 amount: np.ndarray, total_value: np.ndarray, fee: np.ndarray):
+        self.timestamp_ms = np.asarray(timestamp_ms, dtype=np.int64)
+        self.is_buy = np.asarray(is_buy, dtype=bool)
+        self.price = np.asarray(price, dtype=np.float64)
+        self.amount = np.asarray(amount, dtype=np.float64)
+        self.total_value = np.asarray(total_value, dtype=np.float64)
+        self.fee = np.asarray(fee, dtype=np.float64)
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[tuple]) -> 'TradeArrays':
+        """(timestamp_ms, is_buy, price, amount, total_value, fee, ...) 행 목록에서 생성 (뒤쪽 추가 열은 무시)"""
+        data = np.array(rows, dtype=np.float64) if len(rows) else np.zeros((0, 6))
+        return cls(data[:, 0], data[:, 1] != 0, data[:, 2], data[:, 3], data[:, 4], data[:, 5])
+
+    def __len__(self) -> int:
+        return len(self.timestamp_ms)
+
+
+def realize_fifo(trades: TradeArrays) -> Dict[str, np.ndarray]:
+    """거래별 FIFO 실현 손익 계산
+
+    매수 원가에는 매수 수수료를, 매도 대금에서는 매도 수수료를 반영한다. 반환하는 배열은
+    모두 거래 수와 길이가 같고 매수 행의 값은 0 이다.
+      realized_pnl     매칭된 수량의 실현 손익
+      matched_amount   보유분과 매칭된 매도 수량
+      unmatched_amount 보유량을 넘어 매칭되지 않은 매도 수량
+    """
+    is_sell = ~trades.is_buy
+    buy_amount = np.where(trades.is_buy, trades.amount, 0.0)
+    buy_cost = np.where(trades.is_buy, trades.total_value + trades.fee, 0.0)
+    sell_amount = np.where(is_sell, trades.amount, 0.0)
+
+    # 각 거래 시점까지의 누적 매수/매도 수량
+    bought = np.cumsum(buy_amount)
+    sold = np.cumsum(sell_amount)
+    # 보유량을 넘어선 누적 매도량 D(i) = max(0, max_{j<=i}(sold_j - bought_j)), 매칭 누적량 M = sold - D
+    uncovered = np.maximum.accumulate(np.maximum(sold - bought, 0.0)) if len(trades) else sold
+    matched_total = sold - uncovered
+    matched_before = np.concatenate(([0.0], matched_total[:-1]))
+    matched = np.where(is_sell, matched_total - matched_before, 0.0)
+    matched[matched < AMOUNT_EPSILON] = 0.0
+
+    # 매수 수량 누적 → 매수 비용 누적 곡선 C(q) (수량이 0 인 매수는 곡선에 영향이 없으므로 제외)
+    lots = trades.is_buy & (trades.amount > 0)
+    curve_q = np.concatenate(([0.0], np.cumsum(trades.amount[lots])))
+    curve_cost = np.concatenate(([0.0], np.cumsum(buy_cost[lots])))
+    cost = np.where(matched > 0, np.interp(matched_total, curve_q, curve_cost)
+                    - np.interp(matched_before, curve_q, curve_cost), 0.0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fraction = np.where(is_sell & (trades.amount > 0), matched / trades.amount, 0.0)
+    proceeds = fraction * (trades.total_value - trades.fee)
+    return {
+        'realized_pnl': np.where(matched > 0, proceeds - cost, 0.0),
+        'matched_amount': matched,
+        'unmatched_amount': sell_amount - matched,
+    }
+
+
+def window_stats(trades: TradeArrays, windows: Dict[str, Tuple[Optional[int], Optional[int]]],
+                 realized: Optional[Dict[str, np.ndarray]] = None) -> Dict[str, Dict]:
+    """여러 기간 [start_ms, end_ms) 의 성과 통계를 한 번에 계산
+
+    start/end 가 None 이면 그 방향으로 제한 없음. 손익은 전체 이력으로 계산한 FIFO 원가를
+    기준으로 하므로 기간 이전에 산 물량을 기간 안에서 판 경우도 올바르게 잡힌다.
+    """
+    if realized is None:
+        realized = realize_fifo(trades)
+    pnl = realized['realized_pnl']
+    closed = realized['matched_amount'] > 0
+    columns = np.stack([
+        np.ones(len(trades)),
+        trades.is_buy,
+        ~trades.is_buy,
+        closed,
+        closed & (pnl > 0),
+        pnl,
+        trades.fee,
+        trades.total_value,
+        realized['unmatched_amount'],
+    ]) if len(trades) else np.zeros((len(WINDOW_SUMS), 0))
+    prefix = np.concatenate((np.zeros((len(WINDOW_SUMS), 1)), np.cumsum(columns, axis=1)), axis=1)
+
+    names = list(windows)
+    no_limit = np.iinfo(np.int64)
+    starts = np.array([no_limit.min if windows[n][0] is None else windows[n][0] for n in names], dtype=np.int64)
+    ends = np.array([no_limit.max if windows[n][1] is None else windows[n][1] for n in names], dtype=np.int64)
+    lo = np.searchsorted(trades.timestamp_ms, starts, side='left')
+    hi = np.maximum(np.searchsorted(trades.timestamp_ms, ends, side='left'), lo)
+    sums = prefix[:, hi] - prefix[:, lo]
+
+    results = {}
+    for k, name in enumerate(names):
+        stats = dict(zip(WINDOW_SUMS, sums[:, k].tolist()))
+        for key in ('total_trades', 'buy_count', 'sell_count', 'closed_trades', 'successful_trades'):
+            stats[key] = int(round(stats[key]))
+        stats['failed_trades'] = stats['closed_trades'] - stats['successful_trades']
+        stats['win_rate'] = (stats['successful_trades'] / stats['closed_trades'] * 100
+                             if stats['closed_trades'] else 0)
+        stats['start_ms'], stats['end_ms'] = windows[name]
+        results[name] = stats
+    return results
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+🎯 AI 예측 적중 채점 (NumPy as-of 조인)
+Vectorized as-of scoring of AI decisions
+
+분석 로그의 결정(BUY/SELL/HOLD)을 1시간/4시간/24시간 뒤 가격과 비교해 적중 여부를 매긴다.
+가격 틱을 시간순 배열로 한 번 읽어 두고, 각 결정 시각 + 기간에 대해 searchsorted 로
+"그 시각 이전의 마지막 틱" 을 한꺼번에 찾는다 (backward as-of 조인). 그 틱이 기간의 1/4 보다
+오래되었으면 (봇이 멈춰 있던 구간 등) 가격을 모르는 것으로 보고 NULL 로 남긴다.
+
+    BUY  → up        : 가격이 올랐으면 적중
+    SELL → down      : 가격이 내렸으면 적중
+    HOLD → sideways  : 변동이 ±HOLD_BAND 이내면 적중
+"""
+
+from typing import Dict, Sequence
+
+import numpy as np
+
+# 채점 기간 (이름 → ms) - prediction_accuracy 의 actual_price_* / prediction_correct_* 컬럼 이름과 같다
+PREDICTION_HORIZONS = {'1h': 3_600_000, '4h': 14_400_000, '24h': 86_400_000}
+
+# 결정 → 예측 방향
+PREDICTION_DIRECTIONS = {'BUY': 'up', 'SELL': 'down', 'HOLD': 'sideways'}
+
+# 신뢰도 라벨 → 숫자 (대시보드의 신뢰도 표시와 같은 값)
+CONFIDENCE_LEVELS = {'LOW': 0.3, 'MEDIUM': 0.6, 'HIGH': 0.9, 'VERY_HIGH': 1.0}
+
+# HOLD 가 적중으로 인정되는 가격 변동 폭 (±0.5%)
+HOLD_BAND = 0.005
+
+# as-of 틱이 목표 시각보다 이만큼(기간 대비 비율) 넘게 앞서면 가격 없음으로 본다
+ASOF_TOLERANCE = 0.25
+
+_DIRECTION_CODES = {'up': 1, 'down': -1, 'sideways': 0}
+
+
+def confidence_value(confidence) -> float:
+    """신뢰도 (숫자 또는 LOW/MEDIUM/HIGH 라벨) → 0~1 숫자 (해석할 수 없으면 NaN)"""
+    if confidence is None:
+        return np.nan
+    try:
+        return float(confidence)
+    except (TypeError, ValueError):
+        return CONFIDENCE_LEVELS.get(str(confidence).upper(), np.nan)
+
+
+def asof_prices(tick_ms: np.ndarray, tick_price: np.ndarray, target_ms: np.ndarray,
+                tolerance_ms: int) -> np.ndarray:
+    """각 목표 시각 이전(같은 시각 포함)의 마지막 틱 가격 (tolerance_ms 보다 오래되었거나 없으면 NaN)"""
+    index = np.searchsorted(tick_ms, target_ms, side='right') - 1
+    found = index >= 0
+    index = np.where(found, index, 0)
+    if len(tick_ms):
+        found &= tick_ms[index] >= target_ms - tolerance_ms
+        return np.where(found, tick_price[index], np.nan)
+    return np.full(len(target_ms), np.nan)
+
+
+def score_predictions(timestamp_ms: np.ndarray, base_price: np.ndarray, decisions: Sequence,
+                      tick_ms: np.ndarray, tick_price: np.ndarray) -> Dict[str, np.ndarray]:
+    """결정 배열을 기간별로 채점
+
+    base_price 가 없거나 0 이하인 결정은 결정 시각의 as-of 틱 가격을 기준가로 쓴다.
+    반환: actual_price_{기간} (float, NaN = 모름), prediction_correct_{기간} (float 1/0, NaN = 모름),
+    accuracy_score (가격을 아는 기간 중 적중 비율, 모두 모르면 NaN), predicted_direction (object).
+    """
+    timestamp_ms = np.asarray(timestamp_ms, dtype=np.int64)
+    base_price = np.asarray(base_price, dtype=np.float64)
+    tick_ms = np.asarray(tick_ms, dtype=np.int64)
+    tick_price = np.asarray(tick_price, dtype=np.float64)
+    directions = np.array([PREDICTION_DIRECTIONS.get(str(d).upper()) if d else None for d in decisions],
+                          dtype=object)
+    codes = np.array([_DIRECTION_CODES.get(d, 2) for d in directions], dtype=np.int8)
+
+    missing = ~(base_price > 0)
+    if missing.any():
+        base_price = np.where(missing, asof_prices(tick_ms, tick_price, timestamp_ms,
+                                                   int(min(PREDICTION_HORIZONS.values()) * ASOF_TOLERANCE)),
+                              base_price)
+
+    result = {'predicted_direction': directions}
+    hits = np.zeros(len(timestamp_ms))
+    known = np.zeros(len(timestamp_ms))
+    for name, horizon in PREDICTION_HORIZONS.items():
+        price = asof_prices(tick_ms, tick_price, timestamp_ms + horizon, int(horizon * ASOF_TOLERANCE))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            change = price / base_price - 1
+        correct = np.select(
+            [codes == 1, codes == -1, codes == 0],
+            [change > 0, change < 0, np.abs(change) <= HOLD_BAND],
+            default=False,
+        ).astype(np.float64)
+        scored = ~np.isnan(change) & (codes != 2)
+        correct[~scored] = np.nan
+        result[f'actual_price_{name}'] = price
+        result[f'prediction_correct_{name}'] = correct
+        hits += np.nan_to_num(correct)
+        known += scored
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result['accuracy_score'] = np.where(known > 0, hits / known, np.nan)
+    return result
@@ -5,11 +5,14 @@
 Trading Results Dashboard
 """
 
+import html
+import json
+import sqlite3
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
-from database import TradingDatabase
+from database import LOCAL_TIMEZONE, SCHEMA_VERSION, SchemaOutdatedError, TradingDatabase, local_now
 
 # 페이지 설정
 st.set_page_config(
@@ -211,36 +214,93 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-@st.cache_data(ttl=300)
-def load_trading_data():
-    """거래 데이터 로드"""
+# 표시 시간대 (DB 의 timestamp 텍스트와 같은 LOCAL_TIMEZONE, 대시보드 서버의 시간대와 무관)
+LOCAL_TZ = LOCAL_TIMEZONE
+
+def with_epoch_timestamp(df):
+    """timestamp_ms (epoch 밀리초) 로 timestamp 컬럼을 datetime64 로 변환 - 문자열 파싱 없음"""
+    if 'timestamp_ms' in df.columns:
+        df['timestamp'] = (
+            pd.to_datetime(df['timestamp_ms'], unit='ms', utc=True)
+            .dt.tz_convert(LOCAL_TZ)
+            .dt.tz_localize(None)
+        )
+    return df
+
+def with_local_time(df, columns=('timestamp', 'created_at')):
+    """UTC datetime 컬럼 (load_*_frame 결과) 을 로컬 시간으로 변환"""
+    for column in columns:
+        if column in df.columns:
+            df[column] = df[column].dt.tz_convert(LOCAL_TZ).dt.tz_localize(None)
+    return df
+
+# 대시보드가 읽는 테이블 (변경 토큰이 바뀔 때만 다시 읽는다)
+DASHBOARD_TABLES = ('actual_trades', 'portfolio_snapshots', 'trading_logs', 'prediction_accuracy')
+
+DB_PATH = "trading_enhanced.db"
+
+@st.cache_resource
+def get_database():
+    """세션·재실행이 함께 쓰는 읽기 전용 DB 객체 (연결은 스레드마다 따로 열린다)
+
+    스키마가 오래된 DB 는 처음 한 번만 쓰기 모드로 열어 마이그레이션한 뒤 읽기 전용으로 다시 연다.
+    마이그레이션할 수 없으면 (쓰기 권한이 없는 파일 등) SchemaOutdatedError 를 올려 화면에 명령을 안내한다.
+    """
     try:
-        # TradingDatabase 클래스 사용
-        db = TradingDatabase("trading_enhanced.db")
-        
-        # 거래 내역 - 최근 1년간 데이터
-        start_date = (datetime.now() - timedelta(days=365)).strftime('%Y-%m-%d')
-        end_date = datetime.now().strftime('%Y-%m-%d')
-        
-        trades_data = db.get_trades_by_date(start_date, end_date)
-        trades_df = pd.DataFrame(trades_data)
-        
-        # 포트폴리오 히스토리
-        portfolio_data = db.get_portfolio_history(100)
-        portfolio_df = pd.DataFrame(portfolio_data)
-        
-        # AI 분석 로그
-        ai_logs_data = db.get_recent_logs(50)
-        ai_logs_df = pd.DataFrame(ai_logs_data)
-        
-        return {
-            'trades': trades_df,
-            'portfolio': portfolio_df,
-            'ai_logs': ai_logs_df,
-            'status': 'success'
-        }
-    except Exception as e:
-        return {'status': 'error', 'error': str(e)}
+        return TradingDatabase(DB_PATH, read_only=True)
+    except SchemaOutdatedError as outdated:
+        try:
+            TradingDatabase(DB_PATH).close()
+        except (sqlite3.Error, OSError) as e:
+            raise outdated from e
+    return TradingDatabase(DB_PATH, read_only=True)
+
+def get_change_token():
+    """대시보드 테이블의 변경 토큰 (조회 실패 시 None)"""
+    try:
+        return tuple(get_database().get_change_tokens(DASHBOARD_TABLES).values())
+    except Exception:
+        return None
+
+@st.cache_data(max_entries=4)
+def load_trading_data(change_token, today):
+    """거래 데이터 로드 (change_token 과 오늘 날짜가 같으면 캐시된 결과 사용)
+
+    조회 기간은 today (YYYY-MM-DD) 기준이라 날짜가 바뀌면 새로 읽는다. 실패하면 예외를 그대로 올려
+    오류 결과가 캐시되지 않게 한다 (다음 실행 때 다시 시도).
+    """
+    db = get_database()
+    base = datetime.strptime(today, '%Y-%m-%d')
+    
+    # 거래 내역 - 최근 1년간 데이터
+    start_date = (base - timedelta(days=365)).strftime('%Y-%m-%d')
+    
+    # 고정 dtype DataFrame 으로 바로 로드 (시간순 → 최신 거래부터 표시)
+    trades_df = with_local_time(db.load_trades_frame(start_date, today)).iloc[::-1].reset_index(drop=True)
+    
+    # 포트폴리오 히스토리
+    portfolio_df = db.get_portfolio_history(100, row_format='tuple').to_dataframe()
+    
+    # AI 분석 로그 (목록에 필요한 컬럼만, 원본 JSON 은 카드에서 요청할 때 조회)
+    ai_logs_df = with_epoch_timestamp(db.get_recent_log_summaries(50, row_format='tuple').to_dataframe())
+    
+    # BTC 가격 - 최근 30일을 500개 이내의 점으로 (기간에 맞는 틱/캔들 해상도를 DB 가 고른다)
+    price_start = (base - timedelta(days=30)).strftime('%Y-%m-%d')
+    prices = db.get_price_series(price_start, max_points=500, row_format='tuple')
+    
+    return {
+        'trades': trades_df,
+        'portfolio': portfolio_df,
+        'ai_logs': ai_logs_df,
+        'prices': with_epoch_timestamp(prices['rows'].to_dataframe()),
+        'price_resolution': prices['resolution'],
+        'prediction_accuracy': db.get_prediction_accuracy(),
+    }
+
+@st.cache_data(max_entries=4)
+def load_similar_contexts(change_token):
+    """비슷했던 과거 상황 로드 (실패하면 예외를 올려 캐시하지 않는다)"""
+    return get_database().find_similar_contexts(5)
 
 def calculate_performance_metrics(trades_df):
     """성과 지표 계산"""
@@ -258,7 +318,7 @@ def calculate_performance_metrics(trades_df):
     
     # 현재 포트폴리오 가치 가져오기
     try:
-        db = TradingDatabase("trading_enhanced.db")
+        db = get_database()
         portfolio_data = db.get_portfolio_history(1)
         current_portfolio_value = portfolio_data[0]['total_value'] if portfolio_data else 0
     except:
@@ -433,8 +493,8 @@ def render_portfolio_details(portfolio_df):
     
     # 현재 BTC 시세를 가져오기 (최근 trading_logs에서)
     try:
-        db = TradingDatabase("trading_enhanced.db")
-        recent_logs = db.get_recent_logs(1)
+        db = get_database()
+        recent_logs = db.get_recent_logs(1, columns=['current_price'])
         current_btc_price = recent_logs[0]['current_price'] if recent_logs else avg_buy_price_from_db
     except:
         current_btc_price = avg_buy_price_from_db
@@ -575,6 +635,60 @@ def render_portfolio_details(portfolio_df):
     
     st.plotly_chart(fig, use_container_width=True)
 
+def render_price_chart(price_df, resolution):
+    """BTC 가격 차트 (캔들 해상도면 캔들스틱, 틱이면 선)"""
+    st.markdown('''
+    <div class="chart-container">
+        <h2 class="section-header">💹 BTC 가격 (최근 30일)</h2>
+    </div>
+    ''', unsafe_allow_html=True)
+    
+    if price_df.empty:
+        st.info("가격 데이터가 없습니다.")
+        return
+    
+    fig = go.Figure()
+    if resolution == 'tick':
+        fig.add_trace(go.Scatter(
+            x=price_df['timestamp'],
+            y=price_df['close'],
+            mode='lines',
+            name='BTC',
+            line=dict(color='#FF6B35', width=2),
+            hovertemplate='<b>BTC</b><br>시각: %{x}<br>가격: ₩%{y:,.0f}<extra></extra>'
+        ))
+    else:
+        fig.add_trace(go.Candlestick(
+            x=price_df['timestamp'],
+            open=price_df['open'],
+            high=price_df['high'],
+            low=price_df['low'],
+            close=price_df['close'],
+            name=f'BTC ({resolution})',
+            increasing_line_color='#00D084',
+            decreasing_line_color='#FF4B4B'
+        ))
+    
+    fig.update_layout(
+        title={
+            'text': f"BTC 가격 ({'분석 시점' if resolution == 'tick' else resolution + ' 캔들'})",
+            'x': 0.5,
+            'font': {'size': 18, 'color': '#667eea', 'family': 'Arial Black'}
+        },
+        xaxis_title="시각",
+        yaxis_title="가격 (KRW)",
+        template="plotly_dark",
+        height=450,
+        xaxis_rangeslider_visible=False,
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        font={'color': '#ffffff'},
+        xaxis={'gridcolor': 'rgba(255,255,255,0.1)'},
+        yaxis={'gridcolor': 'rgba(255,255,255,0.1)'}
+    )
+    
+    st.plotly_chart(fig, use_container_width=True)
+
 def render_portfolio_chart(portfolio_df):
     """포트폴리오 변화 차트"""
     st.markdown('''
@@ -983,6 +1097,24 @@ def parse_analysis_sections(text):
     
     return sections
 
+def render_raw_log(log_id):
+    """분석 로그 한 건의 원본 JSON (AI 분석 / 마켓 데이터) 표시"""
+    try:
+        log = get_database().get_log_by_id(log_id)
+    except Exception as e:
+        st.error(f"원본 데이터 조회 오류: {e}")
+        return
+    if not log:
+        st.info("원본 데이터가 없습니다.")
+        return
+    
+    for title, column in [("🧠 AI 분석 전체", 'ai_analysis_full_json'), ("📈 마켓 데이터 전체", 'market_data_json')]:
+        st.markdown(f"**{title}**")
+        try:
+            st.json(json.loads(log.get(column) or '{}'), expanded=False)
+        except ValueError:
+            st.code(str(log.get(column)))
+
 def render_ai_analysis_detailed(ai_logs_df):
     """AI 분석 상세"""
     st.markdown('''
@@ -1088,7 +1220,7 @@ def render_ai_analysis_detailed(ai_logs_df):
     if date_filter != '전체':
         days_map = {'최근 1일': 1, '최근 3일': 3, '최근 7일': 7}
         if date_filter in days_map:
-            cutoff_date = datetime.now() - timedelta(days=days_map[date_filter])
+            cutoff_date = local_now() - timedelta(days=days_map[date_filter])
             filtered_df['timestamp'] = pd.to_datetime(filtered_df['timestamp'])
             filtered_df = filtered_df[filtered_df['timestamp'] >= cutoff_date]
     
@@ -1274,6 +1406,10 @@ def render_ai_analysis_detailed(ai_logs_df):
                       f"💵 KRW: ₩{safe_float(row.get('krw_balance')):,.0f} | "
                       f"🪙 BTC: {safe_float(row.get('btc_balance')):.6f}")
             
+            # 원본 데이터는 펼칠 때만 ID 로 조회
+            if 'id' in row and st.checkbox("📦 원본 분석 데이터 보기", key=f"raw_log_{row['id']}"):
+                render_raw_log(int(row['id']))
+            
             st.divider()
     
     # 더 많은 분석 보기 버튼
@@ -1358,6 +1494,120 @@ def render_ai_analysis_detailed(ai_logs_df):
         st.info("신뢰도 분석 데이터가 없습니다.")
 
 
+def render_prediction_accuracy(accuracy):
+    """AI 결정의 실제 적중률 (1시간/4시간/24시간 뒤 가격 기준, db_tools.py score 로 채점)"""
+    st.markdown('<h3 class="section-header">🎯 AI 예측 적중률</h3>', unsafe_allow_html=True)
+    
+    total = accuracy['total']
+    if not total['predictions']:
+        st.info("채점된 예측이 없습니다. (python db_tools.py score trading_enhanced.db)")
+        return
+    
+    horizons = [name for name, stats in total.items() if isinstance(stats, dict)]
+    columns = st.columns(len(horizons))
+    for column, name in zip(columns, horizons):
+        stats = total[name]
+        rate = '-' if stats['hit_rate'] is None else f"{stats['hit_rate']:.1%}"
+        card = 'success-card' if (stats['hit_rate'] or 0) >= 0.5 else 'info-card'
+        with column:
+            st.markdown(f'''
+            <div class="stat-box {card}">
+                <div style="text-align: center;">
+                    <div style="font-size: 0.9rem; opacity: 0.8;">{name} 뒤</div>
+                    <div style="font-size: 1.6rem; font-weight: bold;">{rate}</div>
+                    <div style="font-size: 0.9rem; opacity: 0.8;">{stats['hits']:,} / {stats['scored']:,}회 적중</div>
+                </div>
+            </div>
+            ''', unsafe_allow_html=True)
+    
+    # 결정별 적중률 표
+    rows = []
+    for decision, summary in sorted(accuracy['by_decision'].items()):
+        row = {'결정': decision, '채점 수': summary['predictions']}
+        for name in horizons:
+            hit_rate = summary[name]['hit_rate']
+            row[f'{name} 적중률'] = '-' if hit_rate is None else f"{hit_rate:.1%}"
+        rows.append(row)
+    st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+
+def render_similar_contexts(change_token):
+    """최신 분석 로그와 시장 상황이 비슷했던 과거 로그와 그 뒤의 실제 가격 변동 (실패해도 나머지 화면은 그대로)"""
+    st.markdown('<h3 class="section-header">🧭 비슷했던 과거 상황</h3>', unsafe_allow_html=True)
+    
+    try:
+        similar = load_similar_contexts(change_token)
+    except Exception as e:
+        st.warning(f"비슷했던 과거 상황을 불러오지 못했습니다: {e}")
+        return
+    
+    if not similar:
+        st.info("비교할 과거 분석 로그가 없습니다.")
+        return
+    
+    rows = []
+    for item in similar:
+        outcome = item['outcome'] or {}
+        features = item['features']
+        row = {
+            '시간': item['timestamp'][:16].replace('T', ' '),
+            '거리': round(item['distance'], 3),
+            '결정': item['ai_decision'],
+            '신뢰도': item['ai_confidence'],
+            '24h 변동': '-' if features['change_24h'] is None else f"{features['change_24h']:+.2%}",
+            '공포탐욕': '-' if features['fear_greed'] is None else f"{features['fear_greed']:.0f}",
+        }
+        for name in ('1h', '4h', '24h'):
+            change = outcome.get(f'return_{name}')
+            row[f'{name} 뒤'] = '-' if change is None else f"{change:+.2%}"
+        rows.append(row)
+    st.caption("거리가 작을수록 비슷한 상황입니다 (24시간 변동·고저 폭·거래량·스프레드·공포탐욕·AI 점수·신뢰도 기준)")
+    st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+
+# 검색 결과 발췌에서 일치 부분을 표시하는 임시 기호 (HTML 이스케이프 뒤 <mark> 로 바꾼다)
+SEARCH_HIGHLIGHT = ('\x02', '\x03')
+
+def render_history_search():
+    """전체 이력 전문 검색 (AI 판단 근거 / 자기반성)"""
+    st.markdown('<h3 class="section-header">🔎 전체 이력 검색</h3>', unsafe_allow_html=True)
+    
+    col1, col2, col3 = st.columns([3, 1, 1])
+    with col1:
+        query = st.text_input("검색어", placeholder="예: 다이버전스, 김치 프리미엄, 볼린저 하단", key="history_search_query")
+    with col2:
+        target = st.selectbox("대상", ["AI 판단 근거", "자기반성"], key="history_search_target")
+    with col3:
+        page = st.number_input("페이지", min_value=1, value=1, step=1, key="history_search_page")
+    
+    if not query.strip():
+        return
+    
+    table = 'trading_logs' if target == "AI 판단 근거" else 'self_reflections'
+    try:
+        result = get_database().search(query, table=table, page=int(page), page_size=10, highlight=SEARCH_HIGHLIGHT)
+    except Exception as e:
+        st.error(f"검색 실패: {e}")
+        return
+    
+    total_pages = max(1, -(-result['total'] // result['page_size']))
+    st.caption(f"'{query}' 검색 결과 {result['total']:,}건 (관련도 순, {result['page']}/{total_pages} 페이지)")
+    if not result['rows']:
+        st.info("검색 결과가 없습니다.")
+        return
+    
+    for row in result['rows']:
+        if table == 'trading_logs':
+            title = f"{row.get('timestamp', '')[:19]} | {row.get('ai_decision', '')} | 신뢰도 {row.get('ai_confidence', 'N/A')}"
+        else:
+            title = f"{row.get('reflection_date', '')[:19]} | 자기반성 #{row['id']}"
+        snippet = html.escape(row.get('snippet') or '')
+        snippet = snippet.replace(SEARCH_HIGHLIGHT[0], '<mark>').replace(SEARCH_HIGHLIGHT[1], '</mark>')
+        st.markdown(f'''
+        <div class="stat-box info-card" style="text-align: left; margin-bottom: 0.5rem;">
+            <div style="font-weight: bold; margin-bottom: 0.3rem;">{html.escape(title)}</div>
+            <div style="font-size: 0.9rem; white-space: pre-line;">{snippet}</div>
+        </div>
+        ''', unsafe_allow_html=True)
+
 def render_ai_decision_chart(ai_logs_df):
     """AI 결정 분포 차트"""
     st.markdown('''
@@ -1410,12 +1660,20 @@ def main():
     </div>
     ''', unsafe_allow_html=True)
     
-    # 데이터 로드
-    data = load_trading_data()
-    
-    if data['status'] != 'success':
+    # 데이터 로드 (테이블이 바뀌었거나 날짜가 바뀐 경우에만 다시 읽음)
+    change_token = get_change_token()
+    try:
+        data = load_trading_data(change_token, local_now().strftime('%Y-%m-%d'))
+    except SchemaOutdatedError as e:
+        st.error(f"❌ 데이터베이스 스키마가 최신이 아닙니다 (v{e.version} → v{SCHEMA_VERSION} 필요)")
+        if e.__cause__ is not None:
+            st.error(f"자동 마이그레이션 실패: {e.__cause__}")
+        st.info("터미널에서 아래 명령으로 마이그레이션한 뒤 새로고침하세요.")
+        st.code(e.migrate_command, language='bash')
+        return
+    except Exception as e:
         st.error("❌ 데이터 로드 실패")
-        st.error(f"오류: {data.get('error', '알 수 없음')}")
+        st.error(f"오류: {e}")
         return
     
     trades_df = data['trades']
@@ -1446,9 +1704,13 @@ def main():
         render_trades_table(trades_df)
     
     with tab2:
+        render_price_chart(data['prices'], data['price_resolution'])
         render_portfolio_details(portfolio_df)
     
     with tab3:
+        render_prediction_accuracy(data['prediction_accuracy'])
+        render_similar_contexts(change_token)
+        render_history_search()
         render_ai_analysis_detailed(ai_logs_df)
     
     with tab4:
@@ -1457,13 +1719,12 @@ def main():
     # 새로고침 버튼
     st.sidebar.title("🔄 제어판")
     if st.sidebar.button("데이터 새로고침"):
-        st.cache_data.clear()
         st.rerun()
     
     # 정보
     st.sidebar.markdown("---")
     st.sidebar.markdown("**📊 대시보드 정보**")
-    st.sidebar.info(f"📅 마지막 업데이트: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    st.sidebar.info(f"📅 마지막 업데이트: {local_now().strftime('%Y-%m-%d %H:%M:%S')}")
     
     if not trades_df.empty:
         latest_trade = pd.to_datetime(trades_df['timestamp']).max()
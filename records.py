@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+🧾 조회 결과 행 형식
+Compact row formats for TradingDatabase readers
+
+조회 메서드의 row_format 인자로 결과 행의 형태를 고른다.
+
+    'dict'    행마다 {컬럼: 값} dict (기본값, 기존 동작)
+    'tuple'   행마다 값 튜플, 컬럼 이름은 결과 목록(Rows.columns)이 한 번만 가진다
+    'record'  테이블·컬럼 조합별 NamedTuple 레코드 (row.price 처럼 속성으로 접근, 튜플만큼 작다)
+
+'tuple' / 'record' 결과는 Rows 목록으로 반환되며 to_dataframe() 으로 dict 를 거치지 않고
+바로 DataFrame 을 만들 수 있다.
+
+    trades = db.get_trades_by_date('2025-07-01', '2025-08-01', row_format='record')
+    trades[0].price, trades.columns
+    df = db.get_trades_by_date('2025-07-01', '2025-08-01', row_format='tuple').to_dataframe()
+"""
+
+from functools import lru_cache
+from typing import Iterable, NamedTuple, Optional, Sequence, Tuple
+
+ROW_FORMATS = ('dict', 'tuple', 'record')
+
+# SQLite 선언 타입 → 레코드 필드 타입 (BOOLEAN 은 0/1 정수로 저장된다)
+SQLITE_FIELD_TYPES = {
+    'INTEGER': int,
+    'REAL': float,
+    'TEXT': str,
+    'BOOLEAN': int,
+    'DATETIME': str,
+    'BLOB': bytes,
+}
+
+
+def check_row_format(row_format: str) -> str:
+    """지원하는 row_format 인지 확인"""
+    if row_format not in ROW_FORMATS:
+        raise ValueError(f"지원하지 않는 row_format: {row_format} ({', '.join(ROW_FORMATS)})")
+    return row_format
+
+
+@lru_cache(maxsize=None)
+def record_class(table: str, fields: Tuple[Tuple[str, str], ...]) -> type:
+    """테이블의 (컬럼, 선언 타입) 조합에 해당하는 NamedTuple 레코드 클래스 (조합별로 한 번만 생성)
+
+    이름은 trading_logs → TradingLogsRecord 처럼 만들며, 값이 NULL 일 수 있으므로 필드 타입은 Optional 이다.
+    """
+    name = ''.join(part.capitalize() for part in table.split('_')) + 'Record'
+    return NamedTuple(name, [
+        (column, Optional[SQLITE_FIELD_TYPES.get(declared.upper(), object)]) for column, declared in fields
+    ])
+
+
+class Rows(list):
+    """컬럼 이름을 한 번만 갖는 행 목록 (row_format='tuple' / 'record' 결과)"""
+
+    __slots__ = ('columns',)
+
+    def __init__(self, rows: Iterable = (), columns: Sequence[str] = ()):
+        super().__init__(rows)
+        self.columns = tuple(columns)
+
+    def to_dicts(self) -> list:
+        """dict 행 목록으로 변환"""
+        return [dict(zip(self.columns, row)) for row in self]
+
+    def to_dataframe(self):
+        """pandas DataFrame 으로 변환 (행 튜플에서 바로 만들며, 행이 없어도 컬럼은 유지)"""
+        import pandas as pd  # 대시보드·분석에서만 필요
+
+        return pd.DataFrame.from_records(self, columns=list(self.columns))
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+🧭 비슷한 과거 시장 상황 찾기 (NumPy 특징 행렬 최근접 이웃)
+Nearest-neighbour retrieval over numeric market features
+
+분석 로그의 숫자 컬럼에서 시장 상황 특징 벡터를 만들어 (로그 수 x 특징 수) float32 행렬로 모으고,
+질의 벡터와의 거리를 행렬 전체에 대해 한 번에 계산해 가장 가까운 k 개를 argpartition 으로 고른다.
+가격·거래량처럼 단위가 다른 값은 비율/로그로 바꾼 뒤, 특징마다 평균과 표준편차로 표준화해 비교한다.
+
+    change_24h      24시간 가격 변동률          price_change_24h / (current_price - price_change_24h)
+    range_24h       24시간 고저 폭 비율          (high_24h - low_24h) / current_price
+    log_volume_24h  24시간 거래량 (로그)         log1p(volume_24h)
+    spread          호가 스프레드 비율           orderbook_spread / current_price
+    fear_greed      공포탐욕 지수               fear_greed_value
+    ai_score        AI 점수                    ai_score
+    ai_confidence   AI 신뢰도 (0~1)            confidence_value(ai_confidence)
+
+값이 없는 특징(NaN)은 그 특징의 평균으로 보고 비교한다 (표준화하면 0). 질의 쪽에서 값이 없는 특징은
+거리 계산에서 뺀다. 거리는 비교한 특징들의 표준화 차이 제곱 평균의 제곱근이다.
+"""
+
+from typing import Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+from predictions import confidence_value
+
+SIMILARITY_FEATURES = (
+    'change_24h', 'range_24h', 'log_volume_24h', 'spread', 'fear_greed', 'ai_score', 'ai_confidence',
+)
+
+# 특징을 만들 때 읽는 trading_logs 컬럼 (id, timestamp_ms 다음은 feature_matrix 의 행 순서)
+SIMILARITY_SOURCE_COLUMNS = (
+    'id', 'timestamp_ms', 'current_price', 'high_24h', 'low_24h', 'volume_24h',
+    'price_change_24h', 'orderbook_spread', 'fear_greed_value', 'ai_score', 'ai_confidence',
+)
+
+# 거리 계산을 나눠서 하는 행 수 (중간 배열이 CPU 캐시에 머무는 크기, 메모리 매핑된 행렬도 이만큼씩 읽는다)
+DISTANCE_BLOCK_ROWS = 16384
+
+
+def feature_matrix(rows: Sequence[tuple], dtype=np.float32) -> np.ndarray:
+    """값 튜플 목록 (SIMILARITY_SOURCE_COLUMNS 의 current_price 부터) → (행 수, 특징 수) 행렬 (기본 float32)"""
+    if not rows:
+        return np.empty((0, len(SIMILARITY_FEATURES)), dtype=dtype)
+    columns = list(zip(*rows))
+    price, high, low, volume, change, spread, fear_greed, score = (
+        np.array(values, dtype=np.float64) for values in columns[:8]
+    )
+    labels = np.array(columns[8], dtype=object)
+    confidence = np.full(len(rows), np.nan)
+    for label in set(columns[8]):
+        confidence[labels == label] = confidence_value(label)
+
+    price = np.where(price > 0, price, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        base = price - change
+        features = np.column_stack([
+            np.where(base > 0, change / base, np.nan),
+            (high - low) / price,
+            np.log1p(np.where(volume >= 0, volume, np.nan)),
+            spread / price,
+            fear_greed,
+            score,
+            confidence,
+        ])
+    return features.astype(dtype)
+
+
+def feature_sums(matrix: np.ndarray) -> np.ndarray:
+    """특징별 (값 개수, 합, 제곱합) - (3, 특징 수) float64, 여러 행렬의 결과를 더해 평균/표준편차를 만든다"""
+    values = np.asarray(matrix, dtype=np.float64)
+    present = ~np.isnan(values)
+    values = np.where(present, values, 0.0)
+    return np.stack([present.sum(axis=0), values.sum(axis=0), (values * values).sum(axis=0)])
+
+
+def feature_scale(sums: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """feature_sums 합계 → 특징별 (평균, 표준편차) - 값이 없으면 평균 0, 변동이 없으면 표준편차 0"""
+    count, total, squares = sums
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = np.where(count > 0, total / count, 0.0)
+        variance = np.where(count > 1, squares / count - mean * mean, 0.0)
+    return mean, np.sqrt(np.maximum(variance, 0.0))
+
+
+def nearest(blocks: Iterable[Tuple[np.ndarray, np.ndarray, np.ndarray]], query: np.ndarray,
+            mean: np.ndarray, std: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """질의 벡터에 가장 가까운 k 개의 (id 배열, 거리 배열) - 거리 오름차순
+
+    blocks 는 (특징 행렬, id 배열, 후보 여부 bool 배열) 묶음이다. 행렬이 크면 DISTANCE_BLOCK_ROWS 행씩
+    나눠 계산하고, 블록마다 고른 상위 k 개를 모아 다시 고른다.
+    """
+    query = np.asarray(query, dtype=np.float64)
+    used = ~np.isnan(query) & (std > 0)
+    if not used.any() or k <= 0:
+        return np.empty(0, dtype=np.int64), np.empty(0)
+    weight = (1.0 / std[used]).astype(np.float32)
+    center = mean[used].astype(np.float32)
+    target = ((query[used] - mean[used]) / std[used]).astype(np.float32)
+
+    best_ids: List[np.ndarray] = []
+    best_distances: List[np.ndarray] = []
+    for matrix, ids, candidates in blocks:
+        for start in range(0, len(ids), DISTANCE_BLOCK_ROWS):
+            stop = start + DISTANCE_BLOCK_ROWS
+            mask = candidates[start:stop]
+            if not mask.any():
+                continue
+            values = np.asarray(matrix[start:stop])[:, used]
+            scaled = (values - center) * weight
+            np.nan_to_num(scaled, copy=False, nan=0.0)
+            scaled -= target
+            distances = np.einsum('ij,ij->i', scaled, scaled)
+            distances[~mask] = np.inf
+            top = _smallest(distances, k)
+            top = top[np.isfinite(distances[top])]
+            best_ids.append(ids[start:stop][top])
+            best_distances.append(distances[top])
+    if not best_ids:
+        return np.empty(0, dtype=np.int64), np.empty(0)
+    ids = np.concatenate(best_ids)
+    distances = np.concatenate(best_distances)
+    top = _smallest(distances, k)
+    top = top[np.argsort(distances[top], kind='stable')]
+    return ids[top].astype(np.int64), np.sqrt(distances[top] / used.sum()).astype(np.float64)
+
+
+def _smallest(values: np.ndarray, k: int) -> np.ndarray:
+    """가장 작은 k 개 값의 위치 (순서 없음)"""
+    if len(values) <= k:
+        return np.arange(len(values))
+    return np.argpartition(values, k - 1)[:k]
@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+"""pytest 공용 픽스처 - 테스트마다 임시 디렉터리에 새 DB 를 만든다"""
+
+import pytest
+
+from database import TradingDatabase
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'test.db')
+
+
+@pytest.fixture
+def db(db_path):
+    database = TradingDatabase(db_path)
+    yield database
+    database.close()
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""JSONL 마이그레이션 - 거부 줄 기록, 체크포인트 재개, 쓰이는 중인 마지막 줄"""
+
+import json
+
+import pytest
+
+
+def log_line(i: int, price=148_000_000.0) -> bytes:
+    return json.dumps({
+        'market_data': {'current_price': price},
+        'ai_analysis': {'decision': 'HOLD', 'reason': f'로그 {i}'},
+        'timestamp': f'2025-07-01T09:{i:02d}:00',
+    }, ensure_ascii=False).encode('utf-8') + b'\n'
+
+
+@pytest.fixture
+def jsonl_path(tmp_path):
+    return str(tmp_path / 'trading_logs.jsonl')
+
+
+def read_rejects(path: str) -> list:
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def test_bad_lines_are_rejected_with_offsets(db, jsonl_path):
+    lines = [log_line(0), b'{not json\n', log_line(1), log_line(2, price=None), b'[1, 2]\n', log_line(3)]
+    with open(jsonl_path, 'wb') as f:
+        f.writelines(lines)
+    offsets = [sum(len(line) for line in lines[:i]) for i in range(len(lines))]
+
+    stats = db.migrate_from_json(jsonl_path, chunk_size=3)
+
+    assert stats['total_rows_imported'] == 3
+    assert stats['total_rows_rejected'] == 3
+    assert stats['end_offset'] == offsets[-1] + len(lines[-1])
+    rejects = read_rejects(jsonl_path + '.rejects')
+    assert sorted(r['byte_offset'] for r in rejects) == [offsets[1], offsets[3], offsets[4]]
+    assert any('NOT NULL' in r['error'] for r in rejects)
+    for reject in rejects:
+        assert reject['line'].encode('utf-8') + b'\n' == lines[offsets.index(reject['byte_offset'])]
+    reasons = sorted(log['ai_reason'] for log in db.get_recent_logs(10))
+    assert reasons == ['로그 0', '로그 1', '로그 3']
+
+
+def test_resume_imports_only_appended_lines(db, jsonl_path):
+    with open(jsonl_path, 'wb') as f:
+        f.writelines(log_line(i) for i in range(5))
+    assert db.migrate_from_json(jsonl_path)['rows_imported'] == 5
+
+    again = db.migrate_from_json(jsonl_path)
+    assert again['rows_imported'] == 0
+    assert again['start_offset'] == again['file_size']
+
+    with open(jsonl_path, 'ab') as f:
+        f.writelines(log_line(i) for i in range(5, 8))
+    appended = db.migrate_from_json(jsonl_path)
+    assert appended['rows_imported'] == 3
+    assert appended['total_rows_imported'] == 8
+    assert len(db.get_recent_logs(100)) == 8
+
+    restarted = db.migrate_from_json(jsonl_path, resume=False)
+    assert restarted['start_offset'] == 0
+    assert restarted['rows_imported'] == 8
+
+
+def test_partial_last_line_is_deferred(db, jsonl_path):
+    complete = log_line(0)
+    partial = log_line(1)
+    with open(jsonl_path, 'wb') as f:
+        f.write(complete + partial[:20])
+
+    first = db.migrate_from_json(jsonl_path)
+    assert first['rows_imported'] == 1
+    assert first['rows_rejected'] == 0
+    assert first['end_offset'] == len(complete)
+
+    with open(jsonl_path, 'ab') as f:
+        f.write(partial[20:])
+    second = db.migrate_from_json(jsonl_path)
+    assert second['rows_imported'] == 1
+    assert second['total_rows_imported'] == 2
+    assert db.get_import_checkpoint(jsonl_path)['byte_offset'] == len(complete + partial)
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""벡터화 FIFO 성과 계산 == 거래를 하나씩 처리하는 참조 구현 (check_performance)"""
+
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from check_performance import compare, random_trades, reference_fifo, reference_window
+from database import to_epoch_ms
+from performance import TradeArrays, window_stats
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_window_stats_match_reference_fifo(seed):
+    rng = random.Random(seed)
+    trades = random_trades(rng, rng.randint(0, 200))
+    fifo = reference_fifo(trades)
+    first = trades[0][0] if trades else 0
+    last = trades[-1][0] if trades else 0
+    windows = {'all': (None, None), 'before': (None, first + (last - first) // 2)}
+    for k in range(5):
+        windows[f'custom{k}'] = tuple(sorted(rng.randint(first - 1000, last + 1000) for _ in range(2)))
+
+    actual = window_stats(TradeArrays.from_rows(trades), windows)
+
+    for name, (start, end) in windows.items():
+        assert compare(reference_window(trades, fifo, start, end), actual[name]) == [], name
+
+
+def test_sell_without_open_lots_is_unmatched():
+    trades = [(1_000, False, 100.0, 1.0, 100.0, 0.0), (2_000, True, 100.0, 1.0, 100.0, 0.0)]
+    stats = window_stats(TradeArrays.from_rows(trades), {'all': (None, None)})['all']
+    assert stats['closed_trades'] == 0
+    assert stats['total_profit_loss'] == 0
+    assert stats['unmatched_amount'] == pytest.approx(1.0)
+
+
+def test_analyze_performance_windows_matches_reference(db):
+    rng = random.Random(7)
+    now = datetime(2025, 7, 31, 12, 0)
+    rows = []
+    for _ in range(300):
+        price = rng.uniform(140_000_000, 160_000_000)
+        amount = rng.uniform(0.0001, 0.01)
+        rows.append({
+            'trade_type': rng.choice(['buy', 'buy', 'sell']), 'price': price, 'amount': amount,
+            'total_value': price * amount, 'fee': price * amount * 0.0005, 'success': rng.random() > 0.1,
+            'trade_time': (now - timedelta(minutes=rng.randint(1, 60 * 24 * 60))).isoformat(),
+        })
+    db.save_trades(rows)
+
+    actual = db.analyze_performance_windows(end=now)
+
+    trades = sorted((
+        (to_epoch_ms(r['trade_time']), r['trade_type'] == 'buy', r['price'], r['amount'], r['total_value'], r['fee'])
+        for r in rows if r['success']
+    ), key=lambda trade: trade[0])
+    fifo = reference_fifo(trades)
+    end_ms = to_epoch_ms(now)
+    for name, days in (('1d', 1), ('7d', 7), ('30d', 30), ('all', None)):
+        start = None if days is None else end_ms - days * 86_400_000
+        expected = reference_window(trades, fifo, start, None if days is None else end_ms)
+        assert compare(expected, actual[name]) == [], name
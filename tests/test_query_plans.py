@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+"""조회 메서드의 쿼리 플랜이 관리 인덱스를 쓰는지 (check_query_plans 의 READ_CALLS 전체)"""
+
+from check_query_plans import check
+
+
+def test_read_queries_use_indexes(db_path):
+    assert check(db_path)
+
+
+def test_read_queries_use_indexes_with_rows(db):
+    db.save_analysis_logs([
+        {
+            'market_data': {'current_price': 148_000_000.0 + i},
+            'ai_analysis': {'decision': 'BUY', 'confidence': 'MEDIUM', 'reasoning': '다이버전스'},
+            'timestamp': f'2025-07-0{1 + i % 7}T{i % 24:02d}:00:00',
+        }
+        for i in range(50)
+    ])
+    db.save_trades([
+        {'trade_type': 'buy', 'price': 148_000_000.0, 'amount': 0.001, 'total_value': 148_000.0,
+         'trade_time': f'2025-07-0{1 + i % 7}T{i % 24:02d}:30:00'}
+        for i in range(20)
+    ])
+    assert check(db.db_path)
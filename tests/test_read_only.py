@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""읽기 전용 조회 모드 - 쓰기 거부, 오래된 스키마 거부, 쓰는 동안의 동시 조회와 쓰기 지연"""
+
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from database import SCHEMA_VERSION, SchemaOutdatedError, TradingDatabase
+
+BASE = datetime(2025, 7, 1)
+
+# 스키마 버전 관리 이전(user_version 0)의 trading_logs 테이블
+V0_TRADING_LOGS = """
+    CREATE TABLE trading_logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp TEXT NOT NULL,
+        current_price REAL NOT NULL,
+        krw_balance REAL,
+        btc_balance REAL,
+        total_portfolio_value REAL,
+        investment_status_json TEXT,
+        ai_decision TEXT NOT NULL,
+        ai_reason TEXT,
+        ai_confidence TEXT,
+        ai_analysis_full_json TEXT,
+        market_data_json TEXT,
+        analysis_type TEXT,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+
+def analysis_log(i: int) -> dict:
+    return {
+        'market_data': {'current_price': 148_000_000.0 + i},
+        'ai_analysis': {'decision': ('BUY', 'SELL', 'HOLD')[i % 3], 'confidence': 'MEDIUM'},
+        'timestamp': (BASE + timedelta(minutes=5 * i)).isoformat(),
+    }
+
+
+def test_read_only_refuses_writes(db, db_path):
+    db.save_analysis_logs([analysis_log(i) for i in range(3)])
+    reader = TradingDatabase(db_path, read_only=True)
+    try:
+        assert len(reader.get_recent_logs(10)) == 3
+        with pytest.raises(sqlite3.OperationalError):
+            reader.save_trade('buy', 1.0, 1.0, 1.0, trade_time='2025-07-01T00:00:00')
+        with pytest.raises(sqlite3.OperationalError):
+            with reader._connection() as conn:
+                conn.execute('DELETE FROM trading_logs')
+    finally:
+        reader.close()
+    assert len(db.get_recent_logs(10)) == 3
+
+
+def test_read_only_refuses_stale_schema_without_touching_the_file(db_path):
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(V0_TRADING_LOGS)
+        conn.execute("INSERT INTO trading_logs (timestamp, current_price, ai_decision) "
+                     "VALUES ('2025-07-01T09:00:00', 148000000, 'HOLD')")
+    before = open(db_path, 'rb').read()
+
+    with pytest.raises(SchemaOutdatedError) as excinfo:
+        TradingDatabase(db_path, read_only=True)
+
+    assert excinfo.value.version == 0
+    assert db_path in excinfo.value.migrate_command
+    assert open(db_path, 'rb').read() == before
+
+    # 한 번 쓰기 모드로 열면 (db_tools.py migrate / 대시보드) 읽기 전용으로 열린다
+    TradingDatabase(db_path).close()
+    reader = TradingDatabase(db_path, read_only=True)
+    with reader._connection() as conn:
+        assert conn.execute('PRAGMA user_version').fetchone()[0] == SCHEMA_VERSION
+    assert [log['ai_decision'] for log in reader.get_recent_logs(10)] == ['HOLD']
+    reader.close()
+
+
+def test_connections_of_finished_threads_are_closed(db):
+    threads = [threading.Thread(target=db.get_recent_logs, args=(5,)) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+        thread.join()
+    db.get_recent_logs(5)
+    assert len(db._connections) <= 2
+    db.close()
+    assert not db._connections
+
+
+def test_concurrent_readers_do_not_stall_the_writer(db, db_path):
+    db.save_analysis_logs([analysis_log(i) for i in range(500)])
+    reader = TradingDatabase(db_path, read_only=True)
+    done = threading.Event()
+    errors = []
+    queries = []
+
+    def read():
+        last_id = 0
+        count = 0
+        try:
+            while not done.is_set():
+                logs = reader.get_recent_log_summaries(50)
+                reader.get_trading_stats()
+                reader.get_change_tokens()
+                newest = max(log['id'] for log in logs)
+                assert newest >= last_id, "조회 결과가 뒤로 돌아갔습니다"
+                last_id = newest
+                count += 1
+        except Exception as e:  # 스레드 안의 실패를 본 테스트로 넘긴다
+            errors.append(e)
+        queries.append(count)
+
+    threads = [threading.Thread(target=read) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    latencies = []
+    try:
+        for i in range(500, 700):
+            start = time.perf_counter()
+            db.save_analysis_log(**analysis_log(i))
+            latencies.append(time.perf_counter() - start)
+    finally:
+        done.set()
+        for thread in threads:
+            thread.join()
+        reader.close()
+
+    assert errors == []
+    assert all(count > 0 for count in queries)
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    assert p99 < 0.25, f"쓰기 p99 {p99 * 1000:.1f}ms"
+    assert len(db.get_recent_logs(1000)) == 700
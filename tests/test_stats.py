@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""트리거로 유지하는 trading_stats == 원본 테이블 (아카이브 포함) 전체 집계"""
+
+import random
+from datetime import datetime, timedelta
+
+from check_stats import MUTATIONS, save_batch
+
+
+def test_stats_follow_saves_mutations_and_archive(db):
+    rng = random.Random(3)
+    start = datetime(2025, 5, 1)
+    for number in range(6):
+        save_batch(db, rng, start + timedelta(days=10 * number), rng.randint(50, 150))
+        with db._connection() as conn:
+            for sql in rng.sample(MUTATIONS, 3):
+                conn.execute(sql.format(m=rng.randint(2, 19)))
+        if number == 3:
+            # 앞 두 단계의 행이 아카이브로 옮겨진다
+            moved = db.archive_old_rows(30, now=start + timedelta(days=50))
+            assert moved
+        assert db.verify_stats() == {}, f"{number + 1}단계"
+
+
+def test_get_trading_stats_counts_successful_trades_only(db):
+    db.save_trades([
+        {'trade_type': 'buy', 'price': 1.0, 'amount': 1.0, 'total_value': 1.0, 'fee': 2.0,
+         'trade_time': '2025-07-01T00:00:00'},
+        {'trade_type': 'sell', 'price': 1.0, 'amount': 1.0, 'total_value': 1.0, 'fee': 3.0,
+         'trade_time': '2025-07-01T01:00:00'},
+        {'trade_type': 'sell', 'price': 1.0, 'amount': 1.0, 'total_value': 1.0, 'fee': 5.0, 'success': False,
+         'trade_time': '2025-07-01T02:00:00'},
+    ])
+    stats = db.get_trading_stats()
+    assert (stats['total_trades'], stats['buy_count'], stats['sell_count']) == (2, 1, 1)
+    assert stats['total_fee'] == 5.0
+
+
+def test_rebuild_stats_repairs_drift(db):
+    save_batch(db, random.Random(5), datetime(2025, 7, 1), 40)
+    with db._connection() as conn:
+        conn.execute("UPDATE trading_stats SET count = count + 7 WHERE scope = 'trade'")
+    assert db.verify_stats()
+
+    db.rebuild_stats()
+
+    assert db.verify_stats() == {}
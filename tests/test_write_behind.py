@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""write-behind 큐 - close() 의 큐 비우기, 실패한 묶음 알림, 바로 커밋하는 저장의 순서"""
+
+import pytest
+
+from database import TradingDatabase, WriteBehindError
+
+
+def analysis_log(i: int) -> dict:
+    return {
+        'market_data': {'current_price': 148_000_000.0 + i},
+        'ai_analysis': {'decision': 'HOLD', 'reason': f'로그 {i}'},
+        'timestamp': f'2025-07-01T09:{i:02d}:00',
+    }
+
+
+@pytest.fixture
+def writer_db(db_path):
+    db = TradingDatabase(db_path, write_behind=True, flush_interval=0.1, flush_size=1000)
+    yield db
+    try:
+        db.close()
+    except WriteBehindError:
+        pass
+
+
+def test_close_drains_the_queue(writer_db, db_path):
+    for i in range(50):
+        assert writer_db.save_analysis_log(**analysis_log(i)) is None
+    writer_db.save_trade('buy', 1.0, 1.0, 1.0, trade_time='2025-07-01T10:00:00', durable=False)
+    assert writer_db.write_behind_stats()['rows_queued'] == 51
+    writer_db.close()
+
+    db = TradingDatabase(db_path)
+    try:
+        assert len(db.get_recent_logs(100)) == 50
+        assert len(db.get_trades_by_date('2025-07-01')) == 1
+    finally:
+        db.close()
+
+
+def test_durable_trade_commits_queued_logs_first(writer_db):
+    for i in range(5):
+        writer_db.save_analysis_log(**analysis_log(i))
+    trade_id = writer_db.save_trade('buy', 1.0, 1.0, 1.0, trade_time='2025-07-01T10:00:00')
+    assert trade_id is not None
+    assert len(writer_db.get_recent_logs(10)) == 5
+
+
+def test_failed_batch_is_reported_once_without_blocking_durable_saves(writer_db):
+    writer_db._writer.put('INSERT INTO missing_table VALUES (?)', (1,))
+
+    trade_id = writer_db.save_trade('buy', 1.0, 1.0, 1.0, trade_time='2025-07-01T10:00:00')
+    assert trade_id is not None
+    assert writer_db.write_behind_stats()['failed_pending'] == 1
+
+    with pytest.raises(WriteBehindError) as excinfo:
+        writer_db.flush()
+    assert excinfo.value.rows == [('INSERT INTO missing_table VALUES (?)', (1,))]
+    assert writer_db.write_behind_stats()['failed_pending'] == 0
+    writer_db.flush()
+
+    # 실패를 알린 뒤에도 큐는 계속 쓸 수 있다
+    writer_db.save_trade('sell', 2.0, 1.0, 2.0, trade_time='2025-07-01T11:00:00', durable=False)
+    writer_db.flush()
+    assert sorted(t['trade_type'] for t in writer_db.get_trades_by_date('2025-07-01')) == ['buy', 'sell']
+
+
+def test_batch_saves_return_ids_in_input_order(writer_db):
+    writer_db.save_analysis_log(**analysis_log(0))
+    log_ids = writer_db.save_analysis_logs([analysis_log(i) for i in range(1, 6)])
+    assert log_ids == sorted(log_ids) and len(set(log_ids)) == 5
+    logs = {log['id']: log['ai_reason'] for log in writer_db.get_recent_logs(10)}
+    assert [logs[log_id] for log_id in log_ids] == [f'로그 {i}' for i in range(1, 6)]
+    assert min(logs) < min(log_ids)  # 큐에 있던 로그가 먼저 저장된다
+
+    trade_ids = writer_db.save_trades([
+        {'trade_type': 'buy', 'price': 1.0, 'amount': 1.0, 'total_value': 1.0,
+         'trade_time': f'2025-07-01T10:0{i}:00'}
+        for i in range(3)
+    ])
+    assert trade_ids == sorted(trade_ids) and len(set(trade_ids)) == 3